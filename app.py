@@ -1,20 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from routes import router
+import http_client
+from events import event_ingestor
+from traffic_log import traffic_log
 from dotenv import load_dotenv
 from contextlib import asynccontextmanager
 import os
+import time
 import uvicorn
+from metrics import HTTP_REQUEST_SECONDS
+from database_manager import warn_pending_migrations
+from predict import start_popular_refresh, stop_popular_refresh
+from starlette.concurrency import run_in_threadpool
 
 # Load environment variables
 load_dotenv()
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="EmpowerVerse Video Recommendation API",
-    description="API for EmpowerVerse video recommendation and data collection",
-    version="1.0.0"
-)
-
 # Lifespan handler for startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -24,14 +25,52 @@ async def lifespan(app: FastAPI):
     if missing_vars:
         raise RuntimeError(f"Missing environment variables: {', '.join(missing_vars)}")
     
-    
+    # Schema migration is an explicit step (python database_manager.py --migrate); only report it here
+    warn_pending_migrations()
+
+    # Shared pooled HTTP clients used by routes (upstream crawls) and database_manager (ingestion)
+    await http_client.startup()
+    # Micro-batched writer behind POST /events
+    await event_ingestor.start()
+    # Optional /feed request log (FEED_TRAFFIC_LOG) for replay by benchmarks/load_test.py
+    traffic_log.start()
+    # Popularity list served by degraded /feed responses, rebuilt every POPULAR_REFRESH_SECONDS
+    await run_in_threadpool(start_popular_refresh)
+
     yield  # Application runs here
 
-# Attach lifespan handler to app
-app.lifespan = lifespan
+    # Shutdown tasks
+    await run_in_threadpool(stop_popular_refresh)
+    traffic_log.stop()
+    await event_ingestor.stop()
+    await http_client.shutdown()
+
+# Initialize FastAPI app
+app = FastAPI(
+    title="EmpowerVerse Video Recommendation API",
+    description="API for EmpowerVerse video recommendation and data collection",
+    version="1.0.0",
+    lifespan=lifespan
+)
 
 # Include routes
 app.include_router(router)
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Labelled by route template (e.g. /feed) rather than raw path to keep cardinality bounded
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method, route=getattr(route, "path", "unmatched"), status=status
+        )
+
 if __name__ == "__main__":
     uvicorn.run("app:app", port=8000, reload=False)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from recommendation_engine import RecommendationEngine
+
+# Time each RecommendationEngine stage on ./data.db (see benchmarks/synthetic_data.py) and
+# write the results to JSON. With --baseline, stages that got slower or hungrier than a
+# previous result by more than --tolerance are flagged and the exit status is 1:
+#
+#     python -m benchmarks.engine_bench --output engine-after.json --baseline engine-before.json
+
+BUILD_STAGES = ["load_and_prepare_data", "compute_content_similarity", "build_interaction_matrix", "compute_user_similarity"]
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _time_stage(name, func, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    stage = {"stage": name, "seconds": seconds}
+    if trace_memory:
+        stage["peak_traced_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    stage["peak_rss_mb"] = _peak_rss_mb()
+    logging.info(f"{name}: {seconds:.3f}s")
+    return stage, result
+
+
+def run(recommendations=200, num_recommendations=10, snapshot_dir=None, trace_memory=False, seed=42):
+    """
+    Build an engine stage by stage, then time `recommendations` recommend_posts calls for
+    users sampled from the interaction matrix (a tenth of them with a category filter).
+    Peak RSS is always recorded; `trace_memory` adds per-stage tracemalloc peaks but slows
+    the stages down several-fold, so compare timings only between runs with the same setting.
+
+    Returns:
+        dict: per-stage seconds and peak memory, recommendation latency percentiles and dataset sizes
+    """
+    engine = RecommendationEngine()
+    stages = []
+    stage_funcs = {
+        "load_and_prepare_data": lambda: engine.load_and_prepare_data(snapshot_dir=snapshot_dir),
+        "compute_content_similarity": engine.compute_content_similarity,
+        "build_interaction_matrix": engine.build_interaction_matrix,
+        "compute_user_similarity": engine.compute_user_similarity,
+    }
+    for name in BUILD_STAGES:
+        stage, _ = _time_stage(name, stage_funcs[name], trace_memory)
+        stages.append(stage)
+
+    rng = np.random.default_rng(seed)
+    users = engine.interaction_matrix.index.to_numpy()
+    categories = engine.posts_df["category"].unique()
+    sample = rng.choice(users, size=min(recommendations, len(users)), replace=False) if len(users) else []
+    latencies = []
+
+    def recommend_all():
+        for index, user_id in enumerate(sample):
+            category = str(rng.choice(categories)) if index % 10 == 0 and len(categories) else None
+            started = time.perf_counter()
+            engine.recommend_posts(int(user_id), category=category, num_recommendations=num_recommendations)
+            latencies.append(time.perf_counter() - started)
+
+    stage, _ = _time_stage("recommend_posts", recommend_all, trace_memory)
+    if latencies:
+        stage.update({
+            "calls": len(latencies),
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000),
+            "mean_ms": float(np.mean(latencies) * 1000),
+        })
+    stages.append(stage)
+
+    return {
+        "benchmark": "engine",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "snapshot_dir": snapshot_dir,
+        "trace_memory": trace_memory,
+        "dataset": {
+            "posts": len(engine.posts_df),
+            "interaction_pairs": len(engine.interactions_df),
+            "users": len(engine.interaction_matrix.index),
+        },
+        "build_seconds": sum(stage["seconds"] for stage in stages if stage["stage"] in BUILD_STAGES),
+        "stages": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Relative change per stage against a baseline result; entries beyond `tolerance` are regressions."""
+    base_stages = {stage["stage"]: stage for stage in baseline.get("stages", [])}
+    rows = []
+    for stage in result["stages"]:
+        base = base_stages.get(stage["stage"])
+        if base is None:
+            continue
+        for metric in ("seconds", "p99_ms", "peak_traced_mb"):
+            if metric in stage and base.get(metric):
+                change = stage[metric] / base[metric] - 1
+                rows.append({
+                    "stage": stage["stage"], "metric": metric, "baseline": base[metric],
+                    "current": stage[metric], "change": change, "regression": change > tolerance,
+                })
+    return rows
+
+
+def print_report(result, comparison=None):
+    dataset = result["dataset"]
+    print(f"dataset: {dataset['posts']} posts, {dataset['users']} users, {dataset['interaction_pairs']} interaction pairs")
+    print(f"{'stage':<28} {'seconds':>9} {'traced MB':>10} {'RSS MB':>9}")
+    for stage in result["stages"]:
+        traced = f"{stage['peak_traced_mb']:.1f}" if "peak_traced_mb" in stage else "-"
+        print(f"{stage['stage']:<28} {stage['seconds']:>9.3f} {traced:>10} {stage['peak_rss_mb']:>9.1f}")
+        if "p50_ms" in stage:
+            print(f"{'':<28} {stage['calls']} calls, p50 {stage['p50_ms']:.1f}ms, p99 {stage['p99_ms']:.1f}ms")
+    print(f"build total: {result['build_seconds']:.3f}s, peak RSS {result['peak_rss_mb']:.1f}MB")
+    for row in comparison or []:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['stage']:<28} {row['metric']:<15} {row['baseline']:>10.3f} -> {row['current']:>10.3f} ({row['change']:+.1%}) {flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation engine stage by stage.")
+    parser.add_argument("--output", default="engine_bench.json", help="Where to write the JSON result")
+    parser.add_argument("--recommendations", type=int, default=200, help="recommend_posts calls to time")
+    parser.add_argument("--num-recommendations", type=int, default=10)
+    parser.add_argument("--snapshot", help="Load from this snapshot directory instead of the database")
+    parser.add_argument("--trace-memory", action="store_true", help="Record per-stage tracemalloc peaks (slows the stages down)")
+    parser.add_argument("--baseline", help="Previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    result = run(args.recommendations, args.num_recommendations, args.snapshot, args.trace_memory, args.seed)
+    comparison = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("trace_memory") != result["trace_memory"]:
+            logging.warning("Baseline was run with a different --trace-memory setting; timings are not comparable")
+        comparison = compare(result, baseline, args.tolerance)
+        result["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "changes": comparison}
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print_report(result, comparison)
+    print(f"wrote {args.output}")
+    if comparison and any(row["regression"] for row in comparison):
+        sys.exit(1)
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Environment variables (overridden by the command-line options)
+FAKE_LLM_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "0.5"))  # mean seconds per request
+FAKE_LLM_LATENCY_PER_POST = float(os.getenv("FAKE_LLM_LATENCY_PER_POST", "0.1"))  # extra seconds per post of a batch
+FAKE_LLM_JITTER = float(os.getenv("FAKE_LLM_JITTER", "0.2"))  # +/- fraction of the latency
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0.0"))  # share of requests answered with a 500
+FAKE_LLM_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0.0"))  # share of requests answered with a 429
+FAKE_LLM_MAX_CONCURRENCY = int(os.getenv("FAKE_LLM_MAX_CONCURRENCY", "32"))  # requests above this get a 429
+FAKE_LLM_RETRY_AFTER = os.getenv("FAKE_LLM_RETRY_AFTER", "1")  # Retry-After header on 429s ("" to omit)
+FAKE_LLM_BAD_ELEMENT_RATE = float(os.getenv("FAKE_LLM_BAD_ELEMENT_RATE", "0.0"))  # share of batch elements left out
+FAKE_LLM_THROTTLE_FIRST = int(os.getenv("FAKE_LLM_THROTTLE_FIRST", "0"))  # the first N requests always get a 429
+
+# Kept in sync with llm_handler.CATEGORIES
+CATEGORIES = [
+    "Education", "Entertainment", "Technology", "Lifestyle", "Travel",
+    "Food", "Health", "Fitness", "Finance", "News", "Comedy", "Gaming",
+    "Music", "Art", "Fashion", "Business", "Science", "History",
+    "Motivation", "Sports", "Politics", "Tutorial", "Review", "Vlog", "DIY"
+]
+
+# An OpenAI-compatible stand-in for POST /v1/chat/completions. Single-post prompts get a
+# {"summary", "category"} object; batched prompts (one '{"id": ...}' JSON line per post, see
+# llm_handler.llm_batch_summarizer) get an array with one element per post. Latency, errors
+# and throttling are configurable so the summarization pipeline can be benchmarked offline.
+config = {
+    "latency": FAKE_LLM_LATENCY,
+    "latency_per_post": FAKE_LLM_LATENCY_PER_POST,
+    "jitter": FAKE_LLM_JITTER,
+    "error_rate": FAKE_LLM_ERROR_RATE,
+    "rate_limit_rate": FAKE_LLM_429_RATE,
+    "max_concurrency": FAKE_LLM_MAX_CONCURRENCY,
+    "retry_after": FAKE_LLM_RETRY_AFTER,
+    "bad_element_rate": FAKE_LLM_BAD_ELEMENT_RATE,
+    "throttle_first": FAKE_LLM_THROTTLE_FIRST,
+}
+stats = {"requests": 0, "ok": 0, "errors": 0, "throttled": 0, "in_flight": 0, "peak_in_flight": 0, "posts": 0}
+
+app = FastAPI(title="Fake LLM")
+
+
+def _tokens(text):
+    return len(text) // 4 + 1
+
+
+def _category(post_id):
+    digest = hashlib.md5(str(post_id).encode("utf-8")).digest()
+    return CATEGORIES[digest[0] % len(CATEGORIES)]
+
+
+def _batch_ids(prompt):
+    ids = []
+    for line in prompt.splitlines():
+        line = line.strip()
+        if line.startswith('{"id"'):
+            try:
+                ids.append(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    return ids
+
+
+def _error(status, message, error_type, headers=None):
+    return JSONResponse({"error": {"message": message, "type": error_type}}, status_code=status, headers=headers)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    if (stats["requests"] <= config["throttle_first"] or stats["in_flight"] >= config["max_concurrency"]
+            or random.random() < config["rate_limit_rate"]):
+        stats["throttled"] += 1
+        headers = {"retry-after": config["retry_after"]} if config["retry_after"] else None
+        return _error(429, "Rate limit reached", "rate_limit_exceeded", headers)
+    if random.random() < config["error_rate"]:
+        stats["errors"] += 1
+        return _error(500, "Internal server error", "server_error")
+
+    prompt = "\n".join(message.get("content", "") for message in body.get("messages", []))
+    ids = _batch_ids(prompt)
+    posts = max(1, len(ids))
+
+    stats["in_flight"] += 1
+    stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+    try:
+        latency = config["latency"] + config["latency_per_post"] * (posts - 1)
+        await asyncio.sleep(max(0.0, latency * (1 + random.uniform(-config["jitter"], config["jitter"]))))
+    finally:
+        stats["in_flight"] -= 1
+
+    if ids:
+        elements = [
+            {"id": post_id, "summary": f"Synthetic summary of post {post_id}.", "category": _category(post_id)}
+            for post_id in ids if random.random() >= config["bad_element_rate"]
+        ]
+        content = json.dumps(elements)
+    else:
+        content = json.dumps({"summary": "Synthetic summary of the post.", "category": _category(stats["requests"])})
+    stats["ok"] += 1
+    stats["posts"] += posts
+
+    prompt_tokens = _tokens(prompt)
+    completion_tokens = _tokens(content)
+    return {
+        "id": f"chatcmpl-fake-{stats['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+@app.get("/stats")
+async def get_stats():
+    return {**stats, "config": config}
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", type=float, default=config["latency"], help="Mean seconds per request")
+    parser.add_argument("--latency-per-post", type=float, default=config["latency_per_post"], help="Extra seconds per post of a batch")
+    parser.add_argument("--jitter", type=float, default=config["jitter"], help="+/- fraction of the latency")
+    parser.add_argument("--error-rate", type=float, default=config["error_rate"], help="Share of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=config["rate_limit_rate"], help="Share of requests answered with a 429")
+    parser.add_argument("--max-concurrency", type=int, default=config["max_concurrency"], help="Concurrent requests above this get a 429")
+    parser.add_argument("--retry-after", default=config["retry_after"], help="Retry-After header on 429s (empty to omit)")
+    parser.add_argument("--bad-element-rate", type=float, default=config["bad_element_rate"], help="Share of batch elements left out")
+    parser.add_argument("--throttle-first", type=int, default=config["throttle_first"], help="Answer the first N requests with a 429")
+
+
+def configure(args):
+    for key in config:
+        config[key] = getattr(args, key)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run an OpenAI-compatible fake chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    configure(args)
+    logging.info(f"Fake LLM listening on http://{args.host}:{args.port}/v1 with {config}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+
+from benchmarks import fake_llm_server
+
+# Benchmark the summarization pipeline (llm_handler.process_posts_async) against the fake
+# LLM server, started in-process unless --base-url points at a running one:
+#
+#     python -m benchmarks.llm_throughput --posts 2000 --batch-size 10 --latency 0.5 --rate-limit-rate 0.02
+
+WORDS = (
+    "city night walk friends music dance recipe kitchen workout gym travel beach sunset "
+    "coding laptop startup market review unboxing tutorial painting guitar football game "
+    "story family dog cat fashion outfit science experiment history documentary motivation"
+).split()
+
+
+def _phrase(rng, low, high):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def synthetic_posts(count, seed=42):
+    """Posts shaped like the crawled ones (see llm_handler.extract_flattened_post_data)."""
+    rng = random.Random(seed)
+    posts = []
+    for post_id in range(1, count + 1):
+        posts.append({
+            "id": post_id,
+            "title": _phrase(rng, 3, 8),
+            "slug": f"post-{post_id}",
+            "username": f"user{rng.randint(1, max(1, count // 10))}",
+            "upvote_count": rng.randint(0, 500),
+            "view_count": rng.randint(0, 50000),
+            "average_rating": rng.randint(0, 100),
+            "category": {"description": _phrase(rng, 5, 20)},
+            "post_summary": {
+                "description": _phrase(rng, 20, 120),
+                "actions": {"main_actions": [_phrase(rng, 2, 5) for _ in range(rng.randint(0, 12))]},
+                "audio_elements": {"specifics": [_phrase(rng, 1, 4) for _ in range(rng.randint(0, 6))]},
+                "emotions": {"primary_emotions": [rng.choice(WORDS) for _ in range(rng.randint(0, 5))]},
+                "entities": {"main_character": {"gender": rng.choice(["male", "female", ""])}},
+                "estimated_duration": f"{rng.randint(5, 600)} seconds",
+                "keywords": [{"keyword": rng.choice(WORDS)} for _ in range(rng.randint(0, 20))],
+                "no_of_person_in_video": rng.randint(0, 5),
+                "targeted_audiance": {"groups": [_phrase(rng, 1, 3) for _ in range(rng.randint(0, 4))]},
+                "topics_of_video": {"theme": _phrase(rng, 2, 6), "visual_storytelling": _phrase(rng, 5, 30)},
+                "visual_elements_of_video": {"notable_features": [_phrase(rng, 2, 5) for _ in range(rng.randint(0, 10))]},
+                "quality_indicators": {"marks": [rng.choice(WORDS) for _ in range(rng.randint(0, 4))]},
+                "psycological_view_of_video": {"traits": [rng.choice(WORDS) for _ in range(rng.randint(0, 4))]},
+            },
+        })
+    return posts
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server():
+    """Run the fake LLM server on a free port in a background thread; returns (server, base_url)."""
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(fake_llm_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline:
+            raise Exception("Fake LLM server did not start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}/v1"
+
+
+def run_benchmark(posts, batch_size, rpm, tpm, initial_concurrency, max_concurrency):
+    # Imported here so that the OpenAI settings below are in place first
+    import llm_handler
+    from llm_client import AdaptiveConcurrency, LLMClient
+
+    client = LLMClient(rpm=rpm, tpm=tpm, concurrency=AdaptiveConcurrency(initial_concurrency, max_concurrency))
+    start = time.perf_counter()
+    results = asyncio.run(llm_handler.process_posts_async(posts, client=client, batch_size=batch_size))
+    seconds = time.perf_counter() - start
+
+    snapshot = client.snapshot()
+    tokens = client.token_report(items=len(posts))["total"]
+    return {
+        "posts": len(posts),
+        "results": len(results),
+        "batch_size": batch_size,
+        "seconds": seconds,
+        "posts_per_sec": len(results) / seconds if seconds else None,
+        "requests": snapshot["requests"],
+        "retries": snapshot["retries"],
+        "throttled": snapshot["throttled"],
+        "errors": snapshot["errors"],
+        "latency_p50": snapshot["latency_p50"],
+        "latency_p99": snapshot["latency_p99"],
+        "concurrency_limit": snapshot["concurrency_limit"],
+        "peak_in_flight": snapshot["peak_in_flight"],
+        "prompt_tokens": tokens["prompt_tokens"],
+        "completion_tokens": tokens["completion_tokens"],
+        "prompt_tokens_per_post": tokens.get("prompt_tokens_per_item"),
+    }
+
+
+def print_report(report):
+    def fmt(value):
+        return f"{value:.3f}" if isinstance(value, float) else str(value)
+
+    for key, value in report.items():
+        if isinstance(value, dict):
+            continue
+        print(f"{key:>24}: {fmt(value)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure summarization throughput against a fake LLM server.")
+    parser.add_argument("--posts", type=int, default=1000, help="Number of synthetic posts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=None, help="Posts per request (default: LLM_BATCH_SIZE)")
+    parser.add_argument("--rpm", type=float, default=60000, help="Client requests-per-minute budget")
+    parser.add_argument("--tpm", type=float, default=50000000, help="Client tokens-per-minute budget")
+    parser.add_argument("--initial-concurrency", type=int, default=4, help="Client starting concurrency limit")
+    parser.add_argument("--client-max-concurrency", type=int, default=64, help="Client AIMD concurrency ceiling")
+    parser.add_argument("--base-url", help="Use a running OpenAI-compatible server instead of starting the fake one")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's INFO logs")
+    fake_llm_server.add_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        fake_llm_server.configure(args)
+        server, base_url = start_fake_server()
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+    from llm_handler import LLM_BATCH_SIZE
+    posts = synthetic_posts(args.posts, args.seed)
+    report = run_benchmark(
+        posts, args.batch_size or LLM_BATCH_SIZE, args.rpm, args.tpm, args.initial_concurrency, args.client_max_concurrency
+    )
+    if server is not None:
+        report["server"] = dict(fake_llm_server.stats)
+        server.should_exit = True
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        if "server" in report:
+            print(f"{'server':>24}: {report['server']}")
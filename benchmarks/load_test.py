@@ -0,0 +1,192 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+# Load generator for a running app. Replays a JSONL request log (as written by the app when
+# FEED_TRAFFIC_LOG is set, see traffic_log.py) or sends /feed requests for a synthetic,
+# Zipf-distributed user population:
+#
+#     python -m benchmarks.load_test --log feed_traffic.jsonl --concurrency 32 --rate 200
+#     python -m benchmarks.load_test --users 5000 --requests 20000 --concurrency 64
+#
+# With --rate, requests are sent on a fixed schedule and latency is measured from the time
+# each request was due, so a slow server cannot hide queueing delay (coordinated omission).
+
+DEFAULT_CATEGORIES = ["Food", "Gaming", "Travel", "Fitness", "Music", "Technology", "Comedy", "Education", "Fashion", "Finance"]
+
+
+def read_log(path):
+    """Yield (offset seconds, path, params) for every request in a JSONL traffic log."""
+    first_ts = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or "path" not in entry:
+                continue
+            ts = entry.get("ts")
+            if ts is not None and first_ts is None:
+                first_ts = ts
+            offset = ts - first_ts if ts is not None and first_ts is not None else None
+            yield offset, entry["path"], entry.get("params") or {}
+
+
+def synthetic_requests(count, users, alpha=1.0, category_rate=0.1, categories=DEFAULT_CATEGORIES, seed=42, user_ids=None):
+    """Yield /feed requests for `count` users drawn from a Zipf distribution over the user population."""
+    rng = np.random.default_rng(seed)
+    if user_ids is None:
+        user_ids = np.arange(1, users + 1)
+    weights = 1.0 / np.arange(1, len(user_ids) + 1) ** alpha
+    rng.shuffle(weights)
+    chosen = rng.choice(user_ids, size=count, p=weights / weights.sum())
+    with_category = rng.random(count) < category_rate
+    for user_id, filtered in zip(chosen, with_category):
+        params = {"userid": int(user_id)}
+        if filtered:
+            params["project_code"] = str(rng.choice(categories))
+        yield None, "/feed", params
+
+
+def user_ids_from_db():
+    """User ids that have interactions in ./data.db, so every request exercises the full path."""
+    from sqlalchemy import text
+    from database_manager import engine
+    with engine.connect() as conn:
+        return np.array([row[0] for row in conn.execute(text("SELECT DISTINCT user_id FROM user_post_interactions"))])
+
+
+async def run_load(base_url, requests, concurrency=16, rate=None, speed=None, timeout=30.0):
+    """
+    Send `requests` ((offset, path, params) tuples) with `concurrency` workers.
+
+    Args:
+        rate (float): requests per second on a fixed schedule; None sends as fast as workers allow
+        speed (float): replay logged offsets at this speed-up (1.0 = original timing); overrides rate
+
+    Returns:
+        dict: throughput, latency percentiles, status and error counts, degraded responses
+    """
+    results = []
+    status_counts = Counter()
+    errors = Counter()
+    degraded = Counter()
+    iterator = iter(enumerate(requests))
+    start = time.perf_counter()
+
+    def due_time(index, offset):
+        if speed and offset is not None:
+            return start + offset / speed
+        if rate:
+            return start + index / rate
+        return None
+
+    async def worker(client):
+        for index, (offset, path, params) in iterator:
+            due = due_time(index, offset)
+            if due is not None:
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            sent = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            finished = time.perf_counter()
+            status_counts[response.status_code] += 1
+            if response.headers.get("X-Feed-Degraded"):
+                degraded[response.headers["X-Feed-Degraded"]] += 1
+            results.append((finished - (due if due is not None else sent), response.status_code))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    latencies = np.array([latency for latency, _ in results]) * 1000
+    ok = sum(count for status, count in status_counts.items() if 200 <= status < 300)
+    report = {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "rate": rate,
+        "speed": speed,
+        "requests": len(results) + sum(errors.values()),
+        "seconds": seconds,
+        "throughput": len(results) / seconds if seconds else None,
+        "ok": ok,
+        "http_errors": len(results) - ok,
+        "transport_errors": sum(errors.values()),
+        "degraded": sum(degraded.values()),
+        "degraded_by_reason": dict(degraded),
+        "status_counts": {str(status): count for status, count in sorted(status_counts.items())},
+        "errors_by_type": dict(errors),
+    }
+    if len(latencies):
+        report.update({
+            "latency_p50_ms": float(np.percentile(latencies, 50)),
+            "latency_p90_ms": float(np.percentile(latencies, 90)),
+            "latency_p99_ms": float(np.percentile(latencies, 99)),
+            "latency_max_ms": float(latencies.max()),
+            "latency_mean_ms": float(latencies.mean()),
+        })
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s ({report['throughput'] or 0:.1f} req/s), concurrency {report['concurrency']}")
+    print(f"ok {report['ok']}, http errors {report['http_errors']}, transport errors {report['transport_errors']}, degraded {report['degraded']} {report['degraded_by_reason'] or ''}")
+    if "latency_p50_ms" in report:
+        print(f"latency p50 {report['latency_p50_ms']:.1f}ms, p90 {report['latency_p90_ms']:.1f}ms, p99 {report['latency_p99_ms']:.1f}ms, max {report['latency_max_ms']:.1f}ms")
+    print(f"status codes: {report['status_counts']}")
+    if report["errors_by_type"]:
+        print(f"errors: {report['errors_by_type']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic /feed traffic against a running app.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--log", help="JSONL traffic log to replay (see FEED_TRAFFIC_LOG)")
+    parser.add_argument("--loop", type=int, default=1, help="Replay the log this many times")
+    parser.add_argument("--requests", type=int, default=1000, help="Synthetic requests to send (without --log)")
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic user population (ids 1..N)")
+    parser.add_argument("--users-from-db", action="store_true", help="Draw synthetic users from ./data.db interactions instead")
+    parser.add_argument("--zipf-alpha", type=float, default=1.0, help="Skew of synthetic user activity")
+    parser.add_argument("--category-rate", type=float, default=0.1, help="Share of synthetic requests with a project_code")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, help="Requests per second on a fixed schedule (default: closed loop)")
+    parser.add_argument("--speed", type=float, help="Replay log timestamps at this speed-up (1.0 = as recorded)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.log:
+        entries = list(read_log(args.log))
+        if args.speed:
+            span = (entries[-1][0] or 0.0) + 1.0 if entries else 0.0
+            requests = [(None if offset is None else offset + span * loop, path, params)
+                        for loop in range(args.loop) for offset, path, params in entries]
+        else:
+            requests = entries * args.loop
+    else:
+        user_ids = user_ids_from_db() if args.users_from_db else None
+        requests = synthetic_requests(args.requests, args.users, args.zipf_alpha, args.category_rate, seed=args.seed, user_ids=user_ids)
+
+    report = asyncio.run(run_load(args.base_url, requests, args.concurrency, args.rate, args.speed, args.timeout))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
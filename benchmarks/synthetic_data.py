@@ -0,0 +1,173 @@
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from database_manager import engine, rebuild_user_post_interactions
+from models import User, Post, PostLike, PostView, PostInspire, PostRating, UpdatedPostSummary
+
+# Fill data.db in the working directory with synthetic users, posts, summaries and power-law
+# distributed interactions. Run it from a scratch directory so a real database is not touched:
+#
+#     mkdir -p /tmp/bench && cd /tmp/bench
+#     PYTHONPATH=/path/to/repo python -m benchmarks.synthetic_data --scale 100k
+
+logger = logging.getLogger(__name__)
+
+# Interaction events per scale, with users and posts sized so the matrices stay realistic
+SCALES = {
+    "10k": {"users": 1000, "posts": 500, "events": 10_000},
+    "100k": {"users": 5000, "posts": 2000, "events": 100_000},
+    "1M": {"users": 20000, "posts": 5000, "events": 1_000_000},
+}
+# Share of events per interaction table
+EVENT_MIX = {"post_views": 0.70, "post_likes": 0.15, "post_inspires": 0.05, "post_ratings": 0.10}
+# Zipf exponents of post popularity and user activity
+POST_ALPHA = 1.1
+USER_ALPHA = 0.9
+HISTORY_DAYS = 60
+CHUNK_SIZE = 20000
+
+# Category vocabularies so the summaries give TF-IDF something to separate
+TOPICS = {
+    "Food": "recipe cooking kitchen delicious pasta baking chef dinner spicy",
+    "Gaming": "game console level boss player speedrun multiplayer controller quest",
+    "Travel": "beach trip flight hotel mountains city backpack island road",
+    "Fitness": "workout gym squat cardio muscles training stretch protein run",
+    "Music": "song guitar concert beat album singer piano drums melody",
+    "Technology": "laptop coding startup gadget software robot phone chip cloud",
+    "Comedy": "prank joke sketch funny parody laugh standup meme skit",
+    "Education": "lesson lecture math history explain learn students science notes",
+    "Fashion": "outfit style dress sneakers runway designer makeup look trend",
+    "Finance": "stocks budget crypto invest savings market money trading wallet",
+}
+FILLER = "the video shows people moment day great new best watch".split()
+
+
+def _zipf_probabilities(count, alpha, rng):
+    """Zipf weights over `count` ids, shuffled so popularity does not follow id order."""
+    weights = 1.0 / np.arange(1, count + 1) ** alpha
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _insert(model, rows):
+    with engine.begin() as conn:
+        for offset in range(0, len(rows), CHUNK_SIZE):
+            conn.execute(model.__table__.insert(), rows[offset:offset + CHUNK_SIZE])
+
+
+def _timestamps(count, now, rng):
+    seconds = rng.integers(0, HISTORY_DAYS * 86400, size=count)
+    return [now - timedelta(seconds=int(s)) for s in seconds]
+
+
+def _sample_pairs(count, users, posts, user_p, post_p, rng, unique):
+    user_ids = rng.choice(users, size=count, p=user_p) + 1
+    post_ids = rng.choice(posts, size=count, p=post_p) + 1
+    if unique:
+        keys = np.unique(user_ids.astype(np.int64) * (posts + 1) + post_ids)
+        user_ids, post_ids = keys // (posts + 1), keys % (posts + 1)
+    return user_ids, post_ids
+
+
+def generate(users, posts, events, seed=42):
+    """
+    Write `users` users, `posts` posts with summaries and about `events` interaction events,
+    then rebuild user_post_interactions. Likes, inspires and ratings are deduplicated per
+    (user, post), so those tables can end up slightly smaller than their share.
+
+    Returns:
+        dict: rows written per table and seconds taken
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    categories = list(TOPICS)
+    report = {"seed": seed}
+
+    _insert(User, [
+        {"id": user_id, "username": f"user{user_id}", "first_name": "Synthetic", "last_name": f"User{user_id}",
+         "email": f"user{user_id}@example.com", "role": "user"}
+        for user_id in range(1, users + 1)
+    ])
+    report["users"] = users
+
+    post_categories = rng.choice(categories, size=posts)
+    authors = rng.integers(1, users + 1, size=posts)
+    post_rows, summary_rows = [], []
+    for index in range(posts):
+        post_id = index + 1
+        category = str(post_categories[index])
+        words = TOPICS[category].split()
+        keywords = [str(word) for word in rng.choice(words, size=4, replace=False)]
+        summary = " ".join(str(word) for word in rng.choice(words + FILLER, size=int(rng.integers(15, 40))))
+        post_rows.append({
+            "id": post_id, "title": " ".join(keywords[:2]).title(), "slug": f"post-{post_id}",
+            "username": f"user{authors[index]}", "category": {"description": category},
+            "upvote_count": int(rng.integers(0, 500)), "view_count": int(rng.integers(0, 50000)),
+            "created_at": now - timedelta(days=int(rng.integers(0, HISTORY_DAYS))),
+            "post_summary": {"description": summary, "keywords": [{"keyword": keyword} for keyword in keywords]},
+        })
+        summary_rows.append({
+            "post_id": post_id, "username": f"user{authors[index]}", "keywords": keywords,
+            "summary": summary, "category": category, "upvote_count": post_rows[-1]["upvote_count"],
+            "view_count": post_rows[-1]["view_count"],
+        })
+    _insert(Post, post_rows)
+    _insert(UpdatedPostSummary, summary_rows)
+    report["posts"] = posts
+
+    user_p = _zipf_probabilities(users, USER_ALPHA, rng)
+    post_p = _zipf_probabilities(posts, POST_ALPHA, rng)
+    tables = {
+        "post_views": (PostView, "viewed_at"),
+        "post_likes": (PostLike, "liked_at"),
+        "post_inspires": (PostInspire, "inspired_at"),
+        "post_ratings": (PostRating, "rated_at"),
+    }
+    for table, share in EVENT_MIX.items():
+        model, timestamp_field = tables[table]
+        user_ids, post_ids = _sample_pairs(int(events * share), users, posts, user_p, post_p, rng, unique=table != "post_views")
+        timestamps = _timestamps(len(user_ids), now, rng)
+        rows = [
+            {"user_id": int(u), "post_id": int(p), timestamp_field: ts}
+            for u, p, ts in zip(user_ids, post_ids, timestamps)
+        ]
+        if table == "post_ratings":
+            for row, rating in zip(rows, rng.integers(0, 101, size=len(rows))):
+                row["rating_percent"] = int(rating)
+        table_started = time.perf_counter()
+        _insert(model, rows)
+        report[table] = len(rows)
+        logger.info(f"{table}: {len(rows)} rows in {time.perf_counter() - table_started:.2f}s")
+
+    report["user_post_interactions"] = rebuild_user_post_interactions()
+    report["seconds"] = time.perf_counter() - started
+    return report
+
+
+def database_is_empty():
+    with engine.connect() as conn:
+        return not conn.execute(text("SELECT 1 FROM posts LIMIT 1")).fetchone()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill ./data.db with synthetic, power-law distributed data.")
+    parser.add_argument("--scale", choices=list(SCALES), default="10k", help="Preset number of interaction events")
+    parser.add_argument("--users", type=int, help="Override the preset's user count")
+    parser.add_argument("--posts", type=int, help="Override the preset's post count")
+    parser.add_argument("--events", type=int, help="Override the preset's event count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="Write even if data.db already holds posts")
+    args = parser.parse_args()
+
+    if not args.force and not database_is_empty():
+        parser.error("data.db already holds posts; run from a scratch directory or pass --force")
+    scale = SCALES[args.scale]
+    report = generate(args.users or scale["users"], args.posts or scale["posts"], args.events or scale["events"], args.seed)
+    print(json.dumps(report, indent=2))
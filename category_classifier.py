@@ -0,0 +1,268 @@
+import argparse
+import logging
+import os
+import random
+
+import joblib
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.model_selection import train_test_split
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+CATEGORY_MODEL_PATH = os.getenv("CATEGORY_MODEL_PATH", "category_classifier.joblib")
+# Posts whose predicted category is at least this probable skip the LLM
+CATEGORY_CONFIDENCE_THRESHOLD = float(os.getenv("CATEGORY_CONFIDENCE_THRESHOLD", "0.8"))
+# Fraction of confident posts still sent to the LLM to measure agreement
+CATEGORY_AUDIT_RATE = float(os.getenv("CATEGORY_AUDIT_RATE", "0.05"))
+CATEGORY_MIN_TRAINING_ROWS = int(os.getenv("CATEGORY_MIN_TRAINING_ROWS", "200"))
+
+# Content hashes of summaries produced by the classifier carry this prefix. They never match
+# a freshly computed hash, so these posts go through the cascade again on every run (cheap),
+# and they are left out of the training data.
+LOCAL_HASH_PREFIX = "local:"
+FAILED_SUMMARY_PREFIX = "Failed to generate summary"
+LOCAL_SUMMARY_CHARS = 400
+
+TEXT_FIELDS = ["title", "description", "post_description", "video_theme", "visual_storytelling", "emotional_conflicts"]
+LIST_FIELDS = ["keywords", "main_actions", "primary_emotions", "targeted_audience", "visual_elements", "audio_element_specifics"]
+SWEEP_THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9, 0.95]
+
+
+def classifier_text(flat_data):
+    """Text the classifier sees for a flattened post (see llm_handler.extract_flattened_post_data)."""
+    parts = [str(flat_data.get(field) or "") for field in TEXT_FIELDS]
+    for field in LIST_FIELDS:
+        values = flat_data.get(field) or []
+        if isinstance(values, list):
+            parts.extend(str(value) for value in values)
+        else:
+            parts.append(str(values))
+    return " ".join(part for part in parts if part)
+
+
+def local_summary(flat_data):
+    """
+    Extractive summary from the post's own text, or None if it has none (the post then goes
+    to the LLM). "description" is left out: it is the upstream category's description, the
+    same for every post in that category.
+    """
+    for field in ("post_description", "video_theme"):
+        text = str(flat_data.get(field) or "").strip()
+        if text:
+            if len(text) > LOCAL_SUMMARY_CHARS:
+                text = text[:LOCAL_SUMMARY_CHARS].rsplit(" ", 1)[0] + "..."
+            return text
+    return None
+
+
+class CategoryClassifier:
+    """
+    Linear category model over hashed word uni- and bigrams (HashingVectorizer +
+    logistic-loss SGDClassifier). Hashing keeps the model small and needs no vocabulary,
+    so predicting a post costs microseconds.
+    """
+
+    def __init__(self, n_features=2 ** 18):
+        self.n_features = n_features
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=(1, 2), alternate_sign=False, stop_words="english"
+        )
+        self.model = SGDClassifier(loss="log_loss", alpha=1e-5, max_iter=20, tol=None, random_state=42)
+
+    @property
+    def classes(self):
+        return self.model.classes_
+
+    def fit(self, texts, labels):
+        self.model.fit(self.vectorizer.transform(texts), labels)
+        return self
+
+    def predict_proba(self, texts):
+        return self.model.predict_proba(self.vectorizer.transform(texts))
+
+    def predict(self, texts):
+        """Return (categories, confidences) for a list of texts."""
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        return self.classes[best], proba[np.arange(len(best)), best]
+
+    def save(self, path=CATEGORY_MODEL_PATH):
+        # Only the fitted estimator is stored; the vectorizer is stateless
+        joblib.dump({"n_features": self.n_features, "model": self.model}, path)
+
+    @classmethod
+    def load(cls, path=CATEGORY_MODEL_PATH):
+        """Load a trained classifier, or return None if none has been trained."""
+        if not path or not os.path.exists(path):
+            return None
+        saved = joblib.load(path)
+        classifier = cls(saved["n_features"])
+        classifier.model = saved["model"]
+        return classifier
+
+
+def load_training_data():
+    """
+    Pair every stored LLM summary's category with the classifier text of its post.
+    Failed summaries and summaries produced by the classifier itself are left out.
+    """
+    from sqlalchemy import text
+    from database_manager import engine, load_all_posts
+    from llm_handler import extract_flattened_post_data
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT post_id, category FROM updated_post_summaries "
+            "WHERE category IS NOT NULL AND summary NOT LIKE :failed "
+            "AND (content_hash IS NULL OR content_hash NOT LIKE :local)"
+        ), {"failed": f"{FAILED_SUMMARY_PREFIX}%", "local": f"{LOCAL_HASH_PREFIX}%"}).fetchall()
+    categories = {row[0]: row[1] for row in rows}
+
+    texts, labels = [], []
+    for post in load_all_posts()["posts"]:
+        category = categories.get(post["id"])
+        if category is not None:
+            texts.append(classifier_text(extract_flattened_post_data(post)))
+            labels.append(category)
+    return texts, labels
+
+
+def threshold_sweep(labels, predicted, confidences, thresholds=SWEEP_THRESHOLDS):
+    """Coverage (share answered locally) and accuracy of the local answers at each threshold."""
+    labels = np.asarray(labels)
+    report = []
+    for threshold in thresholds:
+        confident = confidences >= threshold
+        covered = int(confident.sum())
+        report.append({
+            "threshold": threshold,
+            "coverage": covered / len(labels) if len(labels) else 0.0,
+            "accuracy": float((predicted[confident] == labels[confident]).mean()) if covered else None,
+        })
+    return report
+
+
+def train(path=CATEGORY_MODEL_PATH, holdout=0.2):
+    """
+    Train on the stored summaries, report hold-out accuracy and a threshold sweep,
+    then refit on all rows and save the model to `path`.
+
+    Raises:
+        Exception: if there are too few labelled posts or fewer than two categories
+    """
+    texts, labels = load_training_data()
+    if len(texts) < CATEGORY_MIN_TRAINING_ROWS or len(set(labels)) < 2:
+        raise Exception(
+            f"Not enough training data: {len(texts)} labelled posts in {len(set(labels))} categories "
+            f"(need {CATEGORY_MIN_TRAINING_ROWS} and at least 2 categories)"
+        )
+
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=holdout, random_state=42
+    )
+    classifier = CategoryClassifier().fit(train_texts, train_labels)
+    predicted, confidences = classifier.predict(test_texts)
+    report = {
+        "rows": len(texts),
+        "categories": len(set(labels)),
+        "holdout_accuracy": float((predicted == np.asarray(test_labels)).mean()),
+        "sweep": threshold_sweep(test_labels, predicted, confidences),
+    }
+
+    CategoryClassifier().fit(texts, labels).save(path)
+    logger.info(f"Trained category classifier on {len(texts)} posts, saved to {path}")
+    return report
+
+
+class CategoryCascade:
+    """
+    Routes posts between the local classifier and the LLM. Posts predicted with at least
+    `threshold` confidence (and with text of their own to summarize) are answered locally;
+    `audit_rate` of them are still sent to the LLM so agreement can be measured. For
+    posts that go to the LLM, the classifier's guess is compared with the LLM's category.
+    """
+
+    def __init__(self, classifier, threshold=CATEGORY_CONFIDENCE_THRESHOLD, audit_rate=CATEGORY_AUDIT_RATE, seed=None):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self._random = random.Random(seed)
+        self.stats = {
+            "seen": 0,
+            "local": 0,
+            "audited": 0,
+            "audit_checked": 0,
+            "audit_agree": 0,
+            "uncertain": 0,
+            "uncertain_checked": 0,
+            "uncertain_agree": 0,
+        }
+
+    @classmethod
+    def load(cls, path=CATEGORY_MODEL_PATH, **kwargs):
+        """Cascade around the trained classifier at `path`, or None if none has been trained."""
+        classifier = CategoryClassifier.load(path)
+        if classifier is None:
+            return None
+        logger.info(f"Category cascade enabled (model {path}, threshold {kwargs.get('threshold', CATEGORY_CONFIDENCE_THRESHOLD)})")
+        return cls(classifier, **kwargs)
+
+    def route(self, flat_data):
+        """
+        Decide how a flattened post is categorized.
+
+        Returns:
+            dict: "local" (bool), "category", "confidence", "audit" (bool) and, for local
+                answers, "summary"
+        """
+        self.stats["seen"] += 1
+        categories, confidences = self.classifier.predict([classifier_text(flat_data)])
+        decision = {"local": False, "category": str(categories[0]), "confidence": float(confidences[0]), "audit": False}
+        summary = local_summary(flat_data)
+        if decision["confidence"] < self.threshold or summary is None:
+            self.stats["uncertain"] += 1
+        elif self._random.random() < self.audit_rate:
+            decision["audit"] = True
+            self.stats["audited"] += 1
+        else:
+            decision["local"] = True
+            decision["summary"] = summary
+            self.stats["local"] += 1
+        return decision
+
+    def record(self, decision, llm_category):
+        """Compare the classifier's guess for a post sent to the LLM with the LLM's answer."""
+        kind = "audit" if decision["audit"] else "uncertain"
+        self.stats[f"{kind}_checked"] += 1
+        self.stats[f"{kind}_agree"] += decision["category"] == llm_category
+
+    def snapshot(self):
+        stats = self.stats
+        return {
+            **stats,
+            "threshold": self.threshold,
+            "hit_rate": stats["local"] / stats["seen"] if stats["seen"] else None,
+            "audit_agreement": stats["audit_agree"] / stats["audit_checked"] if stats["audit_checked"] else None,
+            "uncertain_agreement": stats["uncertain_agree"] / stats["uncertain_checked"] if stats["uncertain_checked"] else None,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local category classifier used to skip LLM calls.")
+    parser.add_argument("--model", default=CATEGORY_MODEL_PATH, help="Where to save the model (default: CATEGORY_MODEL_PATH)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of posts held out for the report")
+    args = parser.parse_args()
+    report = train(args.model, args.holdout)
+    print(f"Trained on {report['rows']} posts in {report['categories']} categories, hold-out accuracy {report['holdout_accuracy']:.3f}")
+    print("threshold  coverage  accuracy")
+    for row in report["sweep"]:
+        accuracy = f"{row['accuracy']:.3f}" if row["accuracy"] is not None else "-"
+        print(f"{row['threshold']:>9.2f}  {row['coverage']:>8.3f}  {accuracy:>8}")
@@ -1,442 +1,978 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-import requests
+from datetime import datetime, timedelta
+import argparse
+import time
+import httpx
 import logging
-from models import Base, User, Post, PostView, PostLike, PostInspire, PostRating, UpdatedPostSummary
+import numpy as np
+from models import Base, User, Post, PostView, PostLike, PostInspire, PostRating, UpdatedPostSummary, SyncState
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+from http_client import get_sync_client
+from upstream import iter_pages_sync, UpstreamError
+from metrics import INGEST_ROWS, INGEST_SECONDS, INGEST_ROWS_PER_SECOND
+
+load_dotenv()
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Ingestion settings
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "5000"))
+INGEST_LOG_EVERY = int(os.getenv("INGEST_LOG_EVERY", "20"))  # log progress every N chunks
+INGEST_QUEUE_PAGES = int(os.getenv("INGEST_QUEUE_PAGES", "4"))  # pages buffered between crawler and writer
+COLUMNAR_FETCH_SIZE = int(os.getenv("COLUMNAR_FETCH_SIZE", "50000"))  # rows per fetchmany in columnar loaders
+
+# Upstream API settings for direct ingestion
+API_BASE_URL = os.getenv("API_BASE_URL")
+FLIC_TOKEN = os.getenv("FLIC_TOKEN")
+PAGE_SIZE = os.getenv("PAGE_SIZE")
+RESONANCE_ALGORITHM = os.getenv("RESONANCE_ALGORITHM")
+
+# SQLite performance profile
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+
+# post_views retention: raw views older than the horizon are rolled up into post_view_rollups
+VIEW_RETENTION_DAYS = float(os.getenv("VIEW_RETENTION_DAYS", "90"))
+COMPACTION_BATCH_SIZE = int(os.getenv("COMPACTION_BATCH_SIZE", "10000"))  # id range per compaction transaction
+COMPACTION_PAUSE = float(os.getenv("COMPACTION_PAUSE", "0.05"))  # seconds between batches, leaves room for writers
+COMPACTION_VACUUM_PAGES = int(os.getenv("COMPACTION_VACUUM_PAGES", "2000"))  # free pages released per batch
+
 # Create SQLite database
-engine = create_engine('sqlite:///data.db', echo=True)
+engine = create_engine('sqlite:///data.db', echo=SQL_ECHO)
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets model rebuilds and feed hydration read while ingestion writes;
+    synchronous=NORMAL is durable under WAL and avoids an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    # Only takes effect on a new database (or after VACUUM); lets compaction hand pages back
+    cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 # Create tables
 Base.metadata.create_all(engine)
 
-def fetch_post_likes_ids():
-    """Fetch user_id and post_id for all post likes from the database."""
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        likes = session.query(PostLike.user_id, PostLike.post_id).all()
-        data = {
-            "likes": [
-                {
-                    "user_id": like.user_id,
-                    "post_id": like.post_id
-                }
-                for like in likes
-            ]
-        }
-        return data
-    finally:
-        session.close()
-
-def fetch_post_views_ids():
-    """Fetch user_id and post_id for all post views from the database."""
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        views = session.query(PostView.user_id, PostView.post_id).all()
-        data = {
-            "views": [
-                {
-                    "user_id": view.user_id,
-                    "post_id": view.post_id
-                }
-                for view in views
-            ]
-        }
-        return data
-    finally:
-        session.close()
-
-def fetch_post_inspires_ids():
-    """Fetch user_id and post_id for all post inspires from the database."""
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        inspires = session.query(PostInspire.user_id, PostInspire.post_id).all()
-        data = {
-            "inspires": [
-                {
-                    "user_id": inspire.user_id,
-                    "post_id": inspire.post_id
-                }
-                for inspire in inspires
-            ]
-        }
-        return data
-    finally:
-        session.close()
+# Interaction weights, shared by the user_post_interactions aggregate and the recommendation engine
+LIKE_WEIGHT = 1.0
+VIEW_WEIGHT = 0.5
+INSPIRE_WEIGHT = 1.5
+RATING_THRESHOLD = 50  # Ratings above this are positive and add rating_percent / 100
+
+def _weight_params():
+    return {
+        "like_weight": LIKE_WEIGHT, "view_weight": VIEW_WEIGHT,
+        "inspire_weight": INSPIRE_WEIGHT, "rating_threshold": RATING_THRESHOLD,
+    }
+
+# Event tables that feed user_post_interactions
+AGGREGATED_TABLES = ("post_likes", "post_views", "post_inspires", "post_ratings")
+
+_WEIGHT_SQL = (
+    "like_count * :like_weight + view_count * :view_weight + inspire_count * :inspire_weight"
+    " + CASE WHEN rating_percent > :rating_threshold THEN rating_percent / 100.0 ELSE 0 END"
+)
+
+_UPSERT_INTERACTION_SQL = (
+    " ON CONFLICT (user_id, post_id) DO UPDATE SET"
+    " weight = excluded.weight, like_count = excluded.like_count, view_count = excluded.view_count,"
+    " inspire_count = excluded.inspire_count, rating_count = excluded.rating_count,"
+    " rating_percent = excluded.rating_percent, last_event_at = excluded.last_event_at"
+)
+
+_INTERACTION_COLUMNS_SQL = (
+    "user_post_interactions (user_id, post_id, like_count, view_count, inspire_count,"
+    " rating_count, rating_percent, last_event_at, weight)"
+)
+
+# Recompute one (user, post) pair from the raw event tables (plus compacted views); idempotent, so re-ingesting is safe
+_REFRESH_PAIR_SQL = text(
+    f"INSERT INTO {_INTERACTION_COLUMNS_SQL} "
+    f"SELECT user_id, post_id, like_count, view_count, inspire_count, rating_count, rating_percent, last_event_at, "
+    f"{_WEIGHT_SQL} FROM ("
+    "SELECT :user_id AS user_id, :post_id AS post_id,"
+    " (SELECT COUNT(*) FROM post_likes WHERE user_id = :user_id AND post_id = :post_id) AS like_count,"
+    " (SELECT COUNT(*) FROM post_views WHERE user_id = :user_id AND post_id = :post_id)"
+    " + COALESCE((SELECT view_count FROM post_view_rollups WHERE user_id = :user_id AND post_id = :post_id), 0) AS view_count,"
+    " (SELECT COUNT(*) FROM post_inspires WHERE user_id = :user_id AND post_id = :post_id) AS inspire_count,"
+    " (SELECT COUNT(*) FROM post_ratings WHERE user_id = :user_id AND post_id = :post_id) AS rating_count,"
+    " (SELECT MAX(rating_percent) FROM post_ratings WHERE user_id = :user_id AND post_id = :post_id) AS rating_percent,"
+    " (SELECT MAX(event_at) FROM ("
+    "SELECT MAX(liked_at) AS event_at FROM post_likes WHERE user_id = :user_id AND post_id = :post_id"
+    " UNION ALL SELECT MAX(viewed_at) FROM post_views WHERE user_id = :user_id AND post_id = :post_id"
+    " UNION ALL SELECT last_viewed_at FROM post_view_rollups WHERE user_id = :user_id AND post_id = :post_id"
+    " UNION ALL SELECT MAX(inspired_at) FROM post_inspires WHERE user_id = :user_id AND post_id = :post_id"
+    " UNION ALL SELECT MAX(rated_at) FROM post_ratings WHERE user_id = :user_id AND post_id = :post_id"
+    ")) AS last_event_at"
+    ") WHERE 1" + _UPSERT_INTERACTION_SQL
+)
+
+# Rebuild the whole aggregate with one set-based pass over the raw event tables
+_REBUILD_INTERACTIONS_SQL = text(
+    f"INSERT INTO {_INTERACTION_COLUMNS_SQL} "
+    f"SELECT user_id, post_id, like_count, view_count, inspire_count, rating_count, rating_percent, last_event_at, "
+    f"{_WEIGHT_SQL} FROM ("
+    "SELECT user_id, post_id, SUM(is_like) AS like_count, SUM(is_view) AS view_count,"
+    " SUM(is_inspire) AS inspire_count, SUM(is_rating) AS rating_count,"
+    " MAX(rating_percent) AS rating_percent, MAX(event_at) AS last_event_at FROM ("
+    "SELECT user_id, post_id, 1 AS is_like, 0 AS is_view, 0 AS is_inspire, 0 AS is_rating,"
+    " NULL AS rating_percent, liked_at AS event_at FROM post_likes"
+    " UNION ALL SELECT user_id, post_id, 0, 1, 0, 0, NULL, viewed_at FROM post_views"
+    " UNION ALL SELECT user_id, post_id, 0, view_count, 0, 0, NULL, last_viewed_at FROM post_view_rollups"
+    " UNION ALL SELECT user_id, post_id, 0, 0, 1, 0, NULL, inspired_at FROM post_inspires"
+    " UNION ALL SELECT user_id, post_id, 0, 0, 0, 1, rating_percent, rated_at FROM post_ratings"
+    ") GROUP BY user_id, post_id"
+    ") WHERE 1" + _UPSERT_INTERACTION_SQL
+)
+
+def refresh_user_post_interactions(conn, rows):
+    """
+    Recompute the aggregate for every (user, post) pair in `rows` on connection `conn`.
+    Called inside the same transaction that wrote the raw events.
+    """
+    pairs = {(row["user_id"], row["post_id"]) for row in rows}
+    params = _weight_params()
+    conn.execute(_REFRESH_PAIR_SQL, [{"user_id": user_id, "post_id": post_id, **params} for user_id, post_id in pairs])
+    return len(pairs)
+
+def rebuild_user_post_interactions():
+    """Recompute user_post_interactions from scratch from the raw event tables and view rollups."""
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM user_post_interactions"))
+        conn.execute(_REBUILD_INTERACTIONS_SQL, _weight_params())
+        pairs = conn.execute(text("SELECT COUNT(*) FROM user_post_interactions")).scalar()
+    logger.info(f"Rebuilt user_post_interactions: {pairs} pairs in {time.perf_counter() - started:.2f}s")
+    return pairs
+
+def migrate_db(dry_run=False):
+    """
+    Bring an existing database up to the current schema: add missing columns, create any interaction indexes
+    that are missing, removing duplicate (user, post) rows first where the index is unique
+    (the most recent row by id is kept), and backfill user_post_interactions.
 
-def fetch_post_ratings_ids_and_rating():
-    """Fetch user_id, post_id, and rating_percent for all post ratings from the database."""
-    Session = sessionmaker(bind=engine)
-    session = Session()
-    try:
-        ratings = session.query(PostRating.user_id, PostRating.post_id, PostRating.rating_percent).all()
-        data = {
-            "ratings": [
-                {
-                    "user_id": rating.user_id,
-                    "post_id": rating.post_id,
-                    "rating_percent": float(rating.rating_percent) if rating.rating_percent else 0.0
-                }
-                for rating in ratings
-            ]
-        }
-        return data
-    finally:
-        session.close()
+    Not run on import: it can delete rows, so it is an explicit step (`python database_manager.py --migrate`).
+    With `dry_run`, nothing is changed and only the pending steps are returned.
 
-def fetch_and_store_users(api_endpoint="http://localhost:8000/users/get_all"):
+    Returns:
+        list: descriptions of the steps that were (or, with dry_run, would be) applied
     """
-    Fetch user data from API endpoint and store it in the database.
-    Stops and raises an exception on the first failure.
+    steps = []
+    inspector = inspect(engine)
+    # Columns added after the first release
+    for model, column_name in ((UpdatedPostSummary, "content_hash"),):
+        table = model.__table__
+        if column_name not in {column["name"] for column in inspector.get_columns(table.name)}:
+            steps.append(f"add column {column_name} to {table.name}")
+            if dry_run:
+                continue
+            column = table.columns[column_name]
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_name} {column.type.compile(engine.dialect)}"))
+            logger.info(f"Added column {column_name} to {table.name}")
+
+    for model in (PostView, PostLike, PostInspire, PostRating):
+        table = model.__table__
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            duplicates_sql = (
+                f"FROM {table.name} WHERE id NOT IN "
+                f"(SELECT MAX(id) FROM {table.name} GROUP BY user_id, post_id)"
+            )
+            duplicates = 0
+            if index.unique:
+                with engine.connect() as conn:
+                    duplicates = conn.execute(text(f"SELECT COUNT(*) {duplicates_sql}")).scalar()
+            steps.append(
+                f"create index {index.name} on {table.name}"
+                + (f" after deleting {duplicates} duplicate (user, post) rows" if duplicates else "")
+            )
+            if dry_run:
+                continue
+            with engine.begin() as conn:
+                if duplicates:
+                    logger.warning(
+                        f"Deleting {duplicates} duplicate (user, post) rows from {table.name} "
+                        f"(keeping the most recent row per pair) before creating unique index {index.name}"
+                    )
+                    removed = conn.execute(text(f"DELETE {duplicates_sql}")).rowcount
+                    logger.info(f"Removed {removed} duplicate (user, post) rows from {table.name}")
+                index.create(conn)
+            logger.info(f"Created index {index.name} on {table.name}")
+
+    # Backfill the interaction aggregate for databases populated before it existed
+    with engine.connect() as conn:
+        aggregate_empty = conn.execute(text("SELECT 1 FROM user_post_interactions LIMIT 1")).first() is None
+        has_events = any(
+            conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is not None
+            for table in AGGREGATED_TABLES + ("post_view_rollups",)
+        )
+    if aggregate_empty and has_events:
+        steps.append("rebuild user_post_interactions")
+        if not dry_run:
+            rebuild_user_post_interactions()
+    return steps
+
+def warn_pending_migrations():
+    """Log any schema migrations the database still needs. Returns the pending steps."""
+    pending = migrate_db(dry_run=True)
+    if pending:
+        logger.warning(
+            f"Database needs migrating ({'; '.join(pending)}). "
+            f"Run `python database_manager.py --migrate` (add --dry-run to only list the steps)."
+        )
+    return pending
+
+# Last ETag seen per ingestion endpoint, sent back as If-None-Match on the next fetch
+_endpoint_etags = {}
+
+def _get_json(api_endpoint):
+    """
+    GET a JSON document from an ingestion endpoint over the shared pooled HTTP client.
+    Returns (data, etag); data is None when the endpoint answers 304 Not Modified for the
+    ETag we last stored. The caller records the new ETag once the data has been written.
     """
-    logger.info(f"Fetching users from {api_endpoint}")
+    headers = {}
+    if api_endpoint in _endpoint_etags:
+        headers["If-None-Match"] = _endpoint_etags[api_endpoint]
+    response = get_sync_client().get(api_endpoint, headers=headers, timeout=100)
+    if response.status_code == 304:
+        return None, _endpoint_etags[api_endpoint]
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
+
+# Bulk ingestion
+def _parse_datetime(value, field, label):
+    """Parse an API timestamp string ("%Y-%m-%d %H:%M:%S"), logging and returning None when invalid."""
+    if not value:
+        return None
     try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch users from API: {str(e)}")
-        raise Exception(f"API request failed: {str(e)}")
-
-    if 'users' not in data:
-        logger.error("API response does not contain 'users' key")
-        raise Exception("API response missing 'users' key")
-
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
+        # fromisoformat parses this fixed layout an order of magnitude faster than strptime
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Invalid {field} format for {label}: {str(e)}")
+        return None
+
+def _convert_user(user_data):
+    user_data['last_login'] = _parse_datetime(
+        user_data.get('last_login'), 'last_login', f"user {user_data.get('username')}"
+    )
+    # Handle instagram_url
     try:
-        for i, user_data in enumerate(data['users']):
-            logger.info(f"Processing user {i+1}: {user_data.get('username', 'unknown')}")
-            # Convert last_login
-            if user_data.get('last_login'):
-                try:
-                    user_data['last_login'] = datetime.strptime(
-                        user_data['last_login'], "%Y-%m-%d %H:%M:%S"
-                    )
-                except ValueError as e:
-                    logger.warning(f"Invalid last_login format for user {user_data.get('username')}: {str(e)}")
-                    user_data['last_login'] = None
-            else:
-                user_data['last_login'] = None
-
-            # Handle instagram_url
-            try:
-                user_data['instagram_url'] = user_data['instagram-url']
-                del user_data['instagram-url']
-            except KeyError as e:
-                logger.error(f"Missing 'instagram-url' for user {user_data.get('username')}")
-                raise Exception(f"KeyError in user data: {str(e)}")
-
-            # Create and merge user
-            try:
-                user = User(**user_data)
-                session.merge(user)
-            except Exception as e:
-                logger.error(f"Failed to create/merge user {user_data.get('username')}: {str(e)}")
-                raise Exception(f"User creation failed: {str(e)}")
+        user_data['instagram_url'] = user_data.pop('instagram-url')
+    except KeyError as e:
+        logger.error(f"Missing 'instagram-url' for user {user_data.get('username')}")
+        raise Exception(f"KeyError in user data: {str(e)}")
+    return user_data
+
+def _convert_post(post_data):
+    # created_at arrives as epoch milliseconds
+    if post_data.get('created_at'):
+        try:
+            post_data['created_at'] = datetime.fromtimestamp(post_data['created_at'] / 1000.0)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid created_at for post {post_data.get('title')}: {str(e)}")
+            post_data['created_at'] = None
+    else:
+        post_data['created_at'] = None
+    return post_data
+
+def _interaction_converter(timestamp_field, label):
+    def convert(row):
+        row[timestamp_field] = _parse_datetime(
+            row.get(timestamp_field), timestamp_field, f"{label} {row.get('post_id')}"
+        )
+        return row
+    return convert
+
+def _convert_summary(post_data):
+    # Validate required fields
+    for field in ['id', 'username', 'summary', 'category']:
+        if field not in post_data or post_data[field] is None:
+            logger.error(f"Missing or null required field '{field}' for post {post_data.get('id')}")
+            raise Exception(f"Missing required field: {field}")
+    return {
+        'post_id': post_data.get('id'),
+        'upvote_count': post_data.get('upvote_count', 0),
+        'view_count': post_data.get('view_count', 0),
+        'average_rating': post_data.get('average_rating', 0.0),
+        'username': post_data.get('username'),
+        'keywords': post_data.get('keywords', []),
+        'no_of_person_in_video': post_data.get('no_of_person_in_video', 0),
+        'estimated_duration': post_data.get('estimated_duration', ''),
+        'main_character_gender': post_data.get('main_character_gender', ''),
+        'summary': post_data.get('summary'),
+        'category': post_data.get('category'),
+        'content_hash': post_data.get('content_hash')
+    }
+
+# Per-table ingestion settings: model, row converter, the conflict target used for upserts and,
+# for crawled tables, the local endpoint, response key, high-watermark column for incremental sync,
+# and the upstream API path (auth tables need the Flic token, the others the resonance algorithm)
+INGEST_TABLES = {
+    "users": {
+        "model": User, "convert": _convert_user, "conflict": ("id",),
+        "endpoint": "http://localhost:8000/users/get_all", "key": "users", "watermark": "id",
+        "upstream_path": "/users/get_all", "auth": True
+    },
+    "posts": {
+        "model": Post, "convert": _convert_post, "conflict": ("id",),
+        "endpoint": "http://localhost:8000/posts/summary/get", "key": "posts", "watermark": "created_at",
+        "upstream_path": "/posts/summary/get", "auth": True
+    },
+    "post_views": {
+        "model": PostView, "convert": _interaction_converter("viewed_at", "post view"), "conflict": ("id",),
+        "endpoint": "http://localhost:8000/posts/view", "key": "posts", "watermark": "viewed_at",
+        "upstream_path": "/posts/view", "auth": False
+    },
+    "post_likes": {
+        "model": PostLike, "convert": _interaction_converter("liked_at", "post like"), "conflict": ("user_id", "post_id"),
+        "endpoint": "http://localhost:8000/posts/like", "key": "posts", "watermark": "liked_at",
+        "upstream_path": "/posts/like", "auth": False
+    },
+    "post_inspires": {
+        "model": PostInspire, "convert": _interaction_converter("inspired_at", "post inspire"), "conflict": ("user_id", "post_id"),
+        "endpoint": "http://localhost:8000/posts/inspire", "key": "posts", "watermark": "inspired_at",
+        "upstream_path": "/posts/inspire", "auth": False
+    },
+    "post_ratings": {
+        "model": PostRating, "convert": _interaction_converter("rated_at", "post rating"), "conflict": ("user_id", "post_id"),
+        "endpoint": "http://localhost:8000/posts/rating", "key": "posts", "watermark": "rated_at",
+        "upstream_path": "/posts/rating", "auth": False
+    },
+    "updated_post_summaries": {"model": UpdatedPostSummary, "convert": _convert_summary, "conflict": ("post_id",), "keep_ids": False},
+}
+
+# Tables crawled from the API, in population order
+SYNC_TABLES = ["users", "posts", "post_views", "post_likes", "post_inspires", "post_ratings"]
+
+def _column_defaults(model, include_id):
+    """Map every column to the value used when a row omits it (the column's scalar default, else None)."""
+    defaults = {}
+    for column in model.__table__.columns:
+        if column.name == 'id' and not include_id:
+            continue
+        default = column.default
+        defaults[column.name] = default.arg if default is not None and default.is_scalar else None
+    return defaults
+
+def prepare_rows(table, rows):
+    """
+    Validate and convert a whole page of API rows in one pass.
+    Every returned dict has the same keys, as required for an executemany insert.
+    """
+    spec = INGEST_TABLES[table]
+    defaults = _column_defaults(spec["model"], include_id=spec.get("keep_ids", True))
+    prepared = []
+    for row in rows:
+        data = spec["convert"](dict(row))
+        unknown = data.keys() - defaults.keys()
+        if unknown:
+            logger.error(f"Unexpected fields {sorted(unknown)} in {table} row {data.get('id')}")
+            raise Exception(f"Row conversion failed for {table}: unexpected fields {sorted(unknown)}")
+        prepared.append({name: data.get(name, default) for name, default in defaults.items()})
+    return prepared
+
+def _assign_local_ids(conn, table, rows):
+    """
+    Give locally recorded rows (POST /events) ids below zero, counting down from the lowest id
+    in `table`. Upstream ids are positive, so a later crawl can never collide with them.
+    """
+    lowest = conn.execute(text(f"SELECT MIN(MIN(id), 0) FROM {table}")).scalar() or 0
+    return [{**row, "id": lowest - offset} for offset, row in enumerate(rows, start=1)]
 
-        # Commit transaction
+def bulk_upsert(table, rows, chunk_size=INGEST_CHUNK_SIZE, local_ids=False):
+    """
+    Write prepared rows with executemany INSERT ... ON CONFLICT DO UPDATE, one transaction per chunk.
+    For event tables, the affected user_post_interactions pairs are recomputed in the same transaction.
+    Views older than the last compaction cutoff are skipped, since they are already in post_view_rollups.
+    With `local_ids`, rows get negative ids (see _assign_local_ids) inside the chunk's transaction.
+    
+    Returns:
+        dict: rows written, elapsed seconds and rows/sec
+    """
+    spec = INGEST_TABLES[table]
+    started = time.perf_counter()
+    if table == "post_views":
+        rows = _drop_compacted_views(rows)
+    if not rows:
+        return {"table": table, "rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    insert = sqlite_insert(spec["model"].__table__)
+    stmt = insert.on_conflict_do_update(
+        index_elements=list(spec["conflict"]),
+        set_={name: insert.excluded[name] for name in rows[0] if name not in spec["conflict"] and name != "id"}
+    )
+    written = 0
+    for chunk_number, offset in enumerate(range(0, len(rows), chunk_size), start=1):
+        chunk = rows[offset:offset + chunk_size]
         try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['users'])} users")
+            with engine.begin() as conn:
+                if local_ids:
+                    chunk = _assign_local_ids(conn, table, chunk)
+                conn.execute(stmt, chunk)
+                if table in AGGREGATED_TABLES:
+                    refresh_user_post_interactions(conn, chunk)
         except Exception as e:
-            logger.error(f"Failed to commit users to database: {str(e)}")
+            logger.error(f"Failed to upsert {table} rows {offset}-{offset + len(chunk)}: {str(e)}")
             raise Exception(f"Database commit failed: {str(e)}")
+        written += len(chunk)
+        if chunk_number % INGEST_LOG_EVERY == 0:
+            logger.info(f"{table}: {written}/{len(rows)} rows written")
+
+    seconds = time.perf_counter() - started
+    rows_per_sec = written / seconds if seconds else 0.0
+    INGEST_ROWS.inc(written, table=table)
+    INGEST_SECONDS.inc(seconds, table=table)
+    INGEST_ROWS_PER_SECOND.set(rows_per_sec, table=table)
+    return {"table": table, "rows": written, "seconds": seconds, "rows_per_sec": rows_per_sec}
+
+def ingest_rows(table, rows):
+    """Validate, convert and bulk-upsert a list of API rows into `table`, logging throughput."""
+    stats = bulk_upsert(table, prepare_rows(table, rows))
+    _log_ingest_stats(stats)
+    return stats
+
+def _log_ingest_stats(stats):
+    logger.info(
+        f"Successfully added/updated {stats['rows']} {stats['table']} rows "
+        f"in {stats['seconds']:.2f}s ({stats['rows_per_sec']:.0f} rows/sec)"
+    )
+
+# Columnar loaders: (column name, dtype, SQL expression) per interaction table.
+# Timestamps are epoch seconds, 0 when missing.
+INTERACTION_COLUMNS = {
+    "post_likes": [("user_id", np.int32, "user_id"), ("post_id", np.int32, "post_id")],
+    "post_views": [("user_id", np.int32, "user_id"), ("post_id", np.int32, "post_id")],
+    "post_inspires": [("user_id", np.int32, "user_id"), ("post_id", np.int32, "post_id")],
+    "post_ratings": [
+        ("user_id", np.int32, "user_id"), ("post_id", np.int32, "post_id"),
+        ("rating_percent", np.float32, "COALESCE(rating_percent, 0)")
+    ],
+    "user_post_interactions": [
+        ("user_id", np.int32, "user_id"), ("post_id", np.int32, "post_id"), ("weight", np.float32, "weight")
+    ],
+}
+INTERACTION_TIMESTAMPS = {
+    "post_likes": "liked_at",
+    "post_views": "viewed_at",
+    "post_inspires": "inspired_at",
+    "post_ratings": "rated_at",
+    "user_post_interactions": "last_event_at",
+}
+
+def load_interaction_columns(table, with_timestamps=False, with_ids=False, after_id=None, before_id=None):
+    """
+    Load an interaction table as typed NumPy columns (int32 ids, float32 ratings and,
+    optionally, int64 epoch-second timestamps under "timestamp" and int64 row ids under "id").
 
+    Rows are streamed from a raw DBAPI cursor with fetchmany straight into preallocated
+    arrays, so no per-row Python dicts or ORM objects are created. With `after_id`, only
+    rows whose id is greater are loaded, plus, with `before_id`, the locally assigned
+    (negative) ids below it.
+    """
+    columns = list(INTERACTION_COLUMNS[table])
+    if with_timestamps:
+        columns.append(("timestamp", np.int64, f"COALESCE(CAST(strftime('%s', {INTERACTION_TIMESTAMPS[table]}) AS INTEGER), 0)"))
+    if with_ids:
+        columns.append(("id", np.int64, "id"))
+    where, params = ("WHERE id > ?", (after_id,)) if after_id is not None else ("", ())
+    if before_id is not None:
+        where, params = (f"{where} OR id < ?" if where else "WHERE id < ?"), params + (before_id,)
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        capacity = cursor.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+        arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype, _ in columns}
+        order = "ORDER BY id" if with_ids else ""
+        cursor.execute(f"SELECT {', '.join(expr for _, _, expr in columns)} FROM {table} {where} {order}", params)
+        size = 0
+        while True:
+            rows = cursor.fetchmany(COLUMNAR_FETCH_SIZE)
+            if not rows:
+                break
+            end = size + len(rows)
+            if end > capacity:
+                # Rows were inserted between the COUNT and the SELECT
+                capacity = max(end, capacity * 2)
+                for name in arrays:
+                    arrays[name] = np.resize(arrays[name], capacity)
+            for i, (name, dtype, _) in enumerate(columns):
+                arrays[name][size:end] = np.fromiter((row[i] for row in rows), dtype=dtype, count=len(rows))
+            size = end
+        cursor.close()
     finally:
-        session.close()
-        logger.info("Database session closed")
+        raw.close()
+    return {name: array[:size] for name, array in arrays.items()}
 
-def fetch_and_store_posts(api_endpoint="http://localhost:8000/posts/summary/get"):
+def load_interaction_weights(pairs, chunk_size=400):
     """
-    Fetch post data from API endpoint and store it in the database.
-    Stops and raises an exception on the first failure.
+    Read the current user_post_interactions weight of each (user_id, post_id) in `pairs`.
+    Returns NumPy columns like load_interaction_columns; pairs without a row are omitted.
     """
-    logger.info(f"Fetching posts from {api_endpoint}")
-    try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch posts from API: {str(e)}")
-        raise Exception(f"API request failed: {str(e)}")
-
-    if 'posts' not in data:
-        logger.error("API response does not contain 'posts' key")
-        raise Exception("API response missing 'posts' key")
-
+    pairs = list(pairs)
+    found = []
+    with engine.connect() as conn:
+        for offset in range(0, len(pairs), chunk_size):
+            chunk = pairs[offset:offset + chunk_size]
+            values = ", ".join(f"(:u{i}, :p{i})" for i in range(len(chunk)))
+            params = {}
+            for i, (user_id, post_id) in enumerate(chunk):
+                params[f"u{i}"] = user_id
+                params[f"p{i}"] = post_id
+            found.extend(conn.execute(text(
+                f"SELECT user_id, post_id, weight FROM user_post_interactions WHERE (user_id, post_id) IN (VALUES {values})"
+            ), params).fetchall())
+    return {
+        "user_id": np.fromiter((row[0] for row in found), dtype=np.int32, count=len(found)),
+        "post_id": np.fromiter((row[1] for row in found), dtype=np.int32, count=len(found)),
+        "weight": np.fromiter((row[2] for row in found), dtype=np.float32, count=len(found)),
+    }
+
+def _encode_watermark(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else str(value)
+
+def _decode_watermark(column, value):
+    if value is None:
+        return None
+    return int(value) if column == 'id' else datetime.fromisoformat(value)
+
+def load_sync_state(table):
+    """Return the stored sync state for `table` as a dict, or None if it has never been synced."""
     Session = sessionmaker(bind=engine)
     session = Session()
-
     try:
-        for i, post_data in enumerate(data['posts']):
-            logger.info(f"Processing post {i+1}: {post_data.get('title', 'unknown')}")
-            # Convert created_at
-            if post_data.get('created_at'):
-                try:
-                    post_data['created_at'] = datetime.fromtimestamp(
-                        post_data['created_at'] / 1000.0
-                    )
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Invalid created_at for post {post_data.get('title')}: {str(e)}")
-                    post_data['created_at'] = None
-            else:
-                post_data['created_at'] = None
-
-            # Create and merge post
-            try:
-                post = Post(**post_data)
-                session.merge(post)
-            except Exception as e:
-                logger.error(f"Failed to create/merge post {post_data.get('title')}: {str(e)}")
-                raise Exception(f"Post creation failed: {str(e)}")
-
-        # Commit transaction
-        try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['posts'])} posts")
-        except Exception as e:
-            logger.error(f"Failed to commit posts to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
-
+        state = session.get(SyncState, table)
+        if state is None:
+            return None
+        return {
+            "watermark_column": state.watermark_column,
+            "watermark": _decode_watermark(state.watermark_column, state.watermark),
+            "last_page": state.last_page or 1,
+            "etag": state.etag,
+            "updated_at": state.updated_at
+        }
     finally:
         session.close()
-        logger.info("Database session closed")
 
-def fetch_and_store_post_views(api_endpoint="http://localhost:8000/posts/view"):
+def save_sync_state(table, watermark, last_page, etag):
+    """Upsert the high-watermark, last crawled page and ETag for `table`."""
+    column = INGEST_TABLES[table]["watermark"]
+    with engine.begin() as conn:
+        insert = sqlite_insert(SyncState.__table__).values(
+            table_name=table,
+            watermark_column=column,
+            watermark=_encode_watermark(watermark) if watermark is not None else None,
+            last_page=last_page,
+            etag=etag,
+            updated_at=datetime.now()
+        )
+        conn.execute(insert.on_conflict_do_update(
+            index_elements=['table_name'],
+            set_={name: insert.excluded[name] for name in ('watermark_column', 'watermark', 'last_page', 'etag', 'updated_at')}
+        ))
+
+# post_views compaction
+COMPACTION_STATE_KEY = "post_view_rollups"
+
+def _compacted_view_cutoff():
+    """Return the viewed_at cutoff of the last compaction, or None if views were never compacted."""
+    with engine.connect() as conn:
+        value = conn.execute(
+            text("SELECT watermark FROM sync_state WHERE table_name = :name"), {"name": COMPACTION_STATE_KEY}
+        ).scalar()
+    return datetime.fromisoformat(value) if value else None
+
+def _drop_compacted_views(rows):
     """
-    Fetch post view data from API endpoint and store it in the database.
-    Stops and raises an exception on the first failure.
+    Filter out views at or before the compaction cutoff. A full re-crawl would otherwise
+    insert them again next to their rollup and count them twice.
     """
-    logger.info(f"Fetching post views from {api_endpoint}")
-    try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch post views from API: {str(e)}")
-        raise Exception(f"API request failed: {str(e)}")
-
-    if 'posts' not in data:
-        logger.error("API response does not contain 'posts' key")
-        raise Exception("API response missing 'posts' key")
-
-    Session = sessionmaker(bind=engine)
-    session = Session()
-
+    cutoff = _compacted_view_cutoff()
+    if cutoff is None:
+        return rows
+    kept = [row for row in rows if row.get("viewed_at") is None or row["viewed_at"] >= cutoff]
+    if len(kept) < len(rows):
+        logger.info(f"Skipped {len(rows) - len(kept)} post views older than the compaction cutoff {cutoff}")
+    return kept
+
+_ROLLUP_VIEWS_SQL = text(
+    "INSERT INTO post_view_rollups (user_id, post_id, view_count, first_viewed_at, last_viewed_at)"
+    " SELECT user_id, post_id, COUNT(*), MIN(viewed_at), MAX(viewed_at) FROM post_views"
+    " WHERE id > :low AND id <= :high AND viewed_at < :cutoff GROUP BY user_id, post_id"
+    " ON CONFLICT (user_id, post_id) DO UPDATE SET"
+    " view_count = post_view_rollups.view_count + excluded.view_count,"
+    " first_viewed_at = MIN(COALESCE(post_view_rollups.first_viewed_at, excluded.first_viewed_at), excluded.first_viewed_at),"
+    " last_viewed_at = MAX(COALESCE(post_view_rollups.last_viewed_at, excluded.last_viewed_at), excluded.last_viewed_at)"
+)
+
+_DELETE_COMPACTED_VIEWS_SQL = text(
+    "DELETE FROM post_views WHERE id > :low AND id <= :high AND viewed_at < :cutoff"
+)
+
+def _incremental_vacuum(pages):
+    """
+    Release up to `pages` free pages. executescript runs the pragma to completion; a plain
+    execute only steps it once, which frees a single page.
+    """
+    raw = engine.raw_connection()
     try:
-        for i, view_data in enumerate(data['posts']):
-            logger.info(f"Processing post view {i+1}: post_id {view_data.get('post_id')}")
-            # Convert viewed_at
-            if view_data.get('viewed_at'):
-                try:
-                    view_data['viewed_at'] = datetime.strptime(
-                        view_data['viewed_at'], "%Y-%m-%d %H:%M:%S"
-                    )
-                except ValueError as e:
-                    logger.warning(f"Invalid viewed_at format for post view {view_data.get('post_id')}: {str(e)}")
-                    view_data['viewed_at'] = None
-            else:
-                view_data['viewed_at'] = None
-
-            # Create and merge post view
-            try:
-                view = PostView(**view_data)
-                session.merge(view)
-            except Exception as e:
-                logger.error(f"Failed to create/merge post view {view_data.get('post_id')}: {str(e)}")
-                raise Exception(f"Post view creation failed: {str(e)}")
+        cursor = raw.cursor()
+        free_before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        cursor.executescript(f"PRAGMA incremental_vacuum({pages});")
+        free_after = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        cursor.close()
+    finally:
+        raw.close()
+    return free_before - free_after
 
-        # Commit transaction
-        try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['posts'])} post views")
-        except Exception as e:
-            logger.error(f"Failed to commit post views to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
+def compact_post_views(horizon_days=VIEW_RETENTION_DAYS, batch_size=COMPACTION_BATCH_SIZE, pause=COMPACTION_PAUSE):
+    """
+    Roll views older than `horizon_days` into post_view_rollups (count, first and last view
+    per user/post) and delete the raw rows.
 
-    finally:
-        session.close()
-        logger.info("Database session closed")
+    The table is walked in id ranges of `batch_size`, one short transaction each, so readers
+    (WAL) are never blocked and writers only wait for a single batch. Freed pages are handed
+    back to the filesystem with incremental_vacuum after each batch. user_post_interactions
+    is unchanged, since each batch moves views from post_views to their rollup atomically.
 
-def fetch_and_store_post_likes(api_endpoint="http://localhost:8000/posts/like"):
+    Returns:
+        dict: views compacted, batches, pages vacuumed and seconds taken
+    """
+    started = time.perf_counter()
+    cutoff = datetime.now() - timedelta(days=horizon_days)
+    with engine.begin() as conn:
+        # Record the cutoff first so ingestion stops accepting views that are about to be rolled up
+        insert = sqlite_insert(SyncState.__table__).values(
+            table_name=COMPACTION_STATE_KEY, watermark_column="viewed_at",
+            watermark=_encode_watermark(cutoff), last_page=None, etag=None, updated_at=datetime.now()
+        )
+        conn.execute(insert.on_conflict_do_update(
+            index_elements=['table_name'],
+            set_={name: insert.excluded[name] for name in ('watermark_column', 'watermark', 'updated_at')}
+        ))
+        low, high = conn.execute(text("SELECT MIN(id) - 1, MAX(id) FROM post_views")).first()
+
+    with engine.connect() as conn:
+        auto_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+    if auto_vacuum != 2:
+        logger.warning("auto_vacuum is not INCREMENTAL; run with --vacuum once to let compaction shrink the file")
+
+    compacted = batches = vacuumed = 0
+    while low is not None and low < high:
+        params = {"low": low, "high": min(low + batch_size, high), "cutoff": _encode_watermark(cutoff)}
+        with engine.begin() as conn:
+            conn.execute(_ROLLUP_VIEWS_SQL, params)
+            compacted += conn.execute(_DELETE_COMPACTED_VIEWS_SQL, params).rowcount
+        batches += 1
+        if auto_vacuum == 2:
+            vacuumed += _incremental_vacuum(COMPACTION_VACUUM_PAGES)
+        if batches % INGEST_LOG_EVERY == 0:
+            logger.info(f"post_views compaction: {compacted} views rolled up through id {params['high']}")
+        low = params["high"]
+        time.sleep(pause)
+
+    stats = {"views": compacted, "batches": batches, "pages_vacuumed": vacuumed, "seconds": time.perf_counter() - started}
+    logger.info(
+        f"Compacted {compacted} post views older than {cutoff} in {batches} batches "
+        f"({vacuumed} pages vacuumed, {stats['seconds']:.2f}s)"
+    )
+    return stats
+
+def vacuum_db():
+    """Switch the database to incremental auto-vacuum and rebuild it. Blocks writers while it runs."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+    logger.info("Database vacuumed with auto_vacuum=INCREMENTAL")
+
+def sync_table(table, api_endpoint=None, incremental=False):
     """
-    Fetch post like data from API endpoint and store it in the database.
+    Fetch `table` from its API endpoint and bulk-upsert it, recording a high-watermark in sync_state.
+
+    A full sync crawls from page 1. An incremental sync resumes from the last page seen by the
+    previous sync and only upserts rows whose watermark column is at or past the stored watermark,
+    so its cost scales with new activity. This assumes upstream pages are ordered oldest-first.
     Stops and raises an exception on the first failure.
     """
-    logger.info(f"Fetching post likes from {api_endpoint}")
+    spec = INGEST_TABLES[table]
+    api_endpoint = api_endpoint or spec["endpoint"]
+    column = spec["watermark"]
+    state = load_sync_state(table) if incremental else None
+    start_page = state["last_page"] if state else 1
+
+    separator = "&" if "?" in api_endpoint else "?"
+    url = f"{api_endpoint}{separator}start_page={start_page}" if start_page > 1 else api_endpoint
+    if state and state["etag"]:
+        _endpoint_etags.setdefault(url, state["etag"])
+
+    logger.info(f"Fetching {table} from {url}" + (" (incremental)" if state else ""))
     try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch post likes from API: {str(e)}")
+        data, etag = _get_json(url)
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f"Failed to fetch {table} from API: {str(e)}")
         raise Exception(f"API request failed: {str(e)}")
 
-    if 'posts' not in data:
-        logger.error("API response does not contain 'posts' key")
-        raise Exception("API response missing 'posts' key")
-
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    if data is None:
+        logger.info(f"{table} unchanged since last fetch (304 Not Modified). Skipping.")
+        return {"table": table, "rows": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    if spec["key"] not in data:
+        logger.error(f"API response does not contain '{spec['key']}' key")
+        raise Exception(f"API response missing '{spec['key']}' key")
+
+    rows = prepare_rows(table, data[spec["key"]])
+    watermark = state["watermark"] if state else None
+    if watermark is not None:
+        rows = [row for row in rows if row[column] is not None and row[column] >= watermark]
+
+    stats = bulk_upsert(table, rows)
+    _log_ingest_stats(stats)
+
+    seen = [row[column] for row in rows if row[column] is not None]
+    if seen:
+        watermark = max(seen) if watermark is None else max(watermark, max(seen))
+    pages = data.get("pages", 0)
+    last_page = start_page + pages - 1 if pages else start_page
+    save_sync_state(table, watermark, last_page, etag)
+    # Only now that the rows are committed may a later fetch be skipped with a 304
+    if etag:
+        _endpoint_etags[url] = etag
+    return stats
+
+class BulkWriter:
+    """
+    Single background thread applying bulk upserts handed to it through a bounded queue.
 
-    try:
-        for i, like_data in enumerate(data['posts']):
-            logger.info(f"Processing post like {i+1}: post_id {like_data.get('post_id')}")
-            # Convert liked_at
-            if like_data.get('liked_at'):
-                try:
-                    like_data['liked_at'] = datetime.strptime(
-                        like_data['liked_at'], "%Y-%m-%d %H:%M:%S"
-                    )
-                except ValueError as e:
-                    logger.warning(f"Invalid liked_at format for post like {like_data.get('post_id')}: {str(e)}")
-                    like_data['liked_at'] = None
-            else:
-                like_data['liked_at'] = None
+    Crawlers keep fetching the next page while the writer commits the previous one, and
+    block once `max_pages` pages are waiting, so memory stays bounded to a few pages.
+    """
 
-            # Create and merge post like
+    def __init__(self, max_pages=INGEST_QUEUE_PAGES):
+        self._queue = queue.Queue(maxsize=max_pages)
+        self._thread = threading.Thread(target=self._run, name="bulk-writer", daemon=True)
+        self.error = None
+        self.stats = {}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, table, rows):
+        """Queue prepared rows for `table`, blocking while the queue is full."""
+        if self.error is not None:
+            raise Exception(f"Bulk writer failed: {str(self.error)}")
+        self._queue.put((table, rows))
+
+    def close(self):
+        """Wait for every queued page to be written, re-raising any write failure."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise Exception(f"Bulk writer failed: {str(self.error)}")
+        return self.stats
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                # Keep draining so blocked producers can observe the failure
+                continue
+            table, rows = item
             try:
-                like = PostLike(**like_data)
-                session.merge(like)
+                result = bulk_upsert(table, rows)
             except Exception as e:
-                logger.error(f"Failed to create/merge post like {like_data.get('post_id')}: {str(e)}")
-                raise Exception(f"Post like creation failed: {str(e)}")
-
-        # Commit transaction
-        try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['posts'])} post likes")
-        except Exception as e:
-            logger.error(f"Failed to commit post likes to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
-
-    finally:
-        session.close()
-        logger.info("Database session closed")
-
-def fetch_and_store_post_inspires(api_endpoint="http://localhost:8000/posts/inspire"):
+                logger.error(f"Bulk writer failed on {table}: {str(e)}")
+                self.error = e
+                continue
+            totals = self.stats.setdefault(table, {"table": table, "rows": 0, "pages": 0, "seconds": 0.0})
+            totals["rows"] += result["rows"]
+            totals["pages"] += 1
+            totals["seconds"] += result["seconds"]
+
+def _upstream_request(table):
+    """Query parameters and headers for crawling `table` straight from the upstream API."""
+    if INGEST_TABLES[table]["auth"]:
+        if not FLIC_TOKEN:
+            raise Exception("FLIC_TOKEN not configured")
+        return {"page_size": PAGE_SIZE}, {"Flic-Token": FLIC_TOKEN}
+    return {"page_size": PAGE_SIZE, "resonance_algorithm": RESONANCE_ALGORITHM}, None
+
+def stream_table(table, writer, incremental=False):
     """
-    Fetch post inspire data from API endpoint and store it in the database.
-    Stops and raises an exception on the first failure.
+    Crawl `table` page by page straight from the upstream API, converting each page and
+    handing it to `writer` as soon as it arrives. Nothing beyond the current page is held.
+
+    Returns:
+        dict: pages and rows crawled, crawl seconds, and the new watermark and last page for save_sync_state()
     """
-    logger.info(f"Fetching post inspires from {api_endpoint}")
+    if not API_BASE_URL:
+        raise Exception("API_BASE_URL not configured")
+    spec = INGEST_TABLES[table]
+    column = spec["watermark"]
+    state = load_sync_state(table) if incremental else None
+    start_page = state["last_page"] if state else 1
+    watermark = state["watermark"] if state else None
+    params, headers = _upstream_request(table)
+
+    logger.info(f"Streaming {table} from {API_BASE_URL}{spec['upstream_path']} starting at page {start_page}")
+    started = time.perf_counter()
+    pages = rows_seen = 0
+    last_page = start_page
     try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch post inspires from API: {str(e)}")
+        for page, items in iter_pages_sync(spec["upstream_path"], spec["key"], params, headers, start_page=start_page):
+            rows = prepare_rows(table, items)
+            if state and state["watermark"] is not None:
+                rows = [row for row in rows if row[column] is not None and row[column] >= state["watermark"]]
+            seen = [row[column] for row in rows if row[column] is not None]
+            if seen:
+                watermark = max(seen) if watermark is None else max(watermark, max(seen))
+            if rows:
+                writer.submit(table, rows)
+            pages += 1
+            rows_seen += len(rows)
+            last_page = page
+            if pages % INGEST_LOG_EVERY == 0:
+                logger.info(f"{table}: {pages} pages / {rows_seen} rows crawled")
+    except UpstreamError as e:
+        logger.error(f"Failed to fetch {table} from upstream: {str(e)}")
         raise Exception(f"API request failed: {str(e)}")
 
-    if 'posts' not in data:
-        logger.error("API response does not contain 'posts' key")
-        raise Exception("API response missing 'posts' key")
+    return {
+        "table": table, "pages": pages, "rows": rows_seen, "watermark": watermark,
+        "last_page": last_page, "seconds": time.perf_counter() - started
+    }
 
-    Session = sessionmaker(bind=engine)
-    session = Session()
+def run_parallel_ingest(tables=None, incremental=False):
+    """
+    Crawl and convert several tables from the upstream API concurrently, one crawler thread per
+    table, while all writes go through a single BulkWriter so SQLite only ever sees one writer.
+    Sync state is recorded for every table that completed; the first failure is re-raised.
 
+    Returns:
+        dict: per-table pages, rows, crawl seconds and write seconds
+    """
+    tables = tables or SYNC_TABLES
+    started = time.perf_counter()
+    writer = BulkWriter().start()
+    results, errors = {}, {}
     try:
-        for i, inspire_data in enumerate(data['posts']):
-            logger.info(f"Processing post inspire {i+1}: post_id {inspire_data.get('post_id')}")
-            # Convert inspired_at
-            if inspire_data.get('inspired_at'):
+        with ThreadPoolExecutor(max_workers=len(tables), thread_name_prefix="ingest") as executor:
+            futures = {executor.submit(stream_table, table, writer, incremental): table for table in tables}
+            for future in as_completed(futures):
+                table = futures[future]
                 try:
-                    inspire_data['inspired_at'] = datetime.strptime(
-                        inspire_data['inspired_at'], "%Y-%m-%d %H:%M:%S"
+                    results[table] = future.result()
+                    logger.info(
+                        f"{table}: crawled {results[table]['pages']} pages / {results[table]['rows']} rows "
+                        f"in {results[table]['seconds']:.2f}s"
                     )
-                except ValueError as e:
-                    logger.warning(f"Invalid inspired_at format for post inspire {inspire_data.get('post_id')}: {str(e)}")
-                    inspire_data['inspired_at'] = None
-            else:
-                inspire_data['inspired_at'] = None
-
-            # Create and merge post inspire
-            try:
-                inspire = PostInspire(**inspire_data)
-                session.merge(inspire)
-            except Exception as e:
-                logger.error(f"Failed to create/merge post inspire {inspire_data.get('post_id')}: {str(e)}")
-                raise Exception(f"Post inspire creation failed: {str(e)}")
-
-        # Commit transaction
+                except Exception as e:
+                    logger.error(f"Ingestion of {table} failed: {str(e)}")
+                    errors[table] = e
+    finally:
         try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['posts'])} post inspires")
+            written = writer.close()
         except Exception as e:
-            logger.error(f"Failed to commit post inspires to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
+            errors.setdefault("writer", e)
+            written = writer.stats
+
+    report = {}
+    for table, result in results.items():
+        if "writer" not in errors:
+            save_sync_state(table, result["watermark"], result["last_page"], None)
+        totals = written.get(table, {"rows": 0, "seconds": 0.0})
+        report[table] = {
+            "pages": result["pages"],
+            "rows": totals["rows"],
+            "crawl_seconds": result["seconds"],
+            "write_seconds": totals["seconds"]
+        }
+        logger.info(
+            f"{table}: {totals['rows']} rows written ({result['pages']} pages), "
+            f"crawl {result['seconds']:.2f}s, write {totals['seconds']:.2f}s"
+        )
+    logger.info(f"Parallel ingest of {len(tables)} tables finished in {time.perf_counter() - started:.2f}s")
 
-    finally:
-        session.close()
-        logger.info("Database session closed")
+    if errors:
+        table, error = next(iter(errors.items()))
+        raise Exception(f"Ingestion failed for {table}: {str(error)}")
+    return report
 
-def fetch_and_store_post_ratings(api_endpoint="http://localhost:8000/posts/rating"):
+def fetch_and_store_users(api_endpoint="http://localhost:8000/users/get_all"):
     """
-    Fetch post rating data from API endpoint and store it in the database.
+    Fetch user data from API endpoint and bulk-upsert it into the database.
     Stops and raises an exception on the first failure.
     """
-    logger.info(f"Fetching post ratings from {api_endpoint}")
-    try:
-        response = requests.get(api_endpoint, timeout=100)
-        response.raise_for_status()
-        data = response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch post ratings from API: {str(e)}")
-        raise Exception(f"API request failed: {str(e)}")
+    return sync_table("users", api_endpoint)
 
-    if 'posts' not in data:
-        logger.error("API response does not contain 'posts' key")
-        raise Exception("API response missing 'posts' key")
-
-    Session = sessionmaker(bind=engine)
-    session = Session()
+def fetch_and_store_posts(api_endpoint="http://localhost:8000/posts/summary/get"):
+    """
+    Fetch post data from API endpoint and bulk-upsert it into the database.
+    Stops and raises an exception on the first failure.
+    """
+    return sync_table("posts", api_endpoint)
 
-    try:
-        for i, rating_data in enumerate(data['posts']):
-            logger.info(f"Processing post rating {i+1}: post_id {rating_data.get('post_id')}")
-            # Convert rated_at
-            if rating_data.get('rated_at'):
-                try:
-                    rating_data['rated_at'] = datetime.strptime(
-                        rating_data['rated_at'], "%Y-%m-%d %H:%M:%S"
-                    )
-                except ValueError as e:
-                    logger.warning(f"Invalid rated_at format for post rating {rating_data.get('post_id')}: {str(e)}")
-                    rating_data['rated_at'] = None
-            else:
-                rating_data['rated_at'] = None
+def fetch_and_store_post_views(api_endpoint="http://localhost:8000/posts/view"):
+    """
+    Fetch post view data from API endpoint and bulk-upsert it into the database.
+    Stops and raises an exception on the first failure.
+    """
+    return sync_table("post_views", api_endpoint)
 
-            # Create and merge post rating
-            try:
-                rating = PostRating(**rating_data)
-                session.merge(rating)
-            except Exception as e:
-                logger.error(f"Failed to create/merge post rating {rating_data.get('post_id')}: {str(e)}")
-                raise Exception(f"Post rating creation failed: {str(e)}")
+def fetch_and_store_post_likes(api_endpoint="http://localhost:8000/posts/like"):
+    """
+    Fetch post like data from API endpoint and bulk-upsert it into the database.
+    Stops and raises an exception on the first failure.
+    """
+    return sync_table("post_likes", api_endpoint)
 
-        # Commit transaction
-        try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(data['posts'])} post ratings")
-        except Exception as e:
-            logger.error(f"Failed to commit post ratings to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
+def fetch_and_store_post_inspires(api_endpoint="http://localhost:8000/posts/inspire"):
+    """
+    Fetch post inspire data from API endpoint and bulk-upsert it into the database.
+    Stops and raises an exception on the first failure.
+    """
+    return sync_table("post_inspires", api_endpoint)
 
-    finally:
-        session.close()
-        logger.info("Database session closed")
+def fetch_and_store_post_ratings(api_endpoint="http://localhost:8000/posts/rating"):
+    """
+    Fetch post rating data from API endpoint and bulk-upsert it into the database.
+    Stops and raises an exception on the first failure.
+    """
+    return sync_table("post_ratings", api_endpoint)
 
+def _populate(incremental=False):
+    """
+    Fill every crawled table. Streams all tables in parallel straight from the upstream API
+    when API_BASE_URL is configured, otherwise falls back to the local server's
+    data-collection routes one table at a time.
+    """
+    if API_BASE_URL:
+        return run_parallel_ingest(incremental=incremental)
+    for table in SYNC_TABLES:
+        sync_table(table, incremental=incremental)
 
 def load_post_ratings():
     """Load post ratings from database and return in specified format."""
@@ -584,6 +1120,7 @@ def load_all_posts():
 def store_updated_post_summaries(updated_posts):
     """
     Store updated post summaries in the updated_post_summaries table.
+    Rows are upserted on post_id, so re-running the summarizer updates existing summaries.
     Stops and raises an exception on the first failure.
     
     Args:
@@ -595,54 +1132,18 @@ def store_updated_post_summaries(updated_posts):
         logger.warning("No updated posts provided to store")
         return
 
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    return ingest_rows("updated_post_summaries", updated_posts)
 
-    try:
-        for i, post_data in enumerate(updated_posts):
-            logger.info(f"Processing updated post summary {i+1}: post_id {post_data.get('id')}")
-            
-            # Validate required fields
-            required_fields = ['id', 'username', 'summary', 'category']
-            for field in required_fields:
-                if field not in post_data or post_data[field] is None:
-                    logger.error(f"Missing or null required field '{field}' for post {post_data.get('id')}")
-                    raise Exception(f"Missing required field: {field}")
-
-            # Create dictionary for UpdatedPostSummary
-            summary_data = {
-                'post_id': post_data.get('id'),
-                'upvote_count': post_data.get('upvote_count', 0),
-                'view_count': post_data.get('view_count', 0),
-                'average_rating': post_data.get('average_rating', 0.0),
-                'username': post_data.get('username'),
-                'keywords': post_data.get('keywords', []),
-                'no_of_person_in_video': post_data.get('no_of_person_in_video', 0),
-                'estimated_duration': post_data.get('estimated_duration', ''),
-                'main_character_gender': post_data.get('main_character_gender', ''),
-                'summary': post_data.get('summary'),
-                'category': post_data.get('category')
-            }
-
-            # Create and merge summary
-            try:
-                summary = UpdatedPostSummary(**summary_data)
-                session.merge(summary)
-            except Exception as e:
-                logger.error(f"Failed to create/merge updated post summary for post_id {post_data.get('id')}: {str(e)}")
-                raise Exception(f"Updated post summary creation failed: {str(e)}")
-
-        # Commit transaction
-        try:
-            session.commit()
-            logger.info(f"Successfully added/updated {len(updated_posts)} post summaries")
-        except Exception as e:
-            logger.error(f"Failed to commit updated post summaries to database: {str(e)}")
-            raise Exception(f"Database commit failed: {str(e)}")
-
-    finally:
-        session.close()
-        logger.info("Database session closed")
+def load_summary_cache():
+    """
+    Return {post_id: {"content_hash", "summary", "category"}} for every stored summary that
+    has a content hash, so the summarizer can skip posts whose LLM input has not changed.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT post_id, content_hash, summary, category FROM updated_post_summaries WHERE content_hash IS NOT NULL"
+        )).fetchall()
+    return {row[0]: {"content_hash": row[1], "summary": row[2], "category": row[3]} for row in rows}
 
 def load_updated_post_summaries():
     """Load all updated post summaries from database and return in specified format."""
@@ -673,24 +1174,21 @@ def load_updated_post_summaries():
         session.close()
 
 
-def create_db():
+def create_db(incremental=False):
     """
     Check if database exists and has data. If not, run the main data fetching functions.
+    If it already has data and `incremental` is set, fetch only activity newer than the stored watermarks.
     """
     db_path = 'data.db'
     if not os.path.exists(db_path):
         logger.info("Database does not exist. Creating and populating database.")
         try:
-            fetch_and_store_users()
-            fetch_and_store_posts()
-            fetch_and_store_post_views()
-            fetch_and_store_post_likes()
-            fetch_and_store_post_inspires()
-            fetch_and_store_post_ratings()
+            _populate()
         except Exception as e:
             logger.error(f"Failed to populate database: {str(e)}")
             raise
     else:
+        warn_pending_migrations()
         Session = sessionmaker(bind=engine)
         session = Session()
         try:
@@ -698,15 +1196,17 @@ def create_db():
             if user_count == 0:
                 logger.info("Database exists but contains no users. Populating database.")
                 try:
-                    fetch_and_store_users()
-                    fetch_and_store_posts()
-                    fetch_and_store_post_views()
-                    fetch_and_store_post_likes()
-                    fetch_and_store_post_inspires()
-                    fetch_and_store_post_ratings()
+                    _populate()
                 except Exception as e:
                     logger.error(f"Failed to populate database: {str(e)}")
                     raise
+            elif incremental:
+                logger.info("Database exists and contains data. Running incremental sync.")
+                try:
+                    _populate(incremental=True)
+                except Exception as e:
+                    logger.error(f"Failed to sync database: {str(e)}")
+                    raise
             else:
                 logger.info("Database exists and contains data. Skipping population.")
         finally:
@@ -714,8 +1214,27 @@ def create_db():
             logger.info("Database session closed")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create, populate or refresh the EmpowerVerse database")
+    parser.add_argument("--incremental", action="store_true", help="fetch only activity newer than the stored watermarks")
+    parser.add_argument("--compact-views", action="store_true", help="roll up post views older than VIEW_RETENTION_DAYS instead of syncing")
+    parser.add_argument("--horizon-days", type=float, default=VIEW_RETENTION_DAYS, help="retention horizon for --compact-views")
+    parser.add_argument("--vacuum", action="store_true", help="enable incremental auto-vacuum and VACUUM the database (one-off)")
+    parser.add_argument("--migrate", action="store_true", help="migrate an existing database to the current schema (may delete duplicate rows)")
+    parser.add_argument("--dry-run", action="store_true", help="with --migrate, only list the pending steps")
+    args = parser.parse_args()
     try:
-        create_db()
+        if args.migrate:
+            steps = migrate_db(dry_run=args.dry_run)
+            if not steps:
+                logger.info("Database schema is up to date")
+            for step in steps:
+                logger.info(("Pending: " if args.dry_run else "Applied: ") + step)
+        if args.vacuum:
+            vacuum_db()
+        if args.compact_views:
+            compact_post_views(horizon_days=args.horizon_days)
+        if not (args.migrate or args.vacuum or args.compact_views):
+            create_db(incremental=args.incremental)
     except Exception as e:
         logger.error(f"Program stopped due to error: {str(e)}")
         raise
\ No newline at end of file
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, model_validator
+from starlette.concurrency import run_in_threadpool
+
+from database_manager import bulk_upsert, load_interaction_weights
+from predict import apply_interaction_updates
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "50000"))  # events buffered in memory per worker
+EVENTS_FLUSH_SIZE = int(os.getenv("EVENTS_FLUSH_SIZE", "2000"))  # flush once this many events are pending
+EVENTS_FLUSH_INTERVAL = float(os.getenv("EVENTS_FLUSH_INTERVAL", "0.25"))  # ... or this many seconds after the first
+EVENTS_MAX_BATCH = int(os.getenv("EVENTS_MAX_BATCH", "5000"))  # events accepted per POST /events request
+EVENTS_RETRY_AFTER = int(os.getenv("EVENTS_RETRY_AFTER", "1"))
+EVENTS_FLUSH_RETRIES = int(os.getenv("EVENTS_FLUSH_RETRIES", "5"))  # write attempts per flush after the first
+EVENTS_FLUSH_BACKOFF = float(os.getenv("EVENTS_FLUSH_BACKOFF", "0.1"))  # seconds before the first retry, doubled each time
+EVENTS_FLUSH_MAX_BACKOFF = float(os.getenv("EVENTS_FLUSH_MAX_BACKOFF", "5"))
+
+# Event type -> (interaction table, timestamp column)
+EVENT_TABLES = {
+    "like": ("post_likes", "liked_at"),
+    "view": ("post_views", "viewed_at"),
+    "inspire": ("post_inspires", "inspired_at"),
+    "rating": ("post_ratings", "rated_at"),
+}
+
+
+class InteractionEvent(BaseModel):
+    type: Literal["like", "view", "inspire", "rating"]
+    user_id: int
+    post_id: int
+    rating_percent: Optional[int] = Field(None, ge=0, le=100)
+    timestamp: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_rating(self):
+        if self.type == "rating" and self.rating_percent is None:
+            raise ValueError("rating events require rating_percent")
+        return self
+
+
+class EventBatch(BaseModel):
+    events: List[InteractionEvent]
+
+
+class EventQueueFull(Exception):
+    """Raised when a batch does not fit in the in-memory event queue."""
+
+
+class EventIngestorStopped(Exception):
+    """Raised when events are submitted while the ingestor is not running."""
+
+
+def _to_row(event, received_at):
+    """Convert an event into a row for its interaction table (bulk_upsert assigns it a negative local id)."""
+    table, timestamp_field = EVENT_TABLES[event.type]
+    timestamp = event.timestamp or received_at
+    if timestamp.tzinfo is not None:
+        # Stored timestamps are naive UTC, like the crawled ones
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    row = {"id": None, "post_id": event.post_id, "user_id": event.user_id, timestamp_field: timestamp}
+    if event.type == "rating":
+        row["rating_percent"] = event.rating_percent
+    return table, row
+
+
+class EventIngestor:
+    """
+    Buffers interaction events in a bounded in-memory queue and writes them in micro-batches.
+
+    A single background task drains the queue, flushing when EVENTS_FLUSH_SIZE events are
+    pending or EVENTS_FLUSH_INTERVAL seconds after the first one arrived. Each flush is one
+    bulk_upsert per interaction table (which also refreshes user_post_interactions), after
+    which the new weights are pushed to the shared recommendation engine. A batch that would
+    overflow the queue is rejected as a whole so that callers can back off and retry.
+
+    Accepted events are not given up on a failed write (e.g. SQLITE_BUSY): the tables that
+    failed are retried with exponential backoff, and rows still unwritten after
+    EVENTS_FLUSH_RETRIES are carried over to the next flush. Carried rows count against the
+    queue size, so a database that stays unavailable turns into 429s rather than lost
+    events. Rows are only dropped if they still cannot be written when the ingestor stops.
+    """
+
+    def __init__(self, queue_size=EVENTS_QUEUE_SIZE, flush_size=EVENTS_FLUSH_SIZE, flush_interval=EVENTS_FLUSH_INTERVAL,
+                 flush_retries=EVENTS_FLUSH_RETRIES, flush_backoff=EVENTS_FLUSH_BACKOFF,
+                 max_flush_backoff=EVENTS_FLUSH_MAX_BACKOFF):
+        self.queue_size = queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.flush_retries = flush_retries
+        self.flush_backoff = flush_backoff
+        self.max_flush_backoff = max_flush_backoff
+        self._queue = None
+        self._task = None
+        # Rows by table not yet written by an earlier flush, and the pairs they touch
+        self._carried = {}
+        self._carried_pairs = set()
+        self.metrics = {
+            "accepted": 0,
+            "rejected": 0,
+            "written": 0,
+            "dropped": 0,
+            "retries": 0,
+            "flushes": 0,
+            "engine_updates": 0,
+            "last_flush_seconds": None,
+        }
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the flusher task. Called from the app lifespan."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"Event ingestion started (queue={self.queue_size}, flush_size={self.flush_size}, flush_interval={self.flush_interval}s)")
+
+    async def stop(self):
+        """Flush everything still queued, then stop the flusher task. Called from the app lifespan."""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        await self._queue.put(None)
+        await task
+
+    def submit(self, events):
+        """
+        Queue a batch of events without blocking.
+
+        Raises:
+            EventIngestorStopped: if the ingestor is not running
+            EventQueueFull: if the batch does not fit in the queue; nothing is queued
+        """
+        if not self.running:
+            raise EventIngestorStopped("Event ingestion is not running")
+        pending = self._queue.qsize() + self._carried_count()
+        if pending + len(events) > self.queue_size:
+            self.metrics["rejected"] += len(events)
+            raise EventQueueFull(f"Event queue is full ({pending}/{self.queue_size} pending)")
+        received_at = datetime.now(timezone.utc)
+        for event in events:
+            self._queue.put_nowait(_to_row(event, received_at))
+        self.metrics["accepted"] += len(events)
+        return len(events)
+
+    def _carried_count(self):
+        return sum(len(rows) for rows in self._carried.values())
+
+    async def _next_batch(self):
+        """Wait for the first event, then collect more until the size or time limit is reached."""
+        if self._carried:
+            # Do not wait indefinitely for new events while unwritten rows are carried over
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                return [], False
+        else:
+            first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._next_batch()
+            if batch or self._carried:
+                await self._flush(batch)
+        if self._carried:
+            lost = self._carried_count()
+            self.metrics["dropped"] += lost
+            logger.error(f"Dropping {lost} interaction events that could not be written before shutdown")
+        logger.info("Event ingestion stopped")
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        pending, pairs = self._carried, self._carried_pairs
+        self._carried, self._carried_pairs = {}, set()
+        for table, row in batch:
+            pending.setdefault(table, []).append(row)
+        count = sum(len(rows) for rows in pending.values())
+
+        for attempt in range(self.flush_retries + 1):
+            try:
+                updates = await run_in_threadpool(self._write, pending, pairs)
+                break
+            except Exception as e:
+                remaining = sum(len(rows) for rows in pending.values())
+                if attempt == self.flush_retries:
+                    # Keep the unwritten rows for the next flush instead of losing acknowledged events
+                    self._carried, self._carried_pairs = pending, pairs
+                    self.metrics["written"] += count - remaining
+                    logger.error(
+                        f"Failed to write {remaining} interaction events after {attempt + 1} attempts: {str(e)}; "
+                        f"keeping them for the next flush"
+                    )
+                    return
+                delay = min(self.flush_backoff * 2 ** attempt, self.max_flush_backoff)
+                self.metrics["retries"] += 1
+                logger.warning(f"Failed to write {remaining} interaction events: {str(e)}; retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        self.metrics["written"] += count
+        self.metrics["flushes"] += 1
+        self.metrics["engine_updates"] += updates
+        self.metrics["last_flush_seconds"] = time.perf_counter() - started
+
+    def _write(self, pending, pairs):
+        """
+        Write the pending rows table by table and publish the resulting weights to the engine
+        (runs in the threadpool). Each table is removed from `pending` once committed, so a
+        retry after a failure only rewrites the tables that failed; views have no natural key
+        and would otherwise be inserted twice.
+        """
+        for table in list(pending):
+            rows = pending[table]
+            bulk_upsert(table, rows, local_ids=True)
+            del pending[table]
+            pairs.update((row["user_id"], row["post_id"]) for row in rows)
+
+        try:
+            weights = pd.DataFrame(load_interaction_weights(pairs))
+            return apply_interaction_updates(weights)
+        except Exception as e:
+            # The events are stored; the engine picks them up on its next rebuild
+            logger.warning(f"Failed to apply {len(pairs)} interaction updates to the engine: {str(e)}")
+            return 0
+
+    def stats(self):
+        return {
+            **self.metrics,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "carried": self._carried_count(),
+            "queue_size": self.queue_size,
+            "running": self.running,
+        }
+
+
+event_ingestor = EventIngestor()
@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+FEED_MAX_CONCURRENCY = int(os.getenv("FEED_MAX_CONCURRENCY", "4"))
+FEED_MAX_QUEUE_WAIT = float(os.getenv("FEED_MAX_QUEUE_WAIT", "0.5"))
+FEED_LATENCY_BUDGET = float(os.getenv("FEED_LATENCY_BUDGET", "2.0"))
+FEED_RESULT_CACHE_TTL = float(os.getenv("FEED_RESULT_CACHE_TTL", "600"))
+FEED_RESULT_CACHE_SIZE = int(os.getenv("FEED_RESULT_CACHE_SIZE", "10000"))
+# While the expected latency is over budget, one full run is still let through this often
+FEED_PROBE_INTERVAL = float(os.getenv("FEED_PROBE_INTERVAL", "5"))
+# Half-life of the expected latency while no full run completes
+FEED_LATENCY_HALF_LIFE = float(os.getenv("FEED_LATENCY_HALF_LIFE", "30"))
+
+# Smoothing factor for the moving average of full-path latency
+LATENCY_EWMA_ALPHA = 0.2
+
+
+class FeedAdmission:
+    """
+    Admission control for /feed.
+
+    At most `max_concurrency` full recommendation runs execute at once. A request
+    that cannot get a slot within `max_queue_wait`, or whose remaining latency
+    budget is smaller than the expected cost of a full run, is degraded to a cheap
+    path: the last full result for the same (user, category) if one is cached,
+    otherwise the precomputed popularity list.
+
+    The expected cost is a moving average of warm full runs; runs that start on a cold
+    engine (see the `cold` argument of handle) are left out. So that one slow run cannot
+    shed load forever, the estimate decays with FEED_LATENCY_HALF_LIFE while no full run
+    completes, and a single probe request is let through every `probe_interval` seconds.
+    """
+
+    def __init__(self, max_concurrency=FEED_MAX_CONCURRENCY, max_queue_wait=FEED_MAX_QUEUE_WAIT,
+                 latency_budget=FEED_LATENCY_BUDGET, cache_ttl=FEED_RESULT_CACHE_TTL,
+                 cache_size=FEED_RESULT_CACHE_SIZE, probe_interval=FEED_PROBE_INTERVAL,
+                 latency_half_life=FEED_LATENCY_HALF_LIFE):
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self.latency_budget = latency_budget
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.probe_interval = probe_interval
+        self.latency_half_life = latency_half_life
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._results = OrderedDict()
+        self.expected_latency = None
+        self._latency_updated_at = None
+        self._last_probe_at = None
+        self._probe_in_flight = False
+        self.in_flight = 0
+        self.metrics = {
+            "requests": 0,
+            "full": 0,
+            "degraded_cache": 0,
+            "degraded_popular": 0,
+            "queue_timeout": 0,
+            "over_budget": 0,
+            "budget_exceeded": 0,
+            "probes": 0,
+            "cold_runs": 0,
+        }
+
+    def _cache_get(self, key):
+        item = self._results.get(key)
+        if item is None:
+            return None
+        stored_at, result = item
+        if time.monotonic() - stored_at > self.cache_ttl:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return result
+
+    def _cache_put(self, key, result):
+        self._results[key] = (time.monotonic(), result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.cache_size:
+            self._results.popitem(last=False)
+
+    def _current_latency(self, now):
+        """Expected latency of a full run, decayed by the time since the last full run completed."""
+        if self.expected_latency is None:
+            return None
+        if self.latency_half_life <= 0:
+            return self.expected_latency
+        return self.expected_latency * 0.5 ** ((now - self._latency_updated_at) / self.latency_half_life)
+
+    def _record_latency(self, seconds):
+        now = time.monotonic()
+        current = self._current_latency(now)
+        if current is None:
+            self.expected_latency = seconds
+        else:
+            self.expected_latency = LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * current
+        self._latency_updated_at = now
+
+    def _take_probe(self, now):
+        """Whether an over-budget request may run in full anyway to refresh the estimate."""
+        if self._probe_in_flight:
+            return False
+        if self._last_probe_at is not None and now - self._last_probe_at < self.probe_interval:
+            return False
+        self._last_probe_at = now
+        self._probe_in_flight = True
+        self.metrics["probes"] += 1
+        return True
+
+    async def _degrade(self, key, reason, cheap):
+        self.metrics[reason] += 1
+        cached = self._cache_get(key)
+        if cached is not None:
+            self.metrics["degraded_cache"] += 1
+            return cached, f"cache; reason={reason}"
+        self.metrics["degraded_popular"] += 1
+        return await run_in_threadpool(cheap), f"popular; reason={reason}"
+
+    def _finish(self, key, started, cold, probe, task):
+        """Release the slot once a full run finishes, even if its caller already gave up on it."""
+        self.in_flight -= 1
+        self._semaphore.release()
+        if probe:
+            self._probe_in_flight = False
+        if task.cancelled() or task.exception() is not None:
+            return
+        if not cold:
+            self._record_latency(time.monotonic() - started)
+        result = task.result()
+        if isinstance(result, dict) and result.get("status") == "success":
+            self._cache_put(key, result)
+
+    async def handle(self, key, full, cheap, cold=None):
+        """
+        Run `full` (blocking, executed in the threadpool) under admission control.
+        `cold` is an optional callable that returns True when the full run will include a
+        one-off warm-up (such as an engine build); such runs are not held to the expected
+        latency and are not counted in it.
+
+        Returns:
+            tuple: (result, degraded) where degraded is None for a full response, or a
+            "<source>; reason=<reason>" string describing the cheap path taken
+        """
+        self.metrics["requests"] += 1
+        deadline = time.monotonic() + self.latency_budget
+
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=min(self.max_queue_wait, self.latency_budget))
+        except asyncio.TimeoutError:
+            return await self._degrade(key, "queue_timeout", cheap)
+
+        now = time.monotonic()
+        remaining = deadline - now
+        is_cold = bool(cold and cold())
+        probe = False
+        if is_cold:
+            self.metrics["cold_runs"] += 1
+        else:
+            expected = self._current_latency(now)
+            if expected is not None and expected > remaining:
+                probe = self._take_probe(now)
+                if not probe:
+                    self._semaphore.release()
+                    return await self._degrade(key, "over_budget", cheap)
+
+        self.in_flight += 1
+        started = time.monotonic()
+        task = asyncio.ensure_future(run_in_threadpool(full))
+        task.add_done_callback(lambda t: self._finish(key, started, is_cold, probe, t))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout=max(remaining, 0))
+        except asyncio.TimeoutError:
+            logger.warning(f"Feed request {key} exceeded its {self.latency_budget}s budget; serving degraded response")
+            return await self._degrade(key, "budget_exceeded", cheap)
+
+        self.metrics["full"] += 1
+        return result, None
+
+    def stats(self):
+        return {
+            **self.metrics,
+            "in_flight": self.in_flight,
+            "expected_latency": self._current_latency(time.monotonic()),
+            "cached_results": len(self._results),
+        }
+
+
+feed_admission = FeedAdmission()
@@ -0,0 +1,270 @@
+import asyncio
+import importlib.util
+import logging
+import os
+import threading
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; keep page crawls quiet
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Environment variables
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "32"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "16"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "16"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2 = os.getenv("HTTP2", "auto").lower()
+
+_async_client = None
+_sync_client = None
+_transports = {}
+
+
+def http2_enabled():
+    """HTTP/2 is used when requested (or left on "auto") and the optional h2 package is installed."""
+    if HTTP2 in ("0", "false", "no", "off"):
+        return False
+    available = importlib.util.find_spec("h2") is not None
+    if HTTP2 in ("1", "true", "yes", "on") and not available:
+        logger.warning("HTTP2 requested but the 'h2' package is not installed; falling back to HTTP/1.1")
+    return available
+
+
+class PoolStats:
+    """Thread-safe request counters shared by the async and sync transports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.hosts = {}
+
+    def start(self, host):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            host_stats = self.hosts.setdefault(host, {"requests": 0, "in_flight": 0, "peak_in_flight": 0})
+            host_stats["requests"] += 1
+            host_stats["in_flight"] += 1
+            host_stats["peak_in_flight"] = max(host_stats["peak_in_flight"], host_stats["in_flight"])
+
+    def finish(self, host, error=False):
+        with self._lock:
+            self.in_flight -= 1
+            self.hosts[host]["in_flight"] -= 1
+            if error:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "hosts": {host: dict(values) for host, values in self.hosts.items()},
+            }
+
+
+stats = PoolStats()
+
+
+def _host_key(request):
+    return f"{request.url.host}:{request.url.port or (443 if request.url.scheme == 'https' else 80)}"
+
+
+def _connection_counts(pool):
+    """Count open and idle connections in an httpcore connection pool."""
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class _ReleasingAsyncStream(httpx.AsyncByteStream):
+    """Response body wrapper that frees the per-host slot once the body is closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class _ReleasingSyncStream(httpx.SyncByteStream):
+    """Response body wrapper that frees the per-host slot once the body is closed."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class LimitedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Async transport enforcing a per-host concurrency limit and recording pool usage."""
+
+    def __init__(self, per_host_limit=HTTP_PER_HOST_LIMIT, **kwargs):
+        super().__init__(**kwargs)
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+
+    async def handle_async_request(self, request):
+        host = _host_key(request)
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        await semaphore.acquire()
+        stats.start(host)
+        released = False
+
+        def release(error=False):
+            nonlocal released
+            if not released:
+                released = True
+                stats.finish(host, error)
+                semaphore.release()
+
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException as e:
+            release(error=isinstance(e, Exception))
+            raise
+        response.stream = _ReleasingAsyncStream(response.stream, release)
+        return response
+
+    def connection_counts(self):
+        return _connection_counts(self._pool)
+
+
+class LimitedSyncTransport(httpx.HTTPTransport):
+    """Sync transport enforcing a per-host concurrency limit and recording pool usage."""
+
+    def __init__(self, per_host_limit=HTTP_PER_HOST_LIMIT, **kwargs):
+        super().__init__(**kwargs)
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        host = _host_key(request)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host_limit))
+        semaphore.acquire()
+        stats.start(host)
+        released = False
+
+        def release(error=False):
+            nonlocal released
+            if not released:
+                released = True
+                stats.finish(host, error)
+                semaphore.release()
+
+        try:
+            response = super().handle_request(request)
+        except BaseException as e:
+            release(error=isinstance(e, Exception))
+            raise
+        response.stream = _ReleasingSyncStream(response.stream, release)
+        return response
+
+    def connection_counts(self):
+        return _connection_counts(self._pool)
+
+
+def _client_kwargs():
+    return {
+        "timeout": httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+def _transport_kwargs():
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "http2": http2_enabled(),
+        "per_host_limit": HTTP_PER_HOST_LIMIT,
+    }
+
+
+def get_async_client():
+    """Return the shared async client, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        transport = LimitedAsyncTransport(**_transport_kwargs())
+        _async_client = httpx.AsyncClient(transport=transport, **_client_kwargs())
+        _transports["async"] = transport
+    return _async_client
+
+
+def get_sync_client():
+    """Return the shared sync client, creating it on first use."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        transport = LimitedSyncTransport(**_transport_kwargs())
+        _sync_client = httpx.Client(transport=transport, **_client_kwargs())
+        _transports["sync"] = transport
+    return _sync_client
+
+
+async def startup():
+    """Create the shared clients. Called from the app lifespan."""
+    get_async_client()
+    get_sync_client()
+    logger.info(
+        f"HTTP clients ready (max_connections={HTTP_MAX_CONNECTIONS}, keepalive={HTTP_MAX_KEEPALIVE}, "
+        f"per_host_limit={HTTP_PER_HOST_LIMIT}, http2={http2_enabled()})"
+    )
+
+
+async def shutdown():
+    """Close the shared clients. Called from the app lifespan."""
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+    _transports.clear()
+
+
+def pool_stats():
+    """Return request counters plus open/idle connection counts for the shared clients."""
+    data = stats.snapshot()
+    data["limits"] = {
+        "max_connections": HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+        "per_host_limit": HTTP_PER_HOST_LIMIT,
+        "http2": http2_enabled(),
+    }
+    data["connections"] = {name: transport.connection_counts() for name, transport in _transports.items()}
+    return data
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+# openai/httpx log every request at INFO
+logging.getLogger("openai").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# Environment variables
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))  # requests per minute allowed by the provider
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))  # tokens per minute allowed by the provider
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+LLM_TARGET_LATENCY = float(os.getenv("LLM_TARGET_LATENCY", "15"))  # seconds; slower calls stop concurrency growth
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "1.0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "1000"))  # recent calls behind the snapshot() percentiles
+
+# Rough chars-per-token ratio used to budget prompts before the provider reports real usage
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class LLMError(Exception):
+    """Raised when a completion cannot be obtained after all retries."""
+
+
+class TokenBucket:
+    """
+    Continuous-refill token bucket sized to one minute of budget. Callers wait until
+    enough budget is available; requests larger than the bucket are clamped to it.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta):
+        """Correct the balance once the real cost of a request is known (negative delta refunds)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: grows by one after a window of successful calls under the
+    target latency, halves on a 429, and never leaves [1, max_limit].
+    """
+
+    def __init__(self, initial=LLM_INITIAL_CONCURRENCY, max_limit=LLM_MAX_CONCURRENCY, target_latency=LLM_TARGET_LATENCY):
+        self.limit = max(1, min(initial, max_limit))
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    async def release(self, throttled=False, latency=None):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            elif latency is not None:
+                if latency <= self.target_latency:
+                    self._successes += 1
+                    if self._successes >= self.limit and self.limit < self.max_limit:
+                        self.limit += 1
+                        self._successes = 0
+                else:
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+def _retry_after(error):
+    """Seconds the provider asked us to wait, if it said so."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    """
+    Shared async chat-completion client. Every call waits for a concurrency slot and for
+    requests-per-minute and tokens-per-minute budget, then retries 429s, timeouts and 5xx
+    with backoff (honouring Retry-After). The OpenAI SDK's own retries are disabled so that
+    each attempt is counted against the budgets.
+    """
+
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, concurrency=None, max_retries=LLM_MAX_RETRIES,
+                 backoff=LLM_BACKOFF, timeout=LLM_TIMEOUT):
+        self.requests_bucket = TokenBucket(rpm)
+        self.tokens_bucket = TokenBucket(tpm)
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._client = None
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,
+            "errors": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+        # Per-tag token accounting of successful calls: calls, prompt/completion tokens and
+        # the prompt tokens estimated beforehand (to check CHARS_PER_TOKEN)
+        self.usage = {}
+        # Latencies of the most recent successful calls; older ones fall off
+        self.latencies = deque(maxlen=LLM_LATENCY_WINDOW)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = AsyncOpenAI(max_retries=0, timeout=self.timeout)
+        return self._client
+
+    async def complete(self, messages, model, temperature=0.7, max_tokens=None, estimated_tokens=None, tag="default"):
+        """
+        Run one chat completion under the rate limits.
+
+        Args:
+            estimated_tokens (int): prompt + completion tokens reserved from the TPM budget;
+                corrected with the reported usage afterwards
+            tag (str): bucket the call's token usage is reported under (see token_report)
+
+        Raises:
+            LLMError: when the call still fails after all retries or fails with a non-retryable error
+        """
+        estimated_prompt = sum(estimate_tokens(m["content"]) for m in messages)
+        if estimated_tokens is None:
+            estimated_tokens = estimated_prompt + (max_tokens or 256)
+        kwargs = {"model": model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+
+        attempt = 0
+        while True:
+            await self.concurrency.acquire()
+            try:
+                await self.requests_bucket.acquire(1)
+                await self.tokens_bucket.acquire(estimated_tokens)
+            except BaseException:
+                await self.concurrency.release()
+                raise
+            self.stats["requests"] += 1
+            started = time.monotonic()
+            try:
+                response = await self.client.chat.completions.create(**kwargs)
+            except openai.RateLimitError as e:
+                await self.concurrency.release(throttled=True)
+                self.stats["throttled"] += 1
+                delay = _retry_after(e)
+                error = e
+            except (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError) as e:
+                await self.concurrency.release()
+                self.stats["errors"] += 1
+                delay = None
+                error = e
+            except BaseException as e:
+                await self.concurrency.release()
+                if isinstance(e, Exception):
+                    self.stats["errors"] += 1
+                    raise LLMError(str(e)) from e
+                raise
+            else:
+                latency = time.monotonic() - started
+                await self.concurrency.release(latency=latency)
+                self.latencies.append(latency)
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    self._record_usage(tag, usage, estimated_prompt)
+                    self.tokens_bucket.adjust((usage.total_tokens or 0) - estimated_tokens)
+                return response
+
+            if attempt >= self.max_retries:
+                raise LLMError(f"Giving up after {attempt + 1} attempts: {str(error)}") from error
+            if delay is None:
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.warning(f"LLM call failed ({type(error).__name__}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _record_usage(self, tag, usage, estimated_prompt):
+        prompt_tokens = usage.prompt_tokens or 0
+        completion_tokens = usage.completion_tokens or 0
+        self.stats["prompt_tokens"] += prompt_tokens
+        self.stats["completion_tokens"] += completion_tokens
+        entry = self.usage.setdefault(tag, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_prompt_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+        entry["estimated_prompt_tokens"] += estimated_prompt
+
+    def token_report(self, items=None):
+        """
+        Token usage of this client per tag and in total. With `items` (e.g. the number of
+        posts summarized), per-item averages are included.
+        """
+        def summarize(entry):
+            report = dict(entry)
+            if entry["calls"]:
+                report["prompt_tokens_per_call"] = entry["prompt_tokens"] / entry["calls"]
+                report["completion_tokens_per_call"] = entry["completion_tokens"] / entry["calls"]
+            if entry["estimated_prompt_tokens"]:
+                report["prompt_estimate_ratio"] = entry["prompt_tokens"] / entry["estimated_prompt_tokens"]
+            return report
+
+        total = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_prompt_tokens": 0}
+        for entry in self.usage.values():
+            for key in total:
+                total[key] += entry[key]
+        report = {"total": summarize(total), "by_tag": {tag: summarize(entry) for tag, entry in self.usage.items()}}
+        if items:
+            report["total"]["prompt_tokens_per_item"] = total["prompt_tokens"] / items
+            report["total"]["completion_tokens_per_item"] = total["completion_tokens"] / items
+        return report
+
+    def snapshot(self):
+        """Request counters, the concurrency state and latency percentiles over the last LLM_LATENCY_WINDOW calls."""
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+        return {
+            **self.stats,
+            "concurrency_limit": self.concurrency.limit,
+            "peak_in_flight": self.concurrency.peak_in_flight,
+            "latency_p50": percentile(0.50),
+            "latency_p99": percentile(0.99),
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
@@ -1,23 +1,61 @@
+import argparse
+import asyncio
+import hashlib
 import json
 import os
+import random
+import time
 from typing import List, Dict, Any
-from openai import OpenAI
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tenacity import retry, stop_after_attempt, wait_exponential
+from llm_client import LLMClient, LLM_MAX_CONCURRENCY, estimate_tokens
+from category_classifier import CategoryCascade, LOCAL_HASH_PREFIX
 
 # Set up logging for debugging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1-nano")
+# Posts packed into one request; 1 sends one request per post
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "10"))
+# Posts being processed at once; bounds memory independently of the catalogue size. The
+# default lets the client's AIMD limit reach LLM_MAX_CONCURRENCY full batches.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", str(LLM_MAX_CONCURRENCY * LLM_BATCH_SIZE)))
+# Estimated tokens of post data per batched request; larger posts go out in smaller batches
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+# Completion tokens reserved per post of a batch when budgeting TPM
+BATCH_COMPLETION_TOKENS_PER_POST = 150
+# Summaries are stored every SUMMARY_FLUSH_SIZE results or SUMMARY_FLUSH_INTERVAL seconds
+SUMMARY_FLUSH_SIZE = int(os.getenv("SUMMARY_FLUSH_SIZE", "200"))
+SUMMARY_FLUSH_INTERVAL = float(os.getenv("SUMMARY_FLUSH_INTERVAL", "30"))
+# Flushes a summary may fail to store in before it is dropped (and left for --resume)
+SUMMARY_STORE_ATTEMPTS = int(os.getenv("SUMMARY_STORE_ATTEMPTS", "3"))
+# Post ids stored by the current run, one per line; read back by --resume
+SUMMARY_CHECKPOINT = os.getenv("SUMMARY_CHECKPOINT", "summaries.checkpoint")
+# Estimated tokens of one post's data in a prompt; longer lists and texts are truncated to fit
+LLM_POST_TOKEN_BUDGET = int(os.getenv("LLM_POST_TOKEN_BUDGET", "600"))
+# Share of posts whose raw input is logged at DEBUG level
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+# Per-field caps applied before the token budget: list items, characters per text field
+MAX_LIST_ITEMS = 8
+MAX_TEXT_CHARS = 600
+# Bump whenever the prompt or categories change so cached summaries are regenerated
+PROMPT_VERSION = "1"
+
+CATEGORIES = [
+    "Education", "Entertainment", "Technology", "Lifestyle", "Travel", 
+    "Food", "Health", "Fitness", "Finance", "News", "Comedy", "Gaming", 
+    "Music", "Art", "Fashion", "Business", "Science", "History", 
+    "Motivation", "Sports", "Politics", "Tutorial", "Review", "Vlog", "DIY"
+]
+
 def extract_flattened_post_data(data):
     """
     Extracts and flattens post data into a simplified structure.
     """
     post_summary = data.get("post_summary", {})
     
-    # Log the entire input data for debugging
-    logging.info(f"Input data: {json.dumps(data, indent=2)}")
-    logging.info(f"Post summary structure: {post_summary}")
+    # Log a sample of the raw input for debugging
+    if LOG_SAMPLE_RATE > 0 and logging.getLogger().isEnabledFor(logging.DEBUG) and random.random() < LOG_SAMPLE_RATE:
+        logging.debug(f"Input data (sampled): {json.dumps(data, default=str)}")
     
     # Initialize default values
     actions = []
@@ -105,30 +143,11 @@ def extract_flattened_post_data(data):
     }
     return flat_json
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def call_openai_api(client, model, messages, temperature):
+def llm_input(data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Makes a call to the OpenAI API with retry logic.
-    """
-    return client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature
-    )
-
-def llm_summarizer(data: Dict[str, Any]) -> Dict[str, str]:
-    """
-    Uses GPT API to summarize post data and classify into one of 25 categories.
-    Returns a dictionary with summary and category.
+    Selects the flattened fields that are sent to the LLM.
     """
-    categories = [
-        "Education", "Entertainment", "Technology", "Lifestyle", "Travel", 
-        "Food", "Health", "Fitness", "Finance", "News", "Comedy", "Gaming", 
-        "Music", "Art", "Fashion", "Business", "Science", "History", 
-        "Motivation", "Sports", "Politics", "Tutorial", "Review", "Vlog", "DIY"
-    ]
-    
-    summary_data = {
+    return {
         "description": data.get("description", ""),
         "main_actions": data.get("main_actions", []),
         "audio_element_specifics": data.get("audio_element_specifics", []),
@@ -142,13 +161,105 @@ def llm_summarizer(data: Dict[str, Any]) -> Dict[str, str]:
         "quality_indicators": data.get("quality_indicators", []),
         "psychological_views": data.get("psychological_views", [])
     }
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+def _truncate_text(value: str, max_chars: int) -> str:
+    if len(value) <= max_chars:
+        return value
+    return value[:max_chars].rsplit(" ", 1)[0] + "..."
+
+def compact_input(data: Dict[str, Any], token_budget: int = LLM_POST_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    LLM input with empty fields dropped, lists capped at MAX_LIST_ITEMS and texts at
+    MAX_TEXT_CHARS. If the post still exceeds `token_budget` estimated tokens, the longest
+    list is halved (or, when no list can shrink, the longest text) until it fits.
+    """
+    fields = {}
+    for key, value in llm_input(data).items():
+        if isinstance(value, list):
+            value = [item for item in value if not _is_empty(item)][:MAX_LIST_ITEMS]
+        elif isinstance(value, str):
+            value = _truncate_text(value.strip(), MAX_TEXT_CHARS)
+        if not _is_empty(value):
+            fields[key] = value
+    
+    while estimate_tokens(compact_json(fields)) > token_budget:
+        lists = [key for key, value in fields.items() if isinstance(value, list) and len(value) > 1]
+        if lists:
+            key = max(lists, key=lambda k: len(compact_json(fields[k])))
+            fields[key] = fields[key][:len(fields[key]) // 2]
+            continue
+        texts = [key for key, value in fields.items() if isinstance(value, str) and len(value) > 80]
+        if not texts:
+            break
+        key = max(texts, key=lambda k: len(fields[k]))
+        fields[key] = _truncate_text(fields[key], len(fields[key]) // 2)
+    return fields
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or separator spaces, as sent in prompts."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def content_hash(data: Dict[str, Any]) -> str:
+    """
+    Stable hash of the LLM input plus the prompt version and model. Counters such as
+    upvote_count and view_count are left out, so they can change without a new LLM call.
+    """
+    payload = {
+        "input": llm_input(data),
+        "title": data.get("title"),
+        "prompt_version": PROMPT_VERSION,
+        "model": LLM_MODEL,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def parse_json_content(raw_content: str) -> Any:
+    """
+    Parses the JSON body of a completion, stripping whitespace and code fences.
+    Raises ValueError when the content is empty or not valid JSON.
+    """
+    raw_content = (raw_content or "").strip()
+    if raw_content.startswith("```"):
+        raw_content = raw_content[3:]
+        if raw_content.startswith("json"):
+            raw_content = raw_content[4:]
+        if raw_content.endswith("```"):
+            raw_content = raw_content[:-3]
+        raw_content = raw_content.strip()
+    
+    if not raw_content:
+        raise ValueError("Empty response content from API")
+    
+    try:
+        return json.loads(raw_content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON response: {str(e)}")
+
+def _usage_text(response) -> str:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return "usage not reported"
+    return f"{usage.prompt_tokens} prompt + {usage.completion_tokens} completion tokens"
+
+async def llm_summarizer(data: Dict[str, Any], client: LLMClient) -> Dict[str, str]:
+    """
+    Uses GPT API to summarize post data and classify into one of 25 categories.
+    Returns a dictionary with summary and category ("failed" is set when the API call failed).
+    The call goes through the shared, rate-limited `client`.
+    """
+    categories = CATEGORIES
+    
+    summary_data = compact_input(data)
     
     prompt = f"""
     Summarize the following post data in 2-3 sentences and classify it into exactly ONE of these categories: {', '.join(categories)}.
     Ensure the response is a valid JSON object with 'summary' and 'category' fields, and nothing else.
     
     Post Data:
-    {json.dumps(summary_data, indent=2)}
+    {compact_json(summary_data)}
     
     Response format:
     {{"summary": "Your summary here", "category": "One of the categories"}}
@@ -159,39 +270,30 @@ def llm_summarizer(data: Dict[str, Any]) -> Dict[str, str]:
             logging.error(f"OPENAI_API_KEY environment variable is not set for post ID: {data.get('id')}")
             return {
                 "summary": "Failed to generate summary due to missing API key.",
-                "category": "Entertainment"
+                "category": "Entertainment",
+                "failed": True
             }
         
-        client = OpenAI()
-        logging.info(f"Sending API request for post ID: {data.get('id')}")
-        response = call_openai_api(
-            client=client,
-            model="gpt-4.1-nano",  # Updated to a valid model
+        logging.debug(f"Sending API request for post ID: {data.get('id')}")
+        response = await client.complete(
+            model=LLM_MODEL,
             messages=[
                 {"role": "system", "content": "You are a helpful assistant that summarizes content and categorizes it accurately. Always return a valid JSON object."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7
+            temperature=0.7,
+            tag="single"
         )
         
         # Log the raw response content for debugging
         raw_content = response.choices[0].message.content
-        logging.info(f"Received API response for post ID: {data.get('id')}: {raw_content}")
-        
-        # Strip whitespace and handle code fences
-        raw_content = raw_content.strip()
-        if raw_content.startswith("```json"):
-            raw_content = raw_content[7:-3].strip()
-        
-        if not raw_content:
-            raise ValueError("Empty response content from API")
+        logging.debug(f"Received API response for post ID: {data.get('id')} ({_usage_text(response)}): {raw_content}")
         
-        # Attempt to parse JSON
         try:
-            result = json.loads(raw_content)
-        except json.JSONDecodeError as e:
+            result = parse_json_content(raw_content)
+        except ValueError:
             logging.error(f"Failed to parse API response as JSON for post ID: {data.get('id')}: {raw_content}")
-            raise ValueError(f"Invalid JSON response: {str(e)}")
+            raise
         
         # Validate the result structure
         if not isinstance(result, dict) or "summary" not in result or "category" not in result:
@@ -208,15 +310,97 @@ def llm_summarizer(data: Dict[str, Any]) -> Dict[str, str]:
         logging.error(f"API error for post ID: {data.get('id')}: {str(e)}")
         return {
             "summary": "Failed to generate summary due to API error.",
-            "category": "Entertainment"
+            "category": "Entertainment",
+            "failed": True
         }
 
-def process_post(post):
+def batch_line(data: Dict[str, Any]) -> str:
     """
-    Processes a single post, extracts required fields, summarizes data, and returns the updated post.
+    Serializes one post of a batched prompt as a single JSON line tagged with its id.
+    """
+    return compact_json({"id": data.get("id"), **compact_input(data)})
+
+def _valid_batch_element(element: Any) -> bool:
+    return (
+        isinstance(element, dict)
+        and element.get("id") is not None
+        and isinstance(element.get("summary"), str)
+        and element["summary"].strip() != ""
+        and element.get("category") in CATEGORIES
+    )
+
+async def llm_batch_summarizer(items: List[Dict[str, Any]], client: LLMClient) -> List[Dict[str, str]]:
     """
-    logging.info(f"Processing post ID: {post.get('id')}")
+    Uses one GPT API request to summarize and classify several posts, so the category
+    instructions are sent once per batch instead of once per post.
+    Returns one result per item, in the same order. Items missing from the response, or whose
+    element is malformed or has an unknown category, fall back to a single-post llm_summarizer call.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return list(await asyncio.gather(*(llm_summarizer(data, client) for data in items)))
+    
+    lines = "\n".join(batch_line(data) for data in items)
+    prompt = f"""
+    Summarize each of the following posts in 2-3 sentences and classify each into exactly ONE of these categories: {', '.join(CATEGORIES)}.
+    Each post is a JSON object on its own line. Ensure the response is a valid JSON array with one object per post, each with 'id', 'summary' and 'category' fields, and nothing else.
+    
+    Posts:
+    {lines}
+    
+    Response format:
+    [{{"id": <post id>, "summary": "Your summary here", "category": "One of the categories"}}]
+    """
+    
+    ids = [str(data.get("id")) for data in items]
+    results = {}
+    try:
+        logging.debug(f"Sending batched API request for {len(items)} posts: {', '.join(ids)}")
+        response = await client.complete(
+            model=LLM_MODEL,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that summarizes content and categorizes it accurately. Always return a valid JSON array."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            estimated_tokens=estimate_tokens(prompt) + BATCH_COMPLETION_TOKENS_PER_POST * len(items),
+            tag="batch"
+        )
+        raw_content = response.choices[0].message.content
+        logging.debug(f"Received batched API response for posts {', '.join(ids)} ({_usage_text(response)}): {raw_content}")
+        
+        parsed = parse_json_content(raw_content)
+        # Tolerate the array being wrapped in an object, e.g. {"posts": [...]}
+        if isinstance(parsed, dict):
+            parsed = next((value for value in parsed.values() if isinstance(value, list)), None)
+        if not isinstance(parsed, list):
+            raise ValueError("Response is not a JSON array")
+        
+        for element in parsed:
+            if not _valid_batch_element(element):
+                logging.warning(f"Discarding invalid batch element: {str(element)[:200]}")
+                continue
+            post_id = str(element["id"])
+            if post_id in ids and post_id not in results:
+                results[post_id] = {"summary": element["summary"], "category": element["category"]}
+    except Exception as e:
+        logging.error(f"Batched API error for posts {', '.join(ids)}: {str(e)}")
+    
+    missing = [data for data in items if str(data.get("id")) not in results]
+    if missing:
+        logging.warning(f"{len(missing)} of {len(items)} posts missing from batched response, retrying them one by one")
+        fallback = await asyncio.gather(*(llm_summarizer(data, client) for data in missing))
+        for data, result in zip(missing, fallback):
+            results[str(data.get("id"))] = result
+    return [results[post_id] for post_id in ids]
+
+def _prepare_post(post, summary_cache=None):
+    """
+    Flattens a post and hashes its LLM input. `row` is the finished result when
+    `summary_cache` holds a summary with the same content hash, else None.
+    """
+    logging.debug(f"Processing post ID: {post.get('id')}")
     flat_data = extract_flattened_post_data(post)
+    post_hash = content_hash(flat_data)
     
     selected_fields = {
         "id": flat_data.get("id"),
@@ -230,49 +414,331 @@ def process_post(post):
         "main_character_gender": flat_data.get("main_character_gender")
     }
     
-    llm_result = llm_summarizer(flat_data)
-    
+    row = None
+    cached = (summary_cache or {}).get(flat_data.get("id"))
+    if cached and cached["content_hash"] == post_hash:
+        logging.debug(f"Post ID {post.get('id')} unchanged, reusing stored summary")
+        row = {
+            **selected_fields,
+            "summary": cached["summary"],
+            "category": cached["category"],
+            "content_hash": post_hash,
+            "cached": True
+        }
+    return {"flat_data": flat_data, "selected_fields": selected_fields, "content_hash": post_hash, "row": row}
+
+def _local_post(prepared, decision):
+    """Result for a post answered by the category cascade without calling the LLM."""
     return {
-        **selected_fields,
+        **prepared["selected_fields"],
+        "summary": decision["summary"],
+        "category": decision["category"],
+        "content_hash": LOCAL_HASH_PREFIX + prepared["content_hash"],
+        "cached": False
+    }
+
+def _summarized_post(prepared, llm_result, cascade=None):
+    if cascade is not None and prepared.get("decision") and not llm_result.get("failed"):
+        cascade.record(prepared["decision"], llm_result["category"])
+    return {
+        **prepared["selected_fields"],
         "summary": llm_result["summary"],
-        "category": llm_result["category"]
+        "category": llm_result["category"],
+        # Failed summaries get no hash so the next run retries them
+        "content_hash": None if llm_result.get("failed") else prepared["content_hash"],
+        "cached": False
     }
 
-def process_posts(posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+async def process_post(post, client, summary_cache=None):
+    """
+    Processes a single post, extracts required fields, summarizes data, and returns the updated post.
+    If `summary_cache` holds a summary for the post with the same content hash, it is reused
+    instead of calling the LLM.
+    """
+    prepared = _prepare_post(post, summary_cache)
+    if prepared["row"] is not None:
+        return prepared["row"]
+    return _summarized_post(prepared, await llm_summarizer(prepared["flat_data"], client))
+
+async def _process_batch(batch, client, cascade=None):
+    """Summarizes a batch of prepared posts with one request (or a single-post call for a batch of one)."""
+    if len(batch) == 1:
+        results = [await llm_summarizer(batch[0]["flat_data"], client)]
+    else:
+        results = await llm_batch_summarizer([prepared["flat_data"] for prepared in batch], client)
+    return [_summarized_post(prepared, result, cascade) for prepared, result in zip(batch, results)]
+
+async def process_posts_async(posts: List[Dict[str, Any]], summary_cache=None, client=None,
+                              batch_size=LLM_BATCH_SIZE, token_budget=LLM_BATCH_TOKEN_BUDGET,
+                              on_result=None, cascade=None) -> List[Dict[str, Any]]:
     """
-    Processes each post in parallel, extracts required fields, summarizes remaining data,
-    and returns an array of updated posts.
+    Processes posts concurrently on one event loop with a shared rate-limited LLM client.
+    Posts that need the LLM are packed into batches of up to `batch_size` posts and
+    `token_budget` estimated tokens, one request per batch. Up to the client's maximum
+    concurrency of requests are in progress at a time, so its adaptive limit can use its full
+    range, and never more than LLM_MAX_IN_FLIGHT posts; how many requests are actually
+    calling the API is decided by the adaptive limit.
+    
+    `on_result`, if given, is awaited with each list of finished posts as soon as it is
+    available (e.g. SummaryWriter.add), so results can be persisted while the run continues.
+    With a `cascade` (see category_classifier.CategoryCascade), posts the local classifier is
+    confident about are categorized without calling the LLM.
     """
+    own_client = client is None
+    client = client or LLMClient()
+    batch_size = max(1, batch_size)
     updated_posts = []
-    with ThreadPoolExecutor(max_workers=5) as executor:  # Adjust max_workers based on system
-        future_to_post = {executor.submit(process_post, post): post for post in posts}
-        for future in as_completed(future_to_post):
+    cached_rows = []
+    counts = {"sent": 0}
+    
+    def batches():
+        batch, batch_tokens = [], 0
+        for post in posts:
             try:
-                updated_posts.append(future.result())
+                prepared = _prepare_post(post, summary_cache)
             except Exception as e:
                 logging.error(f"Error processing post: {str(e)}")
+                continue
+            if prepared["row"] is not None:
+                cached_rows.append(prepared["row"])
+                continue
+            if cascade is not None:
+                prepared["decision"] = cascade.route(prepared["flat_data"])
+                if prepared["decision"]["local"]:
+                    cached_rows.append(_local_post(prepared, prepared["decision"]))
+                    continue
+            tokens = estimate_tokens(batch_line(prepared["flat_data"]))
+            if batch and (len(batch) >= batch_size or batch_tokens + tokens > token_budget):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(prepared)
+            batch_tokens += tokens
+            counts["sent"] += 1
+        if batch:
+            yield batch
+    
+    async def emit(rows):
+        updated_posts.extend(rows)
+        if on_result is not None and rows:
+            await on_result(rows)
+    
+    # The request window follows the client's concurrency ceiling; the post bound caps memory
+    max_batches = max(1, client.concurrency.max_limit)
+    pending = {}
+    batches_iter = batches()
+    try:
+        while True:
+            in_flight_posts = sum(pending.values())
+            if len(pending) < max_batches and in_flight_posts < LLM_MAX_IN_FLIGHT:
+                for batch in batches_iter:
+                    pending[asyncio.ensure_future(_process_batch(batch, client, cascade))] = len(batch)
+                    in_flight_posts += len(batch)
+                    if len(pending) >= max_batches or in_flight_posts >= LLM_MAX_IN_FLIGHT:
+                        break
+            ready, cached_rows[:] = list(cached_rows), []
+            await emit(ready)
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                try:
+                    rows = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing batch: {str(e)}")
+                    continue
+                await emit(rows)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_client:
+            await client.aclose()
+    cached = sum(1 for post in updated_posts if post.pop("cached", False))
+    logging.info(f"Processed {len(updated_posts)} posts: {cached} unchanged (cached), {len(updated_posts) - cached} summarized")
+    logging.info(f"LLM client stats: {client.snapshot()}")
+    logging.info(f"LLM token report: {json.dumps(client.token_report(items=counts['sent']))}")
+    if cascade is not None:
+        logging.info(f"Category cascade stats: {cascade.snapshot()}")
     return updated_posts
 
-def main():
+class SummaryWriter:
     """
-    Main function to load posts, process them, and store updated summaries.
+    Stores finished summaries while the summarizer is still running. Rows are buffered and
+    bulk-upserted every `flush_size` rows or `flush_interval` seconds, in a worker thread so
+    the event loop keeps serving LLM calls. After each successful flush the ids of the
+    successfully summarized posts are appended to the checkpoint file, which --resume reads
+    to skip them.
+
+    Rows that fail validation are dropped when added. If a flush fails, its rows are stored
+    one by one so that a single bad row cannot hold back the others; rows that still fail
+    are kept for the next flush and dropped after `store_attempts` failed flushes.
     """
-    from database_manager import load_all_posts, store_updated_post_summaries
+    
+    def __init__(self, flush_size=SUMMARY_FLUSH_SIZE, flush_interval=SUMMARY_FLUSH_INTERVAL, checkpoint_path=SUMMARY_CHECKPOINT,
+                 store_attempts=SUMMARY_STORE_ATTEMPTS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.checkpoint_path = checkpoint_path
+        self.store_attempts = store_attempts
+        self.buffer = []
+        self.stored = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.last_flush = time.monotonic()
+        # Failed flushes per post id of the rows still buffered
+        self._failures = {}
+        self._lock = asyncio.Lock()
+    
+    async def add(self, rows):
+        self.buffer.extend(self._validate(rows))
+        if len(self.buffer) >= self.flush_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            await self.flush()
+    
+    def _validate(self, rows):
+        """Return the rows that convert to updated_post_summaries rows, logging and dropping the others."""
+        from database_manager import prepare_rows
+        valid = []
+        for row in rows:
+            try:
+                prepare_rows("updated_post_summaries", [row])
+            except Exception as e:
+                logging.error(f"Dropping summary for post {row.get('id')}: {str(e)}")
+                self.dropped += 1
+                continue
+            valid.append(row)
+        return valid
+    
+    async def flush(self):
+        async with self._lock:
+            self.last_flush = time.monotonic()
+            if not self.buffer:
+                return
+            rows, self.buffer = self.buffer, []
+            try:
+                await asyncio.to_thread(self._store, rows)
+                stored, failed = rows, []
+            except Exception as e:
+                logging.error(f"Failed to store {len(rows)} summaries, storing them one by one: {str(e)}")
+                stored, failed = await asyncio.to_thread(self._store_each, rows)
+            self._requeue(failed)
+            if stored:
+                self.stored += len(stored)
+                self.flushes += 1
+                logging.info(f"Stored {len(stored)} summaries ({self.stored} this run)")
+    
+    def _store(self, rows):
+        from database_manager import store_updated_post_summaries
+        store_updated_post_summaries(rows)
+        if self.checkpoint_path:
+            # Failed summaries (no content hash) are left out so a resumed run retries them
+            with open(self.checkpoint_path, "a") as f:
+                f.writelines(f"{row['id']}\n" for row in rows if row.get("content_hash"))
+        for row in rows:
+            self._failures.pop(row["id"], None)
+    
+    def _store_each(self, rows):
+        """Store rows individually; returns (stored rows, rows that failed)."""
+        stored, failed = [], []
+        for row in rows:
+            try:
+                self._store([row])
+            except Exception as e:
+                logging.error(f"Failed to store the summary for post {row.get('id')}: {str(e)}")
+                failed.append(row)
+                continue
+            stored.append(row)
+        return stored, failed
+    
+    def _requeue(self, rows):
+        """Buffer failed rows for the next flush, dropping those that failed `store_attempts` times."""
+        kept = []
+        for row in rows:
+            failures = self._failures.get(row["id"], 0) + 1
+            if failures >= self.store_attempts:
+                logging.error(f"Dropping the summary for post {row['id']} after {failures} failed flushes")
+                self._failures.pop(row["id"], None)
+                self.dropped += 1
+                continue
+            self._failures[row["id"]] = failures
+            kept.append(row)
+        self.buffer = kept + self.buffer
+    
+    async def close(self):
+        """Flush whatever is still buffered. Returns False if some rows could not be stored."""
+        await self.flush()
+        if self.buffer or self.dropped:
+            logging.error(f"{len(self.buffer) + self.dropped} summaries could not be stored")
+            return False
+        return True
+
+def read_checkpoint(path=SUMMARY_CHECKPOINT):
+    """Return the set of post ids stored by an interrupted run (empty if there is no checkpoint)."""
+    try:
+        with open(path) as f:
+            return {int(line) for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+def clear_checkpoint(path=SUMMARY_CHECKPOINT):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def process_posts(posts: List[Dict[str, Any]], summary_cache=None) -> List[Dict[str, Any]]:
+    """
+    Processes each post concurrently, extracts required fields, summarizes remaining data,
+    and returns an array of updated posts. Posts found unchanged in `summary_cache` skip the LLM.
+    """
+    return asyncio.run(process_posts_async(posts, summary_cache))
+
+async def summarize_and_store(posts: List[Dict[str, Any]], summary_cache=None, writer=None, cascade=None) -> Dict[str, Any]:
+    """
+    Processes posts and stores the results progressively through a SummaryWriter.
+    Buffered results are flushed even when the run is interrupted or cancelled.
+    """
+    writer = writer or SummaryWriter()
+    processed = 0
+    try:
+        processed = len(await process_posts_async(posts, summary_cache, on_result=writer.add, cascade=cascade))
+    finally:
+        complete = await writer.close()
+    return {"processed": processed, "stored": writer.stored, "dropped": writer.dropped, "flushes": writer.flushes, "complete": complete}
+
+def main(resume=False):
+    """
+    Main function to load posts, process them, and store updated summaries as they complete.
+    With `resume`, posts stored by the previous, interrupted run (see SUMMARY_CHECKPOINT) are skipped.
+    """
+    from database_manager import load_all_posts, load_summary_cache, warn_pending_migrations
     logging.info("Starting main function")
+    warn_pending_migrations()
     data = load_all_posts()
     posts = data.get("posts", [])
-    logging.info(f"Loaded {len(posts)} posts")
+    summary_cache = load_summary_cache()
+    logging.info(f"Loaded {len(posts)} posts, {len(summary_cache)} stored summaries with content hashes")
     
-    updated_posts = []
+    if resume:
+        done = read_checkpoint()
+        posts = [post for post in posts if post.get("id") not in done]
+        logging.info(f"Resuming: {len(done)} posts already stored by the previous run, {len(posts)} left")
+    else:
+        clear_checkpoint()
+    
+    # Uses the local category classifier once one has been trained (python category_classifier.py)
+    cascade = CategoryCascade.load()
     try:
-        updated_posts = process_posts(posts)
-        store_updated_post_summaries(updated_posts)
-        print(json.dumps(updated_posts, indent=2))
+        report = asyncio.run(summarize_and_store(posts, summary_cache, cascade=cascade))
     except KeyboardInterrupt:
-        logging.info("KeyboardInterrupt detected. Saving progress...")
-        store_updated_post_summaries(updated_posts)  # Save any processed posts
-        logging.info("Progress saved. Exiting.")
-    return updated_posts
+        logging.info("KeyboardInterrupt detected. Finished summaries were saved; run with --resume to continue.")
+        return None
+    if report["complete"]:
+        clear_checkpoint()
+    logging.info(f"Summarized {report['processed']} posts, stored {report['stored']} in {report['flushes']} flushes")
+    return report
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Summarize and categorize posts with the LLM and store the results.")
+    parser.add_argument("--resume", action="store_true", help="Skip posts already stored by the previous, interrupted run")
+    args = parser.parse_args()
+    main(resume=args.resume)
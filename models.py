@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -87,6 +87,11 @@ class Post(Base):
 
 class PostView(Base):
     __tablename__ = 'post_views'
+    __table_args__ = (
+        # Views are repeatable events, so the (user, post) index is not unique
+        Index('ix_post_views_user_post', 'user_id', 'post_id'),
+        Index('ix_post_views_post_id', 'post_id'),
+    )
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -94,6 +99,11 @@ class PostView(Base):
 
 class PostLike(Base):
     __tablename__ = 'post_likes'
+    __table_args__ = (
+        # One like/inspire/rating per (user, post); also serves per-user lookups
+        Index('ux_post_likes_user_post', 'user_id', 'post_id', unique=True),
+        Index('ix_post_likes_post_id', 'post_id'),
+    )
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -101,6 +111,11 @@ class PostLike(Base):
 
 class PostInspire(Base):
     __tablename__ = 'post_inspires'
+    __table_args__ = (
+        # One like/inspire/rating per (user, post); also serves per-user lookups
+        Index('ux_post_inspires_user_post', 'user_id', 'post_id', unique=True),
+        Index('ix_post_inspires_post_id', 'post_id'),
+    )
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -108,6 +123,11 @@ class PostInspire(Base):
 
 class PostRating(Base):
     __tablename__ = 'post_ratings'
+    __table_args__ = (
+        # One like/inspire/rating per (user, post); also serves per-user lookups
+        Index('ux_post_ratings_user_post', 'user_id', 'post_id', unique=True),
+        Index('ix_post_ratings_post_id', 'post_id'),
+    )
     id = Column(Integer, primary_key=True)
     post_id = Column(Integer, ForeignKey('posts.id'), nullable=False)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -129,4 +149,46 @@ class UpdatedPostSummary(Base):
     estimated_duration = Column(String, default="")
     main_character_gender = Column(String, default="")
     summary = Column(String, nullable=False)
-    category = Column(String, nullable=False)
\ No newline at end of file
+    category = Column(String, nullable=False)
+    # Hash of the LLM input, prompt version and model that produced summary/category
+    content_hash = Column(String, nullable=True)
+
+class PostViewRollup(Base):
+    """Views older than the retention horizon, rolled up per (user, post) by compact_post_views()."""
+    __tablename__ = 'post_view_rollups'
+    __table_args__ = (
+        Index('ix_post_view_rollups_post_id', 'post_id'),
+    )
+
+    user_id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    first_viewed_at = Column(DateTime)
+    last_viewed_at = Column(DateTime)
+
+class UserPostInteraction(Base):
+    """Combined interaction weight per (user, post), kept in sync with the raw event tables at ingest time."""
+    __tablename__ = 'user_post_interactions'
+    __table_args__ = (
+        Index('ix_user_post_interactions_post_id', 'post_id'),
+    )
+
+    user_id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, primary_key=True)
+    weight = Column(Float, nullable=False, default=0.0)
+    like_count = Column(Integer, nullable=False, default=0)
+    view_count = Column(Integer, nullable=False, default=0)
+    inspire_count = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_percent = Column(Float, nullable=True)
+    last_event_at = Column(DateTime)
+
+class SyncState(Base):
+    __tablename__ = 'sync_state'
+
+    table_name = Column(String, primary_key=True)
+    watermark_column = Column(String, nullable=False)
+    watermark = Column(String, nullable=True)
+    last_page = Column(Integer, default=1)
+    etag = Column(String, nullable=True)
+    updated_at = Column(DateTime)
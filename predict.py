@@ -1,11 +1,126 @@
 from recommendation_engine import RecommendationEngine
-from database_manager import load_all_posts
+from database_manager import load_all_posts, load_updated_post_summaries
 import json
 import logging
+import os
+import threading
+import time
+from metrics import PREDICT_STAGE_SECONDS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# How often the popularity list used by degraded /feed responses is rebuilt in the background
+POPULAR_REFRESH_SECONDS = float(os.getenv("POPULAR_REFRESH_SECONDS", "600"))
+POPULAR_LIST_SIZE = int(os.getenv("POPULAR_LIST_SIZE", "500"))
+
+# Age after which the shared engine is replaced by a freshly loaded one
+ENGINE_MAX_AGE_SECONDS = float(os.getenv("ENGINE_MAX_AGE_SECONDS", "3600"))
+
+_popular_lock = threading.Lock()
+_popular_posts = {"built_at": 0.0, "posts": []}
+_popular_refresh = {"thread": None, "stop": None}
+
+_engine_lock = threading.Lock()
+_engine = {"created_at": 0.0, "engine": None}
+
+def get_engine():
+    """
+    Return the shared recommendation engine, replacing it once it is older than
+    ENGINE_MAX_AGE_SECONDS. The engine loads its data lazily on first use.
+    """
+    with _engine_lock:
+        if _engine["engine"] is None or time.time() - _engine["created_at"] > ENGINE_MAX_AGE_SECONDS:
+            _engine["engine"] = RecommendationEngine()
+            _engine["created_at"] = time.time()
+        return _engine["engine"]
+
+def engine_is_cold():
+    """
+    Whether the next predict_posts call will build an engine first (on first use and
+    once the shared engine is older than ENGINE_MAX_AGE_SECONDS).
+    """
+    with _engine_lock:
+        engine = _engine["engine"]
+        if engine is None or time.time() - _engine["created_at"] > ENGINE_MAX_AGE_SECONDS:
+            return True
+        return engine.posts_df is None
+
+def apply_interaction_updates(updates):
+    """
+    Incremental update path for real-time events: push fresh (user, post) weights
+    into the shared engine without rebuilding it.
+    
+    Args:
+        updates (pd.DataFrame): user_id, post_id and weight columns
+    
+    Returns:
+        int: number of (user, post) pairs applied
+    """
+    return get_engine().update_interactions(updates)
+
+def format_post(post):
+    """
+    Transform a post loaded from the database into the feed response format.
+    
+    Args:
+        post (dict): Post as returned by load_all_posts()
+    
+    Returns:
+        dict: Post in the feed response format
+    """
+    return {
+        "id": post["id"],
+        "owner": {
+            "first_name": post.get("first_name", ""),
+            "last_name": post.get("last_name", ""),
+            "name": f"{post.get('first_name', '')} {post.get('last_name', '')}".strip(),
+            "username": post.get("username", ""),
+            "picture_url": post.get("picture_url", ""),
+            "user_type": post.get("user_type", None),
+            "has_evm_wallet": post.get("has_evm_wallet", False),
+            "has_solana_wallet": post.get("has_solana_wallet", False)
+        },
+        "category": {
+            "id": post["category"].get("id", 0),
+            "name": post["category"].get("name", ""),
+            "count": post["category"].get("count", 0),
+            "description": post["category"].get("description", ""),
+            "image_url": post["category"].get("image_url", "")
+        },
+        "topic": post.get("topic", []),
+        "title": post.get("title", ""),
+        "is_available_in_public_feed": post.get("is_available_in_public_feed", False),
+        "is_locked": post.get("is_locked", False),
+        "slug": post.get("slug", ""),
+        "upvoted": post.get("upvoted", False),
+        "bookmarked": post.get("bookmarked", False),
+        "following": post.get("following", False),
+        "identifier": post.get("identifier", ""),
+        "comment_count": post.get("comment_count", 0),
+        "upvote_count": post.get("upvote_count", 0),
+        "view_count": post.get("view_count", 0),
+        "exit_count": post.get("exit_count", 0),
+        "rating_count": post.get("rating_count", 0),
+        "average_rating": post.get("average_rating", 0),
+        "share_count": post.get("share_count", 0),
+        "bookmark_count": post.get("bookmark_count", 0),
+        "video_link": post.get("video_link", ""),
+        "thumbnail_url": post.get("thumbnail_url", ""),
+        "gif_thumbnail_url": post.get("gif_thumbnail_url", ""),
+        "contract_address": post.get("contract_address", ""),
+        "chain_id": post.get("chain_id", ""),
+        "chart_url": post.get("chart_url", ""),
+        "baseToken": post.get("baseToken", {
+            "address": "",
+            "name": "",
+            "symbol": "",
+            "image_url": ""
+        }),
+        "created_at": post.get("created_at", 0),
+        "tags": post.get("tags", [])
+    }
+
 def predict_posts(user_id, category=None, num_recommendations=10):
     """
     Predict recommended posts for a user and return them in the specified JSON format.
@@ -19,26 +134,28 @@ def predict_posts(user_id, category=None, num_recommendations=10):
         dict: JSON response with recommended posts in the specified format
     """
     try:
-        # Initialize recommendation engine
-        engine = RecommendationEngine()
+        # Shared recommendation engine, kept current by the event stream
+        engine = get_engine()
         
         # Get recommended post IDs
-        recommended_post_ids = engine.recommend_posts(user_id, category, num_recommendations)
-        logging.info(f"Recommended post IDs for user {user_id}" + 
-                     (f" in category {category}" if category else "") + 
-                     f": {recommended_post_ids}")
+        with PREDICT_STAGE_SECONDS.time(stage="scoring"):
+            recommended_post_ids = engine.recommend_posts(user_id, category, num_recommendations)
+        logging.debug(f"Recommended post IDs for user {user_id}" + 
+                      (f" in category {category}" if category else "") + 
+                      f": {recommended_post_ids}")
         
         # Load all posts from database
+        hydration_started = time.perf_counter()
         posts_data = load_all_posts()
         
         # Handle case where posts_data is a dictionary
         if isinstance(posts_data, dict):
-            logging.info(f"posts_data is a dictionary with keys: {list(posts_data.keys())}")
+            logging.debug(f"posts_data is a dictionary with keys: {list(posts_data.keys())}")
             # Try common keys that might contain the posts list
             for key in ["posts", "data", "results"]:
                 if key in posts_data and isinstance(posts_data[key], list):
                     posts_data = posts_data[key]
-                    logging.info(f"Extracted posts list from key '{key}'")
+                    logging.debug(f"Extracted posts list from key '{key}'")
                     break
             else:
                 logging.error(f"No valid posts list found in dictionary: {posts_data.keys()}")
@@ -65,66 +182,18 @@ def predict_posts(user_id, category=None, num_recommendations=10):
             except Exception as e:
                 logging.warning(f"Error processing post: {e}")
                 continue
+        PREDICT_STAGE_SECONDS.observe(time.perf_counter() - hydration_started, stage="hydration")
         
         # Transform each post to the required format
         formatted_posts = []
-        for post in matching_posts:
-            try:
-                formatted_post = {
-                    "id": post["id"],
-                    "owner": {
-                        "first_name": post.get("first_name", ""),
-                        "last_name": post.get("last_name", ""),
-                        "name": f"{post.get('first_name', '')} {post.get('last_name', '')}".strip(),
-                        "username": post.get("username", ""),
-                        "picture_url": post.get("picture_url", ""),
-                        "user_type": post.get("user_type", None),
-                        "has_evm_wallet": post.get("has_evm_wallet", False),
-                        "has_solana_wallet": post.get("has_solana_wallet", False)
-                    },
-                    "category": {
-                        "id": post["category"].get("id", 0),
-                        "name": post["category"].get("name", ""),
-                        "count": post["category"].get("count", 0),
-                        "description": post["category"].get("description", ""),
-                        "image_url": post["category"].get("image_url", "")
-                    },
-                    "topic": post.get("topic", []),
-                    "title": post.get("title", ""),
-                    "is_available_in_public_feed": post.get("is_available_in_public_feed", False),
-                    "is_locked": post.get("is_locked", False),
-                    "slug": post.get("slug", ""),
-                    "upvoted": post.get("upvoted", False),
-                    "bookmarked": post.get("bookmarked", False),
-                    "following": post.get("following", False),
-                    "identifier": post.get("identifier", ""),
-                    "comment_count": post.get("comment_count", 0),
-                    "upvote_count": post.get("upvote_count", 0),
-                    "view_count": post.get("view_count", 0),
-                    "exit_count": post.get("exit_count", 0),
-                    "rating_count": post.get("rating_count", 0),
-                    "average_rating": post.get("average_rating", 0),
-                    "share_count": post.get("share_count", 0),
-                    "bookmark_count": post.get("bookmark_count", 0),
-                    "video_link": post.get("video_link", ""),
-                    "thumbnail_url": post.get("thumbnail_url", ""),
-                    "gif_thumbnail_url": post.get("gif_thumbnail_url", ""),
-                    "contract_address": post.get("contract_address", ""),
-                    "chain_id": post.get("chain_id", ""),
-                    "chart_url": post.get("chart_url", ""),
-                    "baseToken": post.get("baseToken", {
-                        "address": "",
-                        "name": "",
-                        "symbol": "",
-                        "image_url": ""
-                    }),
-                    "created_at": post.get("created_at", 0),
-                    "tags": post.get("tags", [])
-                }
-                formatted_posts.append(formatted_post)
-            except Exception as e:
-                logging.warning(f"Error formatting post {post.get('id', 'unknown')}: {e}")
-                continue
+        with PREDICT_STAGE_SECONDS.time(stage="formatting"):
+            for post in matching_posts:
+                try:
+                    formatted_post = format_post(post)
+                    formatted_posts.append(formatted_post)
+                except Exception as e:
+                    logging.warning(f"Error formatting post {post.get('id', 'unknown')}: {e}")
+                    continue
         
         # Return formatted JSON response
         return {
@@ -136,6 +205,83 @@ def predict_posts(user_id, category=None, num_recommendations=10):
         logging.error(f"Error in predict_posts: {e}")
         return {"status": "error", "message": str(e)}
 
+def _build_popular_posts():
+    """Rank all posts by upvotes then views and keep the top POPULAR_LIST_SIZE, formatted, with their summary category."""
+    posts = load_all_posts()["posts"]
+    summary_categories = {s["post_id"]: s["category"] for s in load_updated_post_summaries()["posts"]}
+    ranked = sorted(
+        posts,
+        key=lambda p: (p.get("upvote_count") or 0, p.get("view_count") or 0),
+        reverse=True
+    )
+    popular = []
+    for post in ranked[:POPULAR_LIST_SIZE]:
+        try:
+            popular.append((summary_categories.get(post["id"]), format_post(post)))
+        except Exception as e:
+            logging.warning(f"Error formatting post {post.get('id', 'unknown')}: {e}")
+    return popular
+
+def refresh_popular_posts():
+    """Rebuild the popularity list and swap it in; a failed build keeps the previous list."""
+    try:
+        popular = _build_popular_posts()
+    except Exception as e:
+        logging.error(f"Failed to rebuild popularity list: {e}")
+        return False
+    with _popular_lock:
+        _popular_posts["posts"] = popular
+        _popular_posts["built_at"] = time.time()
+    logging.info(f"Rebuilt popularity list with {len(popular)} posts")
+    return True
+
+def _refresh_popular_posts_loop(stop):
+    while not stop.wait(POPULAR_REFRESH_SECONDS):
+        refresh_popular_posts()
+
+def start_popular_refresh():
+    """
+    Build the popularity list, then rebuild it every POPULAR_REFRESH_SECONDS in a background
+    thread. Called from the app lifespan, so degraded /feed responses never touch the database.
+    """
+    if _popular_refresh["thread"] is not None:
+        return
+    refresh_popular_posts()
+    stop = _popular_refresh["stop"] = threading.Event()
+    thread = threading.Thread(target=_refresh_popular_posts_loop, args=(stop,), name="popular-refresh", daemon=True)
+    _popular_refresh["thread"] = thread
+    thread.start()
+
+def stop_popular_refresh():
+    """Stop the background rebuilds. Called from the app lifespan."""
+    thread = _popular_refresh["thread"]
+    if thread is None:
+        return
+    _popular_refresh["stop"].set()
+    thread.join()
+    _popular_refresh["thread"] = None
+
+def popular_posts(category=None, num_recommendations=10):
+    """
+    Cheap fallback feed: the most popular posts, optionally filtered by category.
+    Only reads the list kept by start_popular_refresh(), which is empty until it has been built.
+    
+    Args:
+        category (str, optional): Category to filter recommendations
+        num_recommendations (int): Number of posts to return
+    
+    Returns:
+        dict: JSON response in the same format as predict_posts
+    """
+    with _popular_lock:
+        popular = _popular_posts["posts"]
+    
+    selected = [post for post_category, post in popular if not category or post_category == category]
+    return {
+        "status": "success",
+        "post": selected[:num_recommendations]
+    }
+
 if __name__ == "__main__":
     # Example usage
     user_id = 5
@@ -2,36 +2,43 @@ import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from database_manager import fetch_post_likes_ids, fetch_post_views_ids, fetch_post_inspires_ids, fetch_post_ratings_ids_and_rating, load_updated_post_summaries
+from database_manager import load_interaction_columns, load_updated_post_summaries
+from snapshot import SNAPSHOT_DIR, snapshot_available, load_snapshot_table
+from metrics import ENGINE_BUILD_STAGE_SECONDS
 import logging
+import threading
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 class RecommendationEngine:
     def __init__(self):
-        self.likes_df = None
-        self.views_df = None
-        self.inspires_df = None
-        self.ratings_df = None
+        self.interactions_df = None
         self.posts_df = None
         self.interaction_matrix = None
+        self.user_posts = None
         self.user_similarity_df = None
         self.content_similarity_df = None
-
-    def load_and_prepare_data(self):
-        # Load data from database
-        post_likes = fetch_post_likes_ids()['likes']
-        post_views = fetch_post_views_ids()['views']
-        post_inspires = fetch_post_inspires_ids()['inspires']
-        post_ratings = fetch_post_ratings_ids_and_rating()['ratings']
-        updated_posts = load_updated_post_summaries()['posts']
+        # Serializes recommendations with incremental updates from the event stream
+        self._lock = threading.RLock()
+        # Serializes update_interactions calls, which compute similarities outside _lock
+        self._update_lock = threading.Lock()
+
+    def load_and_prepare_data(self, snapshot_dir=SNAPSHOT_DIR):
+        if snapshot_dir and snapshot_available(snapshot_dir):
+            # Load from the columnar snapshot (see snapshot.py); no database access
+            logging.info(f"Loading engine data from snapshot {snapshot_dir}")
+            interactions = load_snapshot_table('user_post_interactions', snapshot_dir)
+            updated_posts = load_snapshot_table('updated_post_summaries', snapshot_dir)
+        else:
+            if snapshot_dir:
+                logging.warning(f"Snapshot {snapshot_dir} is incomplete; loading engine data from the database")
+            # Load the pre-aggregated (user, post) interaction weights as typed NumPy columns
+            interactions = load_interaction_columns('user_post_interactions')
+            updated_posts = load_updated_post_summaries()['posts']
 
         # Convert to DataFrames
-        self.likes_df = pd.DataFrame(post_likes, columns=['user_id', 'post_id'])
-        self.views_df = pd.DataFrame(post_views, columns=['user_id', 'post_id'])
-        self.inspires_df = pd.DataFrame(post_inspires, columns=['user_id', 'post_id'])
-        self.ratings_df = pd.DataFrame(post_ratings, columns=['user_id', 'post_id', 'rating_percent'])
+        self.interactions_df = pd.DataFrame(interactions, columns=['user_id', 'post_id', 'weight'])
         self.posts_df = pd.DataFrame(updated_posts)
 
         # Drop estimated_duration
@@ -49,16 +56,11 @@ class RecommendationEngine:
 
         # Filter interactions to only include post_ids present in posts_df
         valid_post_ids = set(self.posts_df['post_id'])
-        self.likes_df = self.likes_df[self.likes_df['post_id'].isin(valid_post_ids)]
-        self.views_df = self.views_df[self.views_df['post_id'].isin(valid_post_ids)]
-        self.inspires_df = self.inspires_df[self.inspires_df['post_id'].isin(valid_post_ids)]
-        self.ratings_df = self.ratings_df[self.ratings_df['post_id'].isin(valid_post_ids)]
+        total_interactions = len(self.interactions_df)
+        self.interactions_df = self.interactions_df[self.interactions_df['post_id'].isin(valid_post_ids)]
 
         # Log dropped interactions
-        logging.info(f"Filtered likes: {len(post_likes) - len(self.likes_df)} interactions dropped")
-        logging.info(f"Filtered views: {len(post_views) - len(self.views_df)} interactions dropped")
-        logging.info(f"Filtered inspires: {len(post_inspires) - len(self.inspires_df)} interactions dropped")
-        logging.info(f"Filtered ratings: {len(post_ratings) - len(self.ratings_df)} interactions dropped")
+        logging.info(f"Filtered interactions: {total_interactions - len(self.interactions_df)} (user, post) pairs dropped")
 
     def compute_content_similarity(self):
         # Initialize TF-IDF vectorizer
@@ -70,55 +72,77 @@ class RecommendationEngine:
         self.content_similarity_df = pd.DataFrame(content_similarity, index=self.posts_df['post_id'], columns=self.posts_df['post_id'])
 
     def build_interaction_matrix(self):
-        # Create user-post interaction matrix
-        all_users = set(self.likes_df['user_id']).union(self.views_df['user_id'], self.inspires_df['user_id'], self.ratings_df['user_id'])
-        all_posts = set(self.posts_df['post_id'])
-        
-        # Initialize interaction matrix
-        self.interaction_matrix = pd.DataFrame(0.0, index=list(all_users), columns=list(all_posts))
-
-        # Assign weights to interactions
-        LIKE_WEIGHT = 1.0
-        VIEW_WEIGHT = 0.5
-        INSPIRE_WEIGHT = 1.5
-        RATING_THRESHOLD = 50  # Ratings above this are positive
-
-        # Fill matrix with likes
-        for _, row in self.likes_df.iterrows():
-            self.interaction_matrix.loc[row['user_id'], row['post_id']] += LIKE_WEIGHT
-
-        # Fill matrix with views
-        for _, row in self.views_df.iterrows():
-            self.interaction_matrix.loc[row['user_id'], row['post_id']] += VIEW_WEIGHT
-
-        # Fill matrix with inspires
-        for _, row in self.inspires_df.iterrows():
-            self.interaction_matrix.loc[row['user_id'], row['post_id']] += INSPIRE_WEIGHT
-
-        # Fill matrix with ratings (positive ratings only)
-        for _, row in self.ratings_df.iterrows():
-            if row['rating_percent'] > RATING_THRESHOLD:
-                self.interaction_matrix.loc[row['user_id'], row['post_id']] += row['rating_percent'] / 100.0
+        # Create user-post interaction matrix from the pre-aggregated weights
+        # (LIKE_WEIGHT, VIEW_WEIGHT, INSPIRE_WEIGHT and RATING_THRESHOLD are applied at ingest time)
+        all_posts = list(set(self.posts_df['post_id']))
+        self.interaction_matrix = self.interactions_df.pivot_table(
+            index='user_id', columns='post_id', values='weight', aggfunc='sum', fill_value=0.0
+        ).reindex(columns=all_posts, fill_value=0.0).astype(float)
+
+        # Posts each user has interacted with (including ratings that carry no weight)
+        self.user_posts = self.interactions_df.groupby('user_id')['post_id'].agg(set).to_dict()
 
     def compute_user_similarity(self):
         # Compute user-user similarity using cosine similarity
         user_similarity = cosine_similarity(self.interaction_matrix)
         self.user_similarity_df = pd.DataFrame(user_similarity, index=self.interaction_matrix.index, columns=self.interaction_matrix.index)
 
+    def update_interactions(self, updates):
+        """
+        Apply fresh absolute (user, post) weights, read back from user_post_interactions after
+        an event flush, without rebuilding the engine. Only the similarity rows and columns
+        of the affected users are recomputed. Does nothing until the engine has been built,
+        since a later build loads the updated weights from the database anyway.
+
+        Args:
+            updates (pd.DataFrame): user_id, post_id and weight columns
+
+        Returns:
+            int: number of (user, post) pairs applied
+        """
+        with self._update_lock:
+            with self._lock:
+                if self.user_similarity_df is None:
+                    return 0
+                updates = updates[updates['post_id'].isin(self.interaction_matrix.columns)]
+                if updates.empty:
+                    return 0
+
+                # Users seen for the first time get a zero row in the matrix and in the similarity table
+                new_users = pd.Index(updates['user_id'].unique()).difference(self.interaction_matrix.index)
+                if len(new_users):
+                    users = self.interaction_matrix.index.append(new_users)
+                    self.interaction_matrix = self.interaction_matrix.reindex(users, fill_value=0.0)
+                    self.user_similarity_df = self.user_similarity_df.reindex(index=users, columns=users, fill_value=0.0)
+
+                for row in updates.itertuples(index=False):
+                    self.interaction_matrix.at[row.user_id, row.post_id] = float(row.weight)
+                    self.user_posts.setdefault(row.user_id, set()).add(row.post_id)
+                matrix = self.interaction_matrix
+
+            # Recommendations only read the matrix and _update_lock keeps writers out, so the
+            # expensive similarity pass runs without blocking /feed; the result is swapped in below
+            affected = list(updates['user_id'].unique())
+            similarity = cosine_similarity(matrix.loc[affected], matrix)
+            with self._lock:
+                self.user_similarity_df.loc[affected, :] = similarity
+                self.user_similarity_df.loc[:, affected] = similarity.T
+            return len(updates)
+
     def recommend_posts(self, user_id, category=None, num_recommendations=10):
+        with self._lock:
+            return self._recommend_posts(user_id, category, num_recommendations)
+
+    def _recommend_posts(self, user_id, category=None, num_recommendations=10):
         # Load and prepare data if not already done
         if self.posts_df is None:
-            self.load_and_prepare_data()
-            self.compute_content_similarity()
-            self.build_interaction_matrix()
-            self.compute_user_similarity()
+            for stage in (self.load_and_prepare_data, self.compute_content_similarity,
+                          self.build_interaction_matrix, self.compute_user_similarity):
+                with ENGINE_BUILD_STAGE_SECONDS.time(stage=stage.__name__):
+                    stage()
 
         # Get posts the user has interacted with
-        user_interactions = set(self.likes_df[self.likes_df['user_id'] == user_id]['post_id']).union(
-            self.views_df[self.views_df['user_id'] == user_id]['post_id'],
-            self.inspires_df[self.inspires_df['user_id'] == user_id]['post_id'],
-            self.ratings_df[self.ratings_df['user_id'] == user_id]['post_id']
-        )
+        user_interactions = self.user_posts.get(user_id, set())
 
         if user_id not in self.interaction_matrix.index or not user_interactions:
             logging.info(f"No interactions found for user {user_id}")
@@ -160,5 +184,5 @@ class RecommendationEngine:
         # Get top recommendations
         recommendations = final_scores.sort_values(ascending=False).head(num_recommendations).index.tolist()
 
-        logging.info(f"Recommended {len(recommendations)} posts for user {user_id} in category {category}: {recommendations}")
+        logging.debug(f"Recommended {len(recommendations)} posts for user {user_id} in category {category}: {recommendations}")
         return recommendations if recommendations else []
\ No newline at end of file
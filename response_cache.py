@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR")
+
+
+class CacheEntry:
+    """A serialized JSON response body together with its ETag and fetch time."""
+
+    def __init__(self, body, etag, fetched_at):
+        self.body = body
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+def make_etag(body):
+    """Strong ETag derived from the response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class ResponseCache:
+    """
+    TTL cache for crawled upstream responses with optional on-disk backing.
+
+    Fresh entries are served directly. Once an entry is older than the TTL it is
+    still served, but a single background re-crawl is started to replace it
+    (stale-while-revalidate). Only a cold miss waits for the crawl.
+    """
+
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, cache_dir=RESPONSE_CACHE_DIR):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._entries = {}
+        self._locks = {}
+        self._refreshing = {}
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        safe_key = key.strip("/").replace("/", "_")
+        return (
+            os.path.join(self.cache_dir, f"{safe_key}.body"),
+            os.path.join(self.cache_dir, f"{safe_key}.meta.json"),
+        )
+
+    def _load_from_disk(self, key):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body, meta["etag"], meta["fetched_at"])
+
+    def _save_to_disk(self, key, entry):
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(entry.body)
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump({"etag": entry.etag, "fetched_at": entry.fetched_at}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            logger.warning(f"Failed to write response cache entry '{key}' to disk: {str(e)}")
+
+    def get(self, key):
+        """Return the cached entry for `key` (fresh or stale), or None."""
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                self._entries[key] = entry
+        return entry
+
+    def set(self, key, data):
+        """Serialize `data` as JSON and store it under `key`."""
+        body = json.dumps(data).encode()
+        entry = CacheEntry(body, make_etag(body), time.time())
+        self._entries[key] = entry
+        if self.cache_dir:
+            self._save_to_disk(key, entry)
+        return entry
+
+    def is_fresh(self, entry):
+        return entry.age() < self.ttl
+
+    async def _refresh(self, key, loader):
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.is_fresh(entry):
+                return entry
+            self.stats["refreshes"] += 1
+            return self.set(key, await loader())
+
+    async def _background_refresh(self, key, loader):
+        try:
+            await self._refresh(key, loader)
+            logger.info(f"Revalidated response cache entry '{key}'")
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            logger.error(f"Background refresh of '{key}' failed, keeping stale entry: {str(e)}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def get_or_refresh(self, key, loader):
+        """
+        Return the entry for `key`, crawling with the async `loader` on a cold miss
+        and re-crawling in the background once the entry is stale.
+        """
+        entry = self.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return await self._refresh(key, loader)
+        if self.is_fresh(entry):
+            self.stats["hits"] += 1
+        else:
+            self.stats["stale_hits"] += 1
+            if key not in self._refreshing:
+                self._refreshing[key] = asyncio.ensure_future(self._background_refresh(key, loader))
+        return entry
+
+
+response_cache = ResponseCache()
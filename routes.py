@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from typing import Optional
+import json
 import os
-import requests
+import time
 from pydantic import BaseModel
-from predict import predict_posts
+from predict import predict_posts, popular_posts, engine_is_cold
+from upstream import fetch_all_pages, iter_pages, UpstreamError
+from http_client import pool_stats
+from response_cache import response_cache
+from feed_admission import feed_admission
+from traffic_log import traffic_log
+from events import event_ingestor, EventBatch, EventQueueFull, EventIngestorStopped, EVENTS_MAX_BATCH, EVENTS_RETRY_AFTER
+from metrics import REGISTRY, CONTENT_TYPE
 
 # Initialize router
 router = APIRouter()
@@ -90,181 +99,300 @@ class PostResponse(BaseModel):
 #         raise HTTPException(status_code=500, detail=f"Failed to fetch category feed: {str(e)}")
 
 # Data Collection Endpoints (Internal Use)
+def _resonance_params():
+    """Query parameters shared by the resonance-ranked upstream post routes."""
+    return {"page_size": PAGE_SIZE, "resonance_algorithm": RESONANCE_ALGORITHM}
+
+def _ndjson_response(path, key, params=None, headers=None, start_page=1):
+    """
+    Stream upstream pages to the client as NDJSON, one line per page, as soon as each page arrives.
+    Every page line is {key: [...], "page": n}, with n the upstream page number (counting from
+    start_page). The status is sent before the first page, so it is 200 even when the upstream
+    fails part-way through: the last line is {"ok": true, "pages": n} for a complete crawl and
+    {"ok": false, "error": "...", "pages": n} otherwise. A consumer must check "ok" before it
+    records a watermark, last page or ETag for the crawl.
+    """
+    async def generate():
+        pages = 0
+        try:
+            async for items in iter_pages(path, key, params, headers, start_page=start_page):
+                pages += 1
+                yield json.dumps({key: items, "page": start_page + pages - 1}) + "\n"
+            yield json.dumps({"ok": True, "pages": pages}) + "\n"
+        except UpstreamError as e:
+            yield json.dumps({"ok": False, "error": f"Failed to fetch {key}: {str(e)}", "pages": pages}) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+def _cached_json_response(request, entry):
+    """
+    Serve a cached crawl with its ETag, or an empty 304 when the caller's If-None-Match already matches.
+    """
+    headers = {
+        "ETag": entry.etag,
+        "Cache-Control": f"max-age={max(0, int(response_cache.ttl - entry.age()))}"
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if entry.etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
 @router.get("/posts/view", response_model=PostResponse)
-async def get_viewed_posts():
+async def get_viewed_posts(
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
     Get all viewed posts with pagination.
     """
-    all_posts = []
-    page = 1
+    if stream:
+        return _ndjson_response("/posts/view", "posts", params=_resonance_params(), start_page=start_page)
     try:
-        while True:
-            url = f"{API_BASE_URL}/posts/view?page={page}&page_size={PAGE_SIZE}&resonance_algorithm={RESONANCE_ALGORITHM}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("posts", [])
-            
-            if not posts:
-                break
-                
-            all_posts.extend(posts)
-            page += 1
-            
-        return {"posts": all_posts, "pages":page-1}
-    except requests.RequestException as e:
+        all_posts, pages = await fetch_all_pages("/posts/view", "posts", params=_resonance_params(), start_page=start_page)
+        return {"posts": all_posts, "pages": pages}
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @router.get("/posts/like", response_model=PostResponse)
-async def get_liked_posts():
+async def get_liked_posts(
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
     Get all liked posts with pagination.
     """
-    all_posts = []
-    page = 1
+    if stream:
+        return _ndjson_response("/posts/like", "posts", params=_resonance_params(), start_page=start_page)
     try:
-        while True:
-            url = f"{API_BASE_URL}/posts/like?page={page}&page_size={PAGE_SIZE}&resonance_algorithm={RESONANCE_ALGORITHM}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("posts", [])
-            
-            if not posts:
-                break
-                
-            all_posts.extend(posts)
-            page += 1
-            
-        return {"posts": all_posts, "pages":page-1}
-    except requests.RequestException as e:
+        all_posts, pages = await fetch_all_pages("/posts/like", "posts", params=_resonance_params(), start_page=start_page)
+        return {"posts": all_posts, "pages": pages}
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @router.get("/posts/inspire", response_model=PostResponse)
-async def get_inspired_posts():
+async def get_inspired_posts(
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
     Get all inspired posts with pagination.
     """
-    all_posts = []
-    page = 1
+    if stream:
+        return _ndjson_response("/posts/inspire", "posts", params=_resonance_params(), start_page=start_page)
     try:
-        while True:
-            url = f"{API_BASE_URL}/posts/inspire?page={page}&page_size={PAGE_SIZE}&resonance_algorithm={RESONANCE_ALGORITHM}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("posts", [])
-            
-            if not posts:
-                break
-                
-            all_posts.extend(posts)
-            page += 1
-            
-        return {"posts": all_posts, "pages":page-1}
-    except requests.RequestException as e:
+        all_posts, pages = await fetch_all_pages("/posts/inspire", "posts", params=_resonance_params(), start_page=start_page)
+        return {"posts": all_posts, "pages": pages}
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @router.get("/posts/rating", response_model=PostResponse)
-async def get_rated_posts():
+async def get_rated_posts(
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
     Get all rated posts with pagination.
     """
-    all_posts = []
-    page = 1
+    if stream:
+        return _ndjson_response("/posts/rating", "posts", params=_resonance_params(), start_page=start_page)
     try:
-        while True:
-            url = f"{API_BASE_URL}/posts/rating?page={page}&page_size={PAGE_SIZE}&resonance_algorithm={RESONANCE_ALGORITHM}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("posts", [])
-            
-            if not posts:
-                break
-                
-            all_posts.extend(posts)
-            page += 1
-            
-        return {"posts": all_posts, "pages":page-1}
-    except requests.RequestException as e:
+        all_posts, pages = await fetch_all_pages("/posts/rating", "posts", params=_resonance_params(), start_page=start_page)
+        return {"posts": all_posts, "pages": pages}
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @router.get("/posts/summary/get", response_model=PostResponse)
-async def get_all_posts():
+async def get_all_posts(
+    request: Request,
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
     Get all posts with pagination.
     Requires Flic token authentication passed to external API.
+    Responses are cached for RESPONSE_CACHE_TTL seconds and carry an ETag for conditional requests.
     """
     if not FLIC_TOKEN:
         raise HTTPException(status_code=500, detail="FLIC_TOKEN not configured")
     
-    all_posts = []
-    page = 1
+    if stream:
+        return _ndjson_response(
+            "/posts/summary/get", "posts",
+            params={"page_size": PAGE_SIZE},
+            headers={"Flic-Token": FLIC_TOKEN},
+            start_page=start_page
+        )
+
+    async def crawl():
+        all_posts, pages = await fetch_all_pages(
+            "/posts/summary/get", "posts",
+            params={"page_size": PAGE_SIZE},
+            headers={"Flic-Token": FLIC_TOKEN},
+            start_page=start_page
+        )
+        return {"posts": all_posts, "pages": pages}
+
     try:
-        while True:
-            url = f"{API_BASE_URL}/posts/summary/get?page={page}&page_size={PAGE_SIZE}"
-            headers = {"Flic-Token": FLIC_TOKEN}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            posts = data.get("posts", [])
-            
-            if not posts:
-                break
-                
-            all_posts.extend(posts)
-            page += 1
-            
-        return {"posts": all_posts, "pages":page-1}
+        entry = await response_cache.get_or_refresh(f"posts/summary/get?start_page={start_page}", crawl)
+        return _cached_json_response(request, entry)
         
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
 
 @router.get("/users/get_all", response_model=UserResponse)
-async def get_all_users():
+async def get_all_users(
+    request: Request,
+    stream: bool = Query(False, description="Stream pages as NDJSON instead of one JSON document"),
+    start_page: int = Query(1, ge=1, description="First upstream page to fetch (used by incremental sync)")
+):
     """
-    Get all users by looping through pages until users list is empty.
+    Get all users by fetching pages concurrently until an empty users page is returned.
     Requires Flic token authentication passed to external API.
+    Responses are cached for RESPONSE_CACHE_TTL seconds and carry an ETag for conditional requests.
     """
     if not FLIC_TOKEN:
         raise HTTPException(status_code=500, detail="FLIC_TOKEN not configured")
     
-    all_users = []
-    page = 1
-    
+    if stream:
+        return _ndjson_response(
+            "/users/get_all", "users",
+            params={"page_size": PAGE_SIZE},
+            headers={"Flic-Token": FLIC_TOKEN},
+            start_page=start_page
+        )
+
+    async def crawl():
+        all_users, pages = await fetch_all_pages(
+            "/users/get_all", "users",
+            params={"page_size": PAGE_SIZE},
+            headers={"Flic-Token": FLIC_TOKEN},
+            start_page=start_page
+        )
+        return {"users": all_users, "pages": pages}
+
     try:
-        while True:
-            url = f"{API_BASE_URL}/users/get_all?page={page}&page_size={PAGE_SIZE}"
-            headers = {"Flic-Token": FLIC_TOKEN}
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
-            users = data.get("users", [])
-            
-            if not users:
-                break
-                
-            all_users.extend(users)
-            page += 1
-            
-        return {"users": all_users, "pages":page-1}
+        entry = await response_cache.get_or_refresh(f"users/get_all?start_page={start_page}", crawl)
+        return _cached_json_response(request, entry)
         
-    except requests.RequestException as e:
+    except UpstreamError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch users: {str(e)}")
     
 
+@router.get("/http/pool")
+async def get_http_pool_stats():
+    """
+    Report usage of the shared pooled HTTP clients (requests, in-flight, open/idle connections).
+    """
+    return pool_stats()
+
+def _ratio(part, total):
+    return part / total if total else None
+
+def _collect_runtime_stats():
+    """Expose the counters kept by the caches, the HTTP pool, /feed admission and /events on each scrape."""
+    feed = feed_admission.stats()
+    cache = response_cache.stats
+    pool = pool_stats()
+    events = event_ingestor.stats()
+    degraded = feed["degraded_cache"] + feed["degraded_popular"]
+    cache_lookups = cache["hits"] + cache["stale_hits"] + cache["misses"]
+    max_connections = pool["limits"]["max_connections"]
+    return [
+        ("feed_responses_total", "counter", "/feed responses by path taken",
+         [({"outcome": outcome}, feed[outcome]) for outcome in ("full", "degraded_cache", "degraded_popular")]),
+        ("feed_degrade_reasons_total", "counter", "Why /feed requests were degraded",
+         [({"reason": reason}, feed[reason]) for reason in ("queue_timeout", "over_budget", "budget_exceeded")]),
+        ("feed_in_flight", "gauge", "Full /feed recommendation runs in progress", [({}, feed["in_flight"])]),
+        ("feed_expected_latency_seconds", "gauge", "Moving average of full /feed latency", [({}, feed["expected_latency"])]),
+        ("feed_result_cache_size", "gauge", "Cached full /feed results", [({}, feed["cached_results"])]),
+        ("feed_result_cache_hit_ratio", "gauge", "Share of degraded /feed responses served from the result cache",
+         [({}, _ratio(feed["degraded_cache"], degraded))]),
+        ("response_cache_lookups_total", "counter", "Response cache lookups by result",
+         [({"result": result}, cache[result]) for result in ("hits", "stale_hits", "misses")]),
+        ("response_cache_refreshes_total", "counter", "Response cache refreshes", [({}, cache["refreshes"])]),
+        ("response_cache_refresh_errors_total", "counter", "Failed response cache refreshes", [({}, cache["refresh_errors"])]),
+        ("response_cache_hit_ratio", "gauge", "Share of response cache lookups served from the cache (fresh or stale)",
+         [({}, _ratio(cache["hits"] + cache["stale_hits"], cache_lookups))]),
+        ("http_pool_requests_total", "counter", "Upstream HTTP requests", [({}, pool["requests"])]),
+        ("http_pool_errors_total", "counter", "Failed upstream HTTP requests", [({}, pool["errors"])]),
+        ("http_pool_in_flight", "gauge", "Upstream HTTP requests in progress", [({}, pool["in_flight"])]),
+        ("http_pool_utilisation", "gauge", "In-flight upstream requests over HTTP_MAX_CONNECTIONS",
+         [({}, _ratio(pool["in_flight"], max_connections))]),
+        ("http_pool_connections", "gauge", "Pooled connections per shared client and state",
+         [({"client": client, "state": state}, counts[state])
+          for client, counts in pool["connections"].items() for state in ("open", "idle", "active")]),
+        ("events_total", "counter", "Interaction events by outcome",
+         [({"outcome": outcome}, events[outcome]) for outcome in ("accepted", "rejected", "written", "dropped")]),
+        ("events_flushes_total", "counter", "Event micro-batch flushes", [({}, events["flushes"])]),
+        ("events_queued", "gauge", "Events waiting to be written", [({}, events["queued"])]),
+        ("events_queue_utilisation", "gauge", "Queued events over EVENTS_QUEUE_SIZE",
+         [({}, _ratio(events["queued"], events["queue_size"]))]),
+        ("events_last_flush_seconds", "gauge", "Duration of the most recent event flush", [({}, events["last_flush_seconds"])]),
+    ]
+
+REGISTRY.add_collector(_collect_runtime_stats)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus text-format metrics: per-route latency, predict_posts and engine build stages,
+    ingest throughput, cache hit rates, HTTP pool utilisation and the event queue.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@router.get("/feed/admission")
+async def get_feed_admission_stats():
+    """
+    Report /feed admission control counters: full vs degraded responses and why requests were degraded.
+    """
+    return feed_admission.stats()
+
+@router.post("/events", status_code=202)
+async def post_events(batch: EventBatch):
+    """
+    Accept a batch of like/view/inspire/rating events for micro-batched writes to the
+    interaction tables. Returns 429 with Retry-After when the in-memory queue is full.
+    """
+    if len(batch.events) > EVENTS_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {EVENTS_MAX_BATCH} events per request")
+    try:
+        accepted = event_ingestor.submit(batch.events)
+    except EventQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(EVENTS_RETRY_AFTER)})
+    except EventIngestorStopped as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(EVENTS_RETRY_AFTER)})
+    return {"accepted": accepted}
+
+@router.get("/events/stats")
+async def get_event_stats():
+    """
+    Report event ingestion counters: accepted, rejected, written and queued events.
+    """
+    return event_ingestor.stats()
+
 @router.get("/feed")
-async def get_feed(userid: int, project_code: str = None):
+async def get_feed(response: Response, userid: int, project_code: str = None):
+    """
+    Get personalized recommendations for a user, optionally filtered by category.
+    Runs under admission control: when the concurrency limit or latency budget would be
+    exceeded, a cached or popularity-based feed is returned and marked with X-Feed-Degraded.
+    Requests are appended to FEED_TRAFFIC_LOG when it is set.
+    """
+    started = time.perf_counter()
+    params = {"userid": userid, "project_code": project_code}
     try:
         # Call predict_post with username as user_id and optional project_code as category
-        recommendations = predict_posts(user_id=userid, category=project_code)
+        recommendations, degraded = await feed_admission.handle(
+            key=(userid, project_code),
+            full=lambda: predict_posts(user_id=userid, category=project_code),
+            cheap=lambda: popular_posts(category=project_code),
+            cold=engine_is_cold
+        )
+        if degraded:
+            response.headers["X-Feed-Degraded"] = degraded
+        traffic_log.record("/feed", params, 200, time.perf_counter() - started, degraded)
         return  recommendations
     except Exception as e:
+        traffic_log.record("/feed", params, 500, time.perf_counter() - started)
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
\ No newline at end of file
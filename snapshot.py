@@ -0,0 +1,257 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from database_manager import engine, load_interaction_columns, AGGREGATED_TABLES
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Environment variables
+# When set, the recommendation engine loads from this snapshot instead of the database
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+DEFAULT_SNAPSHOT_DIR = SNAPSHOT_DIR or "snapshot"
+
+INTERACTION_TABLES = list(AGGREGATED_TABLES)
+AGGREGATE_TABLE = "user_post_interactions"
+SUMMARY_TABLE = "updated_post_summaries"
+# Tables the recommendation engine reads
+ENGINE_TABLES = [AGGREGATE_TABLE, SUMMARY_TABLE]
+SUMMARY_STRING_COLUMNS = ("summary", "keywords", "category")
+
+# Snapshot layout (one directory per table):
+#
+#     <snapshot_dir>/<table>/manifest.json
+#     <snapshot_dir>/<table>/part-00000/<column>.npy
+#     <snapshot_dir>/<table>/part-00001/<column>.npy   (delta appended by a later export)
+#
+# Interaction tables are appended to: each export writes only the rows whose id is above
+# the manifest watermark, or below its local_watermark for the negative ids of event rows
+# (see database_manager._assign_local_ids), as a new part. String columns of the summary table are stored as
+# a UTF-8 blob (<column>.bin) plus int64 offsets (<column>.offsets.npy). The summary and
+# user_post_interactions tables are updated in place, so they are rewritten on every export.
+
+
+def _table_dir(table, snapshot_dir):
+    return os.path.join(snapshot_dir, table)
+
+
+def read_manifest(table, snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Return the manifest of a snapshotted table, or None if it has not been exported."""
+    try:
+        with open(os.path.join(_table_dir(table, snapshot_dir), "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(table, snapshot_dir, manifest):
+    path = os.path.join(_table_dir(table, snapshot_dir), "manifest.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def _write_part(table, snapshot_dir, part_name, write_columns):
+    """Write a part into a temporary directory and move it into place once complete."""
+    final_dir = os.path.join(_table_dir(table, snapshot_dir), part_name)
+    tmp_dir = final_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    write_columns(tmp_dir)
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+
+
+def export_interactions(table, snapshot_dir=DEFAULT_SNAPSHOT_DIR, full=False):
+    """
+    Export new rows of an interaction table as a delta part.
+
+    Only rows appended since the last export (id above the manifest watermark, or
+    below its local_watermark for event rows) are written. Rows updated in place by an upsert keep their id, so use `full=True`
+    to rewrite the table and pick those changes up.
+
+    Returns:
+        dict: rows written, total rows and seconds taken
+    """
+    start = time.time()
+    manifest = None if full else read_manifest(table, snapshot_dir)
+    if manifest is None:
+        shutil.rmtree(_table_dir(table, snapshot_dir), ignore_errors=True)
+        os.makedirs(_table_dir(table, snapshot_dir))
+        manifest = {"table": table, "watermark": 0, "local_watermark": 0, "rows": 0, "parts": []}
+    # Manifests written before event rows had negative ids have no local watermark
+    manifest.setdefault("local_watermark", 0)
+
+    columns = load_interaction_columns(table, with_timestamps=True, with_ids=True,
+                                       after_id=manifest["watermark"], before_id=manifest["local_watermark"])
+    row_ids = columns.pop("id")
+    written = len(row_ids)
+    if written:
+        part_name = f"part-{len(manifest['parts']):05d}"
+
+        def write_columns(part_dir):
+            for name, values in columns.items():
+                np.save(os.path.join(part_dir, f"{name}.npy"), values)
+
+        _write_part(table, snapshot_dir, part_name, write_columns)
+        manifest["parts"].append({"name": part_name, "rows": written, "min_id": int(row_ids.min()), "max_id": int(row_ids.max())})
+        manifest["watermark"] = max(manifest["watermark"], int(row_ids.max()))
+        manifest["local_watermark"] = min(manifest["local_watermark"], int(row_ids.min()))
+        manifest["rows"] += written
+    manifest["columns"] = {name: values.dtype.str for name, values in columns.items()}
+    manifest["exported_at"] = time.time()
+    _write_manifest(table, snapshot_dir, manifest)
+
+    stats = {"table": table, "rows": written, "total_rows": manifest["rows"], "seconds": time.time() - start}
+    logging.info(f"Snapshot {table}: {written} new rows ({manifest['rows']} total, {len(manifest['parts'])} parts) in {stats['seconds']:.2f}s")
+    return stats
+
+
+def export_aggregate(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Rewrite the user_post_interactions snapshot (user_id, post_id, weight, timestamp)."""
+    start = time.time()
+    columns = load_interaction_columns(AGGREGATE_TABLE, with_timestamps=True)
+    rows = len(columns["user_id"])
+
+    def write_columns(part_dir):
+        for name, values in columns.items():
+            np.save(os.path.join(part_dir, f"{name}.npy"), values)
+
+    os.makedirs(_table_dir(AGGREGATE_TABLE, snapshot_dir), exist_ok=True)
+    _write_part(AGGREGATE_TABLE, snapshot_dir, "part-00000", write_columns)
+    _write_manifest(AGGREGATE_TABLE, snapshot_dir, {
+        "table": AGGREGATE_TABLE,
+        "rows": rows,
+        "parts": [{"name": "part-00000", "rows": rows}],
+        "columns": {name: values.dtype.str for name, values in columns.items()},
+        "exported_at": time.time(),
+    })
+
+    stats = {"table": AGGREGATE_TABLE, "rows": rows, "total_rows": rows, "seconds": time.time() - start}
+    logging.info(f"Snapshot {AGGREGATE_TABLE}: rewrote {rows} rows in {stats['seconds']:.2f}s")
+    return stats
+
+
+def _save_strings(part_dir, name, values):
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    with open(os.path.join(part_dir, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(part_dir, f"{name}.offsets.npy"), offsets)
+
+
+def _load_strings(part_dir, name):
+    offsets = np.load(os.path.join(part_dir, f"{name}.offsets.npy"))
+    with open(os.path.join(part_dir, f"{name}.bin"), "rb") as f:
+        blob = f.read()
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+def _keywords_text(raw):
+    """Keywords are stored as a JSON list; the engine only needs them space-joined."""
+    if raw is None:
+        return ""
+    try:
+        keywords = json.loads(raw)
+    except ValueError:
+        return str(raw)
+    return " ".join(str(k) for k in keywords) if isinstance(keywords, list) else str(keywords)
+
+
+def export_summaries(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """Rewrite the summary snapshot (post_id, summary, space-joined keywords, category)."""
+    start = time.time()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        rows = cursor.execute(f"SELECT post_id, summary, keywords, category FROM {SUMMARY_TABLE} ORDER BY post_id").fetchall()
+        cursor.close()
+    finally:
+        raw.close()
+
+    post_ids = np.fromiter((row[0] for row in rows), dtype=np.int32, count=len(rows))
+    strings = {
+        "summary": [row[1] or "" for row in rows],
+        "keywords": [_keywords_text(row[2]) for row in rows],
+        "category": [row[3] or "Unknown" for row in rows],
+    }
+
+    def write_columns(part_dir):
+        np.save(os.path.join(part_dir, "post_id.npy"), post_ids)
+        for name, values in strings.items():
+            _save_strings(part_dir, name, values)
+
+    os.makedirs(_table_dir(SUMMARY_TABLE, snapshot_dir), exist_ok=True)
+    _write_part(SUMMARY_TABLE, snapshot_dir, "part-00000", write_columns)
+    _write_manifest(SUMMARY_TABLE, snapshot_dir, {
+        "table": SUMMARY_TABLE,
+        "rows": len(rows),
+        "parts": [{"name": "part-00000", "rows": len(rows)}],
+        "columns": {"post_id": post_ids.dtype.str, **{name: "utf8" for name in SUMMARY_STRING_COLUMNS}},
+        "exported_at": time.time(),
+    })
+
+    stats = {"table": SUMMARY_TABLE, "rows": len(rows), "total_rows": len(rows), "seconds": time.time() - start}
+    logging.info(f"Snapshot {SUMMARY_TABLE}: rewrote {len(rows)} rows in {stats['seconds']:.2f}s")
+    return stats
+
+
+def export_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR, full=False):
+    """Export every interaction table (as deltas unless `full`), the interaction aggregate and the summary table."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    report = [export_interactions(table, snapshot_dir, full) for table in INTERACTION_TABLES]
+    report.append(export_aggregate(snapshot_dir))
+    report.append(export_summaries(snapshot_dir))
+    return report
+
+
+def load_snapshot_table(table, snapshot_dir=DEFAULT_SNAPSHOT_DIR, mmap=True):
+    """
+    Load a snapshotted table as a dict of columns, concatenating its parts.
+    Numeric columns are memory-mapped; summary string columns come back as lists.
+    Returns None if the table has not been exported.
+    """
+    manifest = read_manifest(table, snapshot_dir)
+    if manifest is None:
+        return None
+    table_dir = _table_dir(table, snapshot_dir)
+    columns = {}
+    for name, dtype in manifest["columns"].items():
+        parts = []
+        for part in manifest["parts"]:
+            part_dir = os.path.join(table_dir, part["name"])
+            if dtype == "utf8":
+                parts.extend(_load_strings(part_dir, name))
+            else:
+                parts.append(np.load(os.path.join(part_dir, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        if dtype == "utf8":
+            columns[name] = parts
+        elif len(parts) == 1:
+            columns[name] = parts[0]
+        else:
+            columns[name] = np.concatenate(parts) if parts else np.empty(0, dtype=np.dtype(dtype))
+    return columns
+
+
+def snapshot_available(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """True when every table the engine needs has been exported to `snapshot_dir`."""
+    return all(read_manifest(table, snapshot_dir) is not None for table in ENGINE_TABLES)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export interaction and summary tables to a columnar snapshot.")
+    parser.add_argument("--dir", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot directory (default: SNAPSHOT_DIR or ./snapshot)")
+    parser.add_argument("--full", action="store_true", help="Rewrite the interaction tables instead of appending deltas")
+    args = parser.parse_args()
+    for stats in export_snapshot(args.dir, args.full):
+        print(f"{stats['table']}: {stats['rows']} rows written, {stats['total_rows']} total, {stats['seconds']:.2f}s")
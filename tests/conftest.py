@@ -0,0 +1,67 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fake_llm_server
+from benchmarks.llm_throughput import start_fake_server
+
+# Fast, deterministic defaults; tests override single settings through the fake_llm fixture
+FAKE_LLM_TEST_CONFIG = {
+    "latency": 0.02,
+    "latency_per_post": 0.0,
+    "jitter": 0.0,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "max_concurrency": 1000,
+    "retry_after": "0.05",
+    "bad_element_rate": 0.0,
+    "throttle_first": 0,
+}
+
+
+@pytest.fixture(scope="session")
+def fake_llm_url():
+    """Run benchmarks/fake_llm_server.py in-process for the whole test session."""
+    server, base_url = start_fake_server()
+    yield base_url
+    server.should_exit = True
+
+
+@pytest.fixture
+def fake_llm(fake_llm_url, monkeypatch):
+    """
+    Point the OpenAI SDK at the fake server with test defaults and fresh counters.
+    Returns the server's config dict, which a test may change before making calls.
+    """
+    monkeypatch.setenv("OPENAI_BASE_URL", fake_llm_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    fake_llm_server.config.update(FAKE_LLM_TEST_CONFIG)
+    for key in fake_llm_server.stats:
+        fake_llm_server.stats[key] = 0
+    return fake_llm_server.config
+
+
+@pytest.fixture(scope="session")
+def database_manager(tmp_path_factory):
+    """
+    Import database_manager from a scratch directory: its engine URL is relative, and SQLite
+    resolves it once, so every test's connections go to that directory's data.db.
+    """
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("db"))
+    try:
+        return importlib.import_module("database_manager")
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def db(database_manager):
+    """database_manager with every table emptied."""
+    database_manager.Base.metadata.drop_all(database_manager.engine)
+    database_manager.Base.metadata.create_all(database_manager.engine)
+    return database_manager
@@ -0,0 +1,87 @@
+import importlib
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+EVENT_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def ingestor(db):
+    events = importlib.import_module("events")
+    return events.EventIngestor()
+
+
+def flush_events(ingestor, *events):
+    """Write events the way a flush does, returning the pairs it touched."""
+    events_module = importlib.import_module("events")
+    pending = {}
+    for data in events:
+        table, row = events_module._to_row(events_module.InteractionEvent(**data), EVENT_TIME)
+        pending.setdefault(table, []).append(row)
+    pairs = set()
+    ingestor._write(pending, pairs)
+    return pairs
+
+
+def crawl(db, table, rows):
+    db.bulk_upsert(table, db.prepare_rows(table, rows))
+
+
+def fetch(db, sql):
+    with db.engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(sql))]
+
+
+def interactions(db, user_id, post_id):
+    return fetch(db, f"SELECT like_count, view_count FROM user_post_interactions WHERE user_id = {user_id} AND post_id = {post_id}")
+
+
+def test_event_rows_get_negative_ids(db, ingestor):
+    flush_events(ingestor, {"type": "view", "user_id": 1, "post_id": 10}, {"type": "view", "user_id": 1, "post_id": 11})
+    flush_events(ingestor, {"type": "view", "user_id": 2, "post_id": 10})
+
+    assert fetch(db, "SELECT id, user_id, post_id FROM post_views ORDER BY id DESC") == [(-1, 1, 10), (-2, 1, 11), (-3, 2, 10)]
+
+
+def test_crawl_interleaved_with_event_flushes_keeps_both(db, ingestor):
+    flush_events(ingestor, {"type": "like", "user_id": 2, "post_id": 12}, {"type": "view", "user_id": 2, "post_id": 12})
+
+    # Upstream ids start at 1, like SQLite's autoincrement would have for the event rows
+    crawl(db, "post_likes", [{"id": 1, "user_id": 3, "post_id": 13, "liked_at": "2026-01-01 10:00:00"}])
+    crawl(db, "post_views", [{"id": 1, "user_id": 3, "post_id": 13, "viewed_at": "2026-01-01 10:00:00"}])
+    flush_events(ingestor, {"type": "view", "user_id": 2, "post_id": 12})
+    crawl(db, "post_views", [{"id": 2, "user_id": 4, "post_id": 14, "viewed_at": "2026-01-01 10:00:00"}])
+
+    assert fetch(db, "SELECT id, user_id, post_id FROM post_likes ORDER BY id") == [(-1, 2, 12), (1, 3, 13)]
+    assert fetch(db, "SELECT id, user_id, post_id FROM post_views ORDER BY id") == [
+        (-2, 2, 12), (-1, 2, 12), (1, 3, 13), (2, 4, 14)
+    ]
+    assert interactions(db, 2, 12) == [(1, 2)]
+    assert interactions(db, 3, 13) == [(1, 1)]
+    assert interactions(db, 4, 14) == [(0, 1)]
+
+
+def test_crawled_like_for_an_event_pair_updates_it_in_place(db, ingestor):
+    flush_events(ingestor, {"type": "like", "user_id": 2, "post_id": 12})
+    crawl(db, "post_likes", [{"id": 7, "user_id": 2, "post_id": 12, "liked_at": "2026-01-01 10:00:00"}])
+
+    assert fetch(db, "SELECT id, user_id, post_id FROM post_likes") == [(-1, 2, 12)]
+    assert interactions(db, 2, 12) == [(1, 0)]
+
+
+def test_snapshot_delta_picks_up_event_rows(db, ingestor, tmp_path):
+    snapshot = importlib.import_module("snapshot")
+    snapshot_dir = str(tmp_path / "snapshot")
+    crawl(db, "post_views", [{"id": 1, "user_id": 3, "post_id": 13, "viewed_at": "2026-01-01 10:00:00"}])
+    flush_events(ingestor, {"type": "view", "user_id": 2, "post_id": 12})
+    assert snapshot.export_interactions("post_views", snapshot_dir)["rows"] == 2
+
+    flush_events(ingestor, {"type": "view", "user_id": 5, "post_id": 15})
+    crawl(db, "post_views", [{"id": 2, "user_id": 4, "post_id": 14, "viewed_at": "2026-01-01 10:00:00"}])
+    assert snapshot.export_interactions("post_views", snapshot_dir)["rows"] == 2
+    assert snapshot.export_interactions("post_views", snapshot_dir)["rows"] == 0
+
+    columns = snapshot.load_snapshot_table("post_views", snapshot_dir)
+    assert sorted(zip(columns["user_id"].tolist(), columns["post_id"].tolist())) == [(2, 12), (3, 13), (4, 14), (5, 15)]
@@ -0,0 +1,211 @@
+import asyncio
+import time
+
+import pytest
+
+from benchmarks import fake_llm_server
+from llm_client import AdaptiveConcurrency, LLMClient, LLMError, TokenBucket
+
+MESSAGES = [{"role": "user", "content": "Summarize this post about a city night walk."}]
+
+
+def run(coro, timeout=10):
+    return asyncio.run(asyncio.wait_for(coro, timeout))
+
+
+async def _complete_all(client, calls, **kwargs):
+    try:
+        return await asyncio.gather(*(client.complete(MESSAGES, "fake-model", **kwargs) for _ in range(calls)))
+    finally:
+        await client.aclose()
+
+
+# TokenBucket
+
+def test_token_bucket_waits_for_refill():
+    async def scenario():
+        bucket = TokenBucket(per_minute=600)  # 10 tokens per second
+        await bucket.acquire(600)
+        started = time.monotonic()
+        await bucket.acquire(3)
+        return time.monotonic() - started
+
+    assert 0.2 <= run(scenario()) < 1.0
+
+
+def test_token_bucket_clamps_requests_larger_than_capacity():
+    async def scenario():
+        bucket = TokenBucket(per_minute=60)
+        await bucket.acquire(10_000)
+        return bucket.tokens
+
+    assert run(scenario(), timeout=1) < 1
+
+
+def test_token_bucket_refund_is_capped_at_capacity():
+    async def scenario():
+        bucket = TokenBucket(per_minute=100)
+        await bucket.acquire(40)
+        bucket.adjust(-30)
+        refunded = bucket.tokens
+        bucket.adjust(-1000)
+        return refunded, bucket.tokens
+
+    refunded, capped = run(scenario())
+    assert 89 < refunded < 91
+    assert capped == 100
+
+
+# AdaptiveConcurrency
+
+def test_concurrency_halves_on_throttle_and_never_drops_below_one():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(initial=8, max_limit=16, target_latency=1.0)
+        limits = []
+        for _ in range(5):
+            await concurrency.acquire()
+            await concurrency.release(throttled=True)
+            limits.append(concurrency.limit)
+        return limits
+
+    assert run(scenario()) == [4, 2, 1, 1, 1]
+
+
+def test_concurrency_grows_by_one_per_window_up_to_max():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(initial=2, max_limit=4, target_latency=1.0)
+        limits = []
+        for _ in range(20):
+            await concurrency.acquire()
+            await concurrency.release(latency=0.1)
+            limits.append(concurrency.limit)
+        return limits
+
+    limits = run(scenario())
+    # A window is `limit` fast successes: 2 calls to reach 3, 3 more to reach 4
+    assert limits[:5] == [2, 3, 3, 3, 4]
+    assert max(limits) == 4
+
+
+def test_concurrency_does_not_grow_on_slow_calls():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(initial=2, max_limit=8, target_latency=0.5)
+        for _ in range(10):
+            await concurrency.acquire()
+            await concurrency.release(latency=2.0)
+        return concurrency.limit
+
+    assert run(scenario()) == 2
+
+
+def test_concurrency_blocks_at_limit():
+    async def scenario():
+        concurrency = AdaptiveConcurrency(initial=1, max_limit=1)
+        await concurrency.acquire()
+        waiter = asyncio.ensure_future(concurrency.acquire())
+        await asyncio.sleep(0.05)
+        blocked = not waiter.done()
+        await concurrency.release(latency=0.0)
+        await asyncio.wait_for(waiter, 1)
+        return blocked, concurrency.in_flight
+
+    assert run(scenario()) == (True, 1)
+
+
+# LLMClient against benchmarks/fake_llm_server.py
+
+def test_complete_returns_response_and_records_usage(fake_llm):
+    client = LLMClient(rpm=6000, tpm=1_000_000, concurrency=AdaptiveConcurrency(2, 4))
+    [response] = run(_complete_all(client, 1, tag="single"))
+
+    assert response.choices[0].message.content
+    usage = client.usage["single"]
+    assert usage["calls"] == 1
+    assert usage["prompt_tokens"] == response.usage.prompt_tokens
+    assert usage["completion_tokens"] == response.usage.completion_tokens
+    assert client.stats["requests"] == 1 and client.stats["retries"] == 0
+
+
+def test_429_honours_retry_after_and_halves_concurrency(fake_llm):
+    fake_llm["throttle_first"] = 2
+    fake_llm["retry_after"] = "0.1"
+    # A backoff this long would time the test out, so only Retry-After can explain the wait
+    client = LLMClient(rpm=6000, tpm=1_000_000, concurrency=AdaptiveConcurrency(4, 8), max_retries=5, backoff=60)
+
+    started = time.monotonic()
+    run(_complete_all(client, 1), timeout=5)
+    elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.2
+    assert client.stats["throttled"] == 2
+    assert client.stats["retries"] == 2
+    # 4 -> 2 -> 1 on the two 429s, then the successful call completes a window of one
+    assert client.concurrency.limit == 2
+    assert fake_llm_server.stats["requests"] == 3
+
+
+def test_gives_up_after_max_retries(fake_llm):
+    fake_llm["throttle_first"] = 100
+    fake_llm["retry_after"] = "0.01"
+    client = LLMClient(rpm=6000, tpm=1_000_000, max_retries=2)
+
+    with pytest.raises(LLMError):
+        run(_complete_all(client, 1))
+    assert fake_llm_server.stats["requests"] == 3
+    assert client.concurrency.in_flight == 0
+
+
+def test_server_errors_are_retried_with_backoff(fake_llm):
+    fake_llm["error_rate"] = 1.0
+    client = LLMClient(rpm=6000, tpm=1_000_000, max_retries=1, backoff=0.01)
+
+    with pytest.raises(LLMError):
+        run(_complete_all(client, 1))
+    assert client.stats["errors"] == 2
+    assert fake_llm_server.stats["errors"] == 2
+
+
+def test_aimd_stays_within_bounds_under_server_throttling(fake_llm):
+    fake_llm["max_concurrency"] = 2
+    fake_llm["retry_after"] = "0.02"
+    fake_llm["latency"] = 0.05
+    concurrency = AdaptiveConcurrency(initial=8, max_limit=16, target_latency=1.0)
+    client = LLMClient(rpm=60_000, tpm=10_000_000, concurrency=concurrency, max_retries=50)
+
+    responses = run(_complete_all(client, 24), timeout=30)
+
+    assert len(responses) == 24
+    assert client.stats["throttled"] > 0
+    assert 1 <= concurrency.limit <= 16
+    assert concurrency.in_flight == 0
+    assert fake_llm_server.stats["peak_in_flight"] <= 2
+
+
+def test_overestimated_tokens_are_refunded(fake_llm):
+    client = LLMClient(rpm=6000, tpm=60_000)
+    [response] = run(_complete_all(client, 1, estimated_tokens=5000))
+
+    used = response.usage.total_tokens
+    assert used < 5000
+    # The reservation of 5000 is corrected to the reported usage (plus a little refill)
+    assert 60_000 - used - 1 <= client.tokens_bucket.tokens <= 60_000
+    assert client.tokens_bucket.tokens > 60_000 - 5000
+
+
+def test_underestimated_tokens_are_charged(fake_llm):
+    client = LLMClient(rpm=6000, tpm=60_000)
+    [response] = run(_complete_all(client, 1, estimated_tokens=1))
+
+    used = response.usage.total_tokens
+    assert used > 1
+    assert client.tokens_bucket.tokens <= 60_000 - used + 5
+
+
+def test_latency_percentiles_cover_only_recent_calls(fake_llm, monkeypatch):
+    monkeypatch.setattr("llm_client.LLM_LATENCY_WINDOW", 4)
+    client = LLMClient(rpm=6000, tpm=1_000_000)
+    client.latencies.extend([100.0] * 4)
+    run(_complete_all(client, 4))
+
+    assert len(client.latencies) == 4
+    assert client.snapshot()["latency_p99"] < 100.0
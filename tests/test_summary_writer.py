@@ -0,0 +1,54 @@
+import asyncio
+
+from sqlalchemy import text
+
+from llm_handler import SummaryWriter, read_checkpoint
+
+
+def summary(post_id, **fields):
+    return {"id": post_id, "username": f"user{post_id}", "summary": "A walk at night.", "category": "Travel",
+            "content_hash": f"hash{post_id}", **fields}
+
+
+def stored_post_ids(db):
+    with db.engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT post_id FROM updated_post_summaries ORDER BY post_id"))]
+
+
+def test_invalid_rows_are_dropped_when_added(db, tmp_path):
+    writer = SummaryWriter(flush_size=100, flush_interval=3600, checkpoint_path=str(tmp_path / "checkpoint"))
+
+    async def scenario():
+        await writer.add([summary(1), summary(2, username=None), summary(3)])
+        return await writer.close()
+
+    assert asyncio.run(scenario()) is False
+    assert stored_post_ids(db) == [1, 3]
+    assert writer.stored == 2 and writer.dropped == 1
+    assert read_checkpoint(str(tmp_path / "checkpoint")) == {1, 3}
+
+
+def test_a_row_that_fails_to_store_does_not_block_the_others(db, tmp_path, monkeypatch):
+    store = db.store_updated_post_summaries
+
+    def store_failing_on_post_2(rows):
+        if any(row["id"] == 2 for row in rows):
+            raise Exception("Database commit failed")
+        return store(rows)
+
+    monkeypatch.setattr(db, "store_updated_post_summaries", store_failing_on_post_2)
+    writer = SummaryWriter(flush_size=2, flush_interval=3600, checkpoint_path=str(tmp_path / "checkpoint"), store_attempts=2)
+
+    async def scenario():
+        await writer.add([summary(1), summary(2)])
+        first = (list(stored_post_ids(db)), [row["id"] for row in writer.buffer])
+        await writer.add([summary(3)])
+        return first, await writer.close()
+
+    (stored_first, buffered_first), complete = asyncio.run(scenario())
+    assert stored_first == [1]
+    assert buffered_first == [2]
+    assert complete is False
+    assert stored_post_ids(db) == [1, 3]
+    assert writer.buffer == [] and writer.dropped == 1
+    assert read_checkpoint(str(tmp_path / "checkpoint")) == {1, 3}
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+# Path of a JSONL file that /feed requests are appended to; unset (the default) disables logging
+FEED_TRAFFIC_LOG = os.getenv("FEED_TRAFFIC_LOG")
+FEED_TRAFFIC_SAMPLE_RATE = float(os.getenv("FEED_TRAFFIC_SAMPLE_RATE", "1.0"))
+
+
+class TrafficLog:
+    """
+    Optional request log in the JSONL format replayed by benchmarks/load_test.py, one line per
+    request: {"ts", "path", "params", "status", "latency_ms", "degraded"}.
+
+    Lines are handed to a QueueListener thread, so the request path never waits on file I/O.
+    """
+
+    def __init__(self, path=FEED_TRAFFIC_LOG, sample_rate=FEED_TRAFFIC_SAMPLE_RATE):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.recorded = 0
+        self._logger = None
+        self._listener = None
+
+    @property
+    def enabled(self):
+        return self._listener is not None
+
+    def start(self):
+        """Open the log file and start the writer thread. Called from the app lifespan."""
+        if not self.path or self._listener is not None:
+            return
+        handler = logging.FileHandler(self.path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        records = queue.SimpleQueue()
+        self._logger = logging.getLogger("traffic_log.requests")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(QueueHandler(records))
+        self._listener = QueueListener(records, handler)
+        self._listener.start()
+        logger.info(f"Logging /feed traffic to {self.path} (sample rate {self.sample_rate})")
+
+    def stop(self):
+        """Flush pending lines and close the file. Called from the app lifespan."""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        for handler in list(self._logger.handlers):
+            self._logger.removeHandler(handler)
+        self._listener = None
+
+    def record(self, path, params, status, latency, degraded=None):
+        if self._listener is None or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return
+        entry = {
+            "ts": time.time(),
+            "path": path,
+            "params": {key: value for key, value in params.items() if value is not None},
+            "status": status,
+            "latency_ms": round(latency * 1000, 3),
+            "degraded": degraded,
+        }
+        self._logger.info(json.dumps(entry))
+        self.recorded += 1
+
+
+traffic_log = TrafficLog()
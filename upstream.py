@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import httpx
+from dotenv import load_dotenv
+
+from http_client import get_async_client, get_sync_client
+
+load_dotenv()
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Environment variables
+API_BASE_URL = os.getenv("API_BASE_URL")
+UPSTREAM_CONCURRENCY = int(os.getenv("UPSTREAM_CONCURRENCY", "8"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", "0.5"))
+
+# Status codes worth retrying; anything else in the 4xx range fails immediately
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream page cannot be fetched after all retries."""
+
+
+async def fetch_page(client, url, params=None, headers=None, retries=UPSTREAM_MAX_RETRIES, backoff=UPSTREAM_BACKOFF):
+    """
+    Fetch a single upstream page and return its decoded JSON body.
+    Transport errors and retryable status codes are retried with exponential backoff.
+    """
+    attempt = 0
+    while True:
+        try:
+            response = await client.get(url, params=params, headers=headers)
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+                raise httpx.HTTPStatusError(
+                    f"Retryable status {response.status_code}", request=response.request, response=response
+                )
+            response.raise_for_status()
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRYABLE_STATUS_CODES
+            if not retryable or attempt >= retries:
+                raise UpstreamError(f"{url} (page {(params or {}).get('page')}): {str(e)}") from e
+            delay = backoff * (2 ** attempt)
+            logger.warning(f"Retrying {url} page {(params or {}).get('page')} in {delay:.2f}s after error: {str(e)}")
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+
+        try:
+            return response.json()
+        except ValueError as e:
+            raise UpstreamError(f"{url} (page {(params or {}).get('page')}): invalid JSON: {str(e)}") from e
+
+
+async def iter_pages(path, key, params=None, headers=None, client=None, concurrency=UPSTREAM_CONCURRENCY, start_page=1):
+    """
+    Yield the `key` list of every upstream page of `path`, in page order.
+
+    Up to `concurrency` pages are kept in flight at once. Iteration stops at the
+    first empty page and any requests already issued past it are cancelled.
+    """
+    client = client or get_async_client()
+    url = f"{API_BASE_URL}{path}"
+    pending = deque()
+    next_page = start_page
+
+    def schedule():
+        nonlocal next_page
+        page_params = {**(params or {}), "page": next_page}
+        pending.append(asyncio.ensure_future(fetch_page(client, url, page_params, headers)))
+        next_page += 1
+
+    try:
+        while True:
+            while len(pending) < concurrency:
+                schedule()
+            data = await pending.popleft()
+            items = data.get(key, [])
+            if not items:
+                return
+            yield items
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def fetch_all_pages(path, key, params=None, headers=None, client=None, concurrency=UPSTREAM_CONCURRENCY, start_page=1):
+    """
+    Collect every upstream page of `path` concurrently.
+
+    Returns:
+        tuple: (list of all items, number of non-empty pages fetched)
+    """
+    all_items = []
+    pages = 0
+    async for items in iter_pages(path, key, params, headers, client, concurrency, start_page):
+        all_items.extend(items)
+        pages += 1
+    return all_items, pages
+
+
+def fetch_page_sync(client, url, params=None, headers=None, retries=UPSTREAM_MAX_RETRIES, backoff=UPSTREAM_BACKOFF):
+    """Blocking counterpart of fetch_page for callers without an event loop (e.g. database ingestion)."""
+    attempt = 0
+    while True:
+        try:
+            response = client.get(url, params=params, headers=headers)
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < retries:
+                raise httpx.HTTPStatusError(
+                    f"Retryable status {response.status_code}", request=response.request, response=response
+                )
+            response.raise_for_status()
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRYABLE_STATUS_CODES
+            if not retryable or attempt >= retries:
+                raise UpstreamError(f"{url} (page {(params or {}).get('page')}): {str(e)}") from e
+            delay = backoff * (2 ** attempt)
+            logger.warning(f"Retrying {url} page {(params or {}).get('page')} in {delay:.2f}s after error: {str(e)}")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        try:
+            return response.json()
+        except ValueError as e:
+            raise UpstreamError(f"{url} (page {(params or {}).get('page')}): invalid JSON: {str(e)}") from e
+
+
+def iter_pages_sync(path, key, params=None, headers=None, client=None, start_page=1):
+    """
+    Blocking generator yielding (page_number, items) for every upstream page of `path`,
+    one page at a time, until the first empty page.
+    """
+    client = client or get_sync_client()
+    url = f"{API_BASE_URL}{path}"
+    page = start_page
+    while True:
+        data = fetch_page_sync(client, url, {**(params or {}), "page": page}, headers)
+        items = data.get(key, [])
+        if not items:
+            return
+        yield page, items
+        page += 1